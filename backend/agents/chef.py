@@ -1,18 +1,28 @@
 from phi.agent import Agent
 from backend.model import get_model
 from backend.database.vector_store import search_recipes
+from backend.database.retrieval import format_recipes
 from backend.tools.inventory import check_inventory
+from backend.tools.basket import build_baskets, fallback_bundle
+from backend.tools.meal_plan import plan_meals
+from backend.deadline import tool_call_limit
+from typing import List, Optional
 import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
 
 def get_chef_agent():
     return Agent(
         name="Chef Agent",
-        model=get_model(),
+        model=get_model("chef"),
         description="You are a friendly, enthusiastic Chef that helps customers discover delicious Bangladeshi recipes.",
         instructions=[
             "You help customers find recipes based on what they have or what they want to cook.",
             "Use search_recipes tool to find relevant recipes.",
             "Use check_inventory tool to see which ingredients are available in our store.",
+            "Use plan_meals tool when they want a meal plan, several days of meals, or to cook on a budget.",
             "Format responses beautifully with emojis and clear sections.",
             "For each recipe, show:",
             "  - Recipe name with emoji",
@@ -25,22 +35,32 @@ def get_chef_agent():
             "Prioritize recipes where we have most ingredients in stock.",
             "End with a friendly offer to help with anything else."
         ],
-        tools=[search_recipes, check_inventory], 
+        tools=[search_recipes, check_inventory, plan_meals], 
+        tool_call_limit=tool_call_limit("chef"),
         markdown=True,
         show_tool_calls=False
     )
 
-def chef_logic(user_query: str):
+def chef_logic(user_query: str, recipes: Optional[List[dict]] = None):
     """
     Custom logic to orchestrate the Chef's workflow more explicitly than just LLM tool calling,
     to ensure the 'Marketing Trick' is applied correctly.
+
+    Args:
+        user_query: The customer's message
+        recipes: Recipe rows already fetched by retrieve_all; when given they are
+                 put in the prompt so the agent doesn't need a search_recipes call
     """
     # 1. Search for recipes based on the query
     # We assume the query contains ingredients.
     try:
-        recipes = search_recipes(user_query, k=5)
+        if recipes:
+            recipes_text = format_recipes(recipes)
+        else:
+            recipes_text = None
+            search_recipes(user_query, k=5)
     except Exception as e:
-        print(f"Error searching recipes: {e}")
+        logger.warning(f"Error searching recipes: {e}")
         # Return a helpful message if database is not set up
         return """### 👨‍🍳 Recipe Feature Coming Soon!
 
@@ -63,12 +83,19 @@ What else can I assist you with today? 😊"""
     
     agent = get_chef_agent()
     
+    if recipes_text:
+        search_step = f"""Pick from these recipes we already found for their query (only use search_recipes if none fit):
+
+{recipes_text}"""
+    else:
+        search_step = "Use search_recipes tool to find relevant recipes based on their query"
+    
     prompt = f"""
     Customer Query: "{user_query}"
     
     Help this customer find delicious recipes! Here's what to do:
     
-    1. Use search_recipes tool to find relevant recipes based on their query
+    1. {search_step}
     2. Show the top 2-3 most relevant recipes
     3. For each recipe, present it beautifully with:
        - An appetizing title with emoji
@@ -109,81 +136,62 @@ What else can I assist you with today? 😊"""
     ...
     [BUY_RECIPE_2: Tomato, Cumin, Yogurt]
     
+    If they ask for a meal plan, several days of meals or a budget, call plan_meals instead
+    (with their number of meals, budget and what they already have) and present its plan day
+    by day, then end with ONE tag listing its whole shopping list:
+    [BUY_RECIPE_1: Masoor Dal, Tomato, Carrot]
+
     Make it exciting and encourage them to cook!
     """
     
     response = agent.run(prompt)
     content = response.content
     
-    print(f"\n=== CHEF RESPONSE DEBUG ===")
-    print(f"Original content length: {len(content)}")
-    
-    # Find all [BUY_RECIPE_X: ...] tags and replace with proper JSON
-    import re
-    import json
+    logger.debug("Chef response: %s chars", len(content))
     
     # Pattern to find [BUY_RECIPE_1: Onion, Garam Masala, Ginger]
-    recipe_pattern = r'\[BUY_RECIPE_(\d+):\s*([^\]]+)\]'
-    
+    recipe_pattern = re.compile(r'\[BUY_RECIPE_(\d+):\s*([^\]]+)\]')
+
+    # Price every recipe's ingredients in one pass, so shared items are matched once
+    recipe_ingredients = {}
+    for recipe_num, ingredients_str in recipe_pattern.findall(content):
+        ingredients_list = [ing.strip() for ing in ingredients_str.split(',') if ing.strip()]
+        recipe_ingredients.setdefault(recipe_num, []).extend(ingredients_list)
+        logger.debug("Processing recipe %s with ingredients: %s", recipe_num, ingredients_list)
+
+    if not recipe_ingredients:
+        return content
+
+    try:
+        baskets = build_baskets(recipe_ingredients)
+    except Exception as e:
+        logger.warning(f"Error building baskets: {e}")
+        baskets = {
+            "recipes": {num: fallback_bundle(ings) for num, ings in recipe_ingredients.items()},
+            "combined": None,
+            "shared": [],
+        }
+
     def replace_recipe_tag(match):
-        recipe_num = match.group(1)
-        ingredients_str = match.group(2).strip()
-        
-        # Split ingredients by comma
-        ingredients_list = [ing.strip() for ing in ingredients_str.split(',')]
-        
-        print(f"Processing recipe {recipe_num} with ingredients: {ingredients_list}")
-        
-        try:
-            # Use check_inventory to get prices
-            inventory_result = check_inventory(ingredients_list)
-            
-            print(f"Inventory result for recipe {recipe_num}:")
-            print(inventory_result)
-            
-            # Parse prices - check_inventory returns lines like:
-            # "  - Onion (Deshi) - ৳110 (Stock: 50)" or "  - Onion (Deshi) - ৳110"
-            items = []
-            total = 0
-            lines = inventory_result.split('\n')
-            for line in lines:
-                # Match pattern: "  - NAME - ৳PRICE" (with optional stock info)
-                if '৳' in line and '-' in line:
-                    match_price = re.search(r'-\s*(.+?)\s*-\s*৳(\d+)', line)
-                    if match_price:
-                        name = match_price.group(1).strip()
-                        price = int(match_price.group(2))
-                        items.append({"name": name, "price": price})
-                        total += price
-                        print(f"  Found: {name} - ৳{price}")
-            
-            if items:
-                buy_data = {"items": items, "total": total}
-                print(f"Created buy data with {len(items)} items, total: ৳{total}")
-                return f"\n\n[BUY_INGREDIENTS: {json.dumps(buy_data)}]"
-            else:
-                print("No items found in inventory, using fallback")
-                # Fallback with estimated prices
-                fallback_items = []
-                for ing in ingredients_list[:3]:  # Limit to 3 items
-                    fallback_items.append({"name": ing, "price": 100})
-                fallback_total = len(fallback_items) * 100
-                buy_data = {"items": fallback_items, "total": fallback_total}
-                return f"\n\n[BUY_INGREDIENTS: {json.dumps(buy_data)}]"
-                
-        except Exception as e:
-            print(f"Error processing recipe {recipe_num}: {e}")
-            # Fallback
-            fallback_items = [{"name": ing, "price": 100} for ing in ingredients_list[:3]]
-            buy_data = {"items": fallback_items, "total": len(fallback_items) * 100}
-            return f"\n\n[BUY_INGREDIENTS: {json.dumps(buy_data)}]"
-    
+        buy_data = baskets["recipes"][match.group(1)]
+        logger.debug("Recipe %s: %s items, total: ৳%s", match.group(1), len(buy_data['items']), buy_data['total'])
+        return f"\n\n[BUY_INGREDIENTS: {json.dumps(buy_data)}]"
+
     # Replace all recipe tags with proper JSON
-    content = re.sub(recipe_pattern, replace_recipe_tag, content)
-    
-    print(f"Final content length: {len(content)}")
-    print(f"Number of BUY_INGREDIENTS tags: {content.count('[BUY_INGREDIENTS:')}")
-    print(f"=== END DEBUG ===\n")
+    content = recipe_pattern.sub(replace_recipe_tag, content)
+
+    combined = baskets["combined"]
+    if combined and len(recipe_ingredients) > 1:
+        shared = baskets["shared"]
+        note = f" — {', '.join(shared)} counted once" if shared else ""
+        content += (
+            f"\n\n---\n\n**🛒 Cook all of these — one basket{note}:**"
+            f"\n\n[BUY_INGREDIENTS: {json.dumps(combined)}]"
+        )
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Final chef response: %s chars, %s BUY_INGREDIENTS tags",
+                     len(content), content.count('[BUY_INGREDIENTS:'))
     
     return content
 
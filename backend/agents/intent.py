@@ -0,0 +1,50 @@
+"""
+Rule-based intent classifier
+
+A zero-cost alternative to the LLM classification step in the orchestrator.
+It scores each intent by keyword hits and returns the best match, so it can be
+benchmarked against the LLM classifier or used as a pre-filter.
+"""
+import re
+from typing import Dict, List
+
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "COOKING_QUERY": [
+        "recipe", "recipes", "cook", "cooking", "make", "dish", "dinner", "lunch", "breakfast",
+        "meal", "bhuna", "curry", "tehari", "biryani", "khichuri", "bhorta", "dessert",
+        "what can i", "how to make", "how do i make",
+    ],
+    "PRODUCT_QUERY": [
+        "price", "cost", "how much", "available", "availability", "in stock", "stock",
+        "buy", "sell", "show me", "do you have", "products", "taka", "৳",
+    ],
+    "SUPPORT_QUERY": [
+        "delivery", "deliver", "refund", "return", "policy", "order", "cancel", "payment",
+        "bkash", "support", "hotline", "complaint", "damaged", "late", "slot", "charge",
+    ],
+    "OTHER": [
+        "hello", "hi", "hey", "thanks", "thank you", "who are you", "good morning", "bye",
+    ],
+}
+
+_PATTERNS = {
+    intent: [re.compile(r"(?<!\w)" + re.escape(word) + r"(?!\w)") for word in words]
+    for intent, words in INTENT_KEYWORDS.items()
+}
+
+# Ties resolve in this order, mirroring the orchestrator's routing precedence
+_PRECEDENCE = ("COOKING_QUERY", "SUPPORT_QUERY", "PRODUCT_QUERY", "OTHER")
+
+
+def keyword_scores(user_query: str) -> Dict[str, int]:
+    text = user_query.lower()
+    return {intent: sum(1 for p in patterns if p.search(text)) for intent, patterns in _PATTERNS.items()}
+
+
+def keyword_classify(user_query: str) -> str:
+    """Return the intent with the most keyword hits, or OTHER if nothing matches."""
+    scores = keyword_scores(user_query)
+    best = max(scores.values())
+    if best == 0:
+        return "OTHER"
+    return next(intent for intent in _PRECEDENCE if scores[intent] == best)
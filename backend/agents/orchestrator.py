@@ -1,13 +1,42 @@
+import contextvars
+import logging
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from phi.agent import Agent
-from backend.model import get_model
+from backend.model import get_model, resolve_model_id
 from backend.agents.chef import chef_logic
 from backend.agents.support import get_support_agent
 from backend.agents.product import product_search_logic
+from backend.agents.product_fast_path import answer_product_query
+from backend.agents.intent import keyword_scores
+from backend.database.retrieval import Retrieval, format_products, prefetch_enabled, retrieve
+from backend.database import offline
+from backend.singleflight import WaitTimeout, coalesce
+from backend import deadline, tool_cache
+from backend.deadline import DeadlineExceeded
+from backend.profiling import traced
+from backend.llm_scheduler import CRITICAL, HIGH, LOW, NORMAL, RequestShed, priority_for_query, set_priority
 
-def get_orchestrator_agent():
+BUSY_MESSAGE = """### ⏳ We're a Little Busy Right Now
+
+Lots of customers are chatting with us at the moment, so I couldn't get to your question in time. 🙏
+
+Please try again in a few seconds, or call **16716** for immediate assistance. 😊"""
+
+TIMEOUT_MESSAGE = """### ⏱️ This One Is Taking Too Long
+
+Sorry, I couldn't finish your answer in time. 🙏 Please try again, or ask something a little more specific.
+
+You can also call **16716** for immediate assistance. 😊"""
+
+logger = logging.getLogger(__name__)
+
+def get_orchestrator_agent(role: str = "router"):
     return Agent(
         name="Orchestrator",
-        model=get_model(),
+        model=get_model(role),
         description="You are a friendly AI assistant for recipe - Bangladesh's leading online grocery platform. You help customers with recipes, products, and support.",
         instructions=[
             "If the user asks about cooking, recipes, or mentions ingredients they have, route to the Chef Logic.",
@@ -21,11 +50,8 @@ def get_orchestrator_agent():
         markdown=True
     )
 
-def handle_request(user_query: str):
-    agent = get_orchestrator_agent()
-    
-    # Intent classification
-    classification_prompt = f"""
+def build_classification_prompt(user_query: str) -> str:
+    return f"""
     Classify the following user query into one of these categories:
     
     1. COOKING_QUERY - User wants recipe suggestions, cooking ideas, or meal planning
@@ -58,19 +84,188 @@ def handle_request(user_query: str):
     
     User Query: "{user_query}"
     
-    Return ONLY the category name (COOKING_QUERY, PRODUCT_QUERY, SUPPORT_QUERY, or OTHER).
+    If the query asks for two or more different things (e.g. a recipe AND delivery information),
+    return one line per part, as the category name, a colon and that part of the question:
+    COOKING_QUERY: give me a hilsa recipe
+    SUPPORT_QUERY: do you deliver tonight
+    
+    Otherwise return ONLY the category name (COOKING_QUERY, PRODUCT_QUERY, SUPPORT_QUERY, or OTHER).
+    """
+
+INTENTS = ("COOKING_QUERY", "PRODUCT_QUERY", "SUPPORT_QUERY", "OTHER")
+
+def parse_intent(classifier_output: str) -> str:
+    """Map the classifier's raw reply onto one of INTENTS (same precedence as routing)."""
+    text = classifier_output.strip()
+    for intent in ("COOKING_QUERY", "SUPPORT_QUERY", "PRODUCT_QUERY"):
+        if intent in text:
+            return intent
+    return "OTHER"
+
+_INTENT_LINE = re.compile(r"^\W*(COOKING_QUERY|PRODUCT_QUERY|SUPPORT_QUERY|OTHER)\W*:\s*(.+?)\s*$", re.MULTILINE)
+
+def parse_intents(classifier_output: str, user_query: str) -> List[Tuple[str, str]]:
+    """
+    (intent, part of the question) for each distinct thing the query asks.
+
+    A plain single-label reply gives [(parse_intent(...), user_query)]. OTHER is
+    dropped when it comes with a real intent ("hi! how much is hilsa?").
+    """
+    parts: List[Tuple[str, str]] = []
+    for intent, sub_query in _INTENT_LINE.findall(classifier_output):
+        existing = next((i for i, (seen, _) in enumerate(parts) if seen == intent), None)
+        if existing is None:
+            parts.append((intent, sub_query))
+        else:
+            parts[existing] = (intent, f"{parts[existing][1]} and {sub_query}")
+    if len(parts) > 1:
+        parts = [(intent, sub_query) for intent, sub_query in parts if intent != "OTHER"] or parts[:1]
+    if len(parts) <= 1:
+        return [(parse_intent(classifier_output), user_query)]
+    return parts
+
+def multi_intent_enabled() -> bool:
+    return os.getenv("MULTI_INTENT", "true").lower() in ("1", "true", "yes")
+
+# Retrieval runs alongside intent classification; by the time the route is known
+# the recipes/products/policies for the query are usually already here.
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_WORKERS", "8")), thread_name_prefix="retrieval"
+)
+
+# Intents whose agents read the prefetched rows; general chat (OTHER) doesn't
+RETRIEVAL_INTENTS = ("COOKING_QUERY", "PRODUCT_QUERY", "SUPPORT_QUERY")
+
+def _needs_retrieval(user_query: str) -> bool:
+    """False only for plain small talk ("hi", "thanks"): greeting words and nothing else."""
+    scores = keyword_scores(user_query)
+    return scores["OTHER"] == 0 or any(scores[intent] for intent in RETRIEVAL_INTENTS)
+
+def _start_retrieval(user_query: str, intent: Optional[str] = None) -> Optional[Future]:
+    """Start retrieving for `user_query`; with `intent` known, only if that intent's agent reads the rows."""
+    if not prefetch_enabled():
+        return None
+    if intent is not None:
+        if intent not in RETRIEVAL_INTENTS:
+            return None
+    elif not _needs_retrieval(user_query):
+        # The classifier can still pick another route; its agent then searches on its own
+        logger.debug("Skipping retrieval prefetch for small talk")
+        return None
+    # Copy the context so the prefetch logs under the caller's request ID
+    return _retrieval_pool.submit(contextvars.copy_context().run, traced(retrieve), user_query)
+
+def _await_retrieval(future: Optional[Future]) -> Optional[Retrieval]:
+    """The prefetched Retrieval, or None if disabled, failed or still not back after RETRIEVAL_WAIT_S."""
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=deadline.capped(float(os.getenv("RETRIEVAL_WAIT_S", "2"))))
+    except Exception as e:
+        logger.info(f"Retrieval prefetch not used: {e!r}")
+        return None
+
+def route_request(user_query: str) -> Tuple[str, str]:
     """
+    Classify the query, run the matching agent and return (route, response).
+
+    route is the detected intent (COOKING_QUERY, PRODUCT_QUERY, SUPPORT_QUERY,
+    OTHER) or BUSY / UNAVAILABLE / TIMEOUT when classification could not run.
+    Answers built from local data in degraded mode end with offline.STALE_NOTICE.
+    """
+    deadline_token = deadline.ensure_started()
+    try:
+        try:
+            route, response, cut_short = _shared_route(user_query)
+        except WaitTimeout:
+            # An identical question is still running, but our own budget is spent
+            return "TIMEOUT", TIMEOUT_MESSAGE
+        left = deadline.remaining()
+        if cut_short and left is not None and left > 0:
+            # We joined a run whose (shorter) deadline cut it short; answer with our own budget
+            route, response, _ = _run_route(user_query)
+        return route, response
+    finally:
+        deadline.reset(deadline_token)
+
+# Identical concurrent questions (after lowercasing/whitespace folding) share one
+# classification + agent run instead of each paying for their own LLM calls.
+# Joining callers wait no longer than their own deadline.
+@coalesce("handle_request", wait_timeout=deadline.remaining)
+def _shared_route(user_query: str) -> Tuple[str, str, bool]:
+    return _run_route(user_query)
+
+def _run_route(user_query: str) -> Tuple[str, str, bool]:
+    """(route, response, whether the deadline ran out while answering)."""
+    token = offline.begin_request()
+    tools_token = tool_cache.begin_request()
+    try:
+        route, response = _route(user_query)
+        if offline.served_stale():
+            response += offline.STALE_NOTICE
+        left = deadline.remaining()
+        return route, response, left is not None and left <= 0
+    finally:
+        tool_cache.end_request(tools_token)
+        offline.end_request(token)
+
+def partial_answer(intent: str, retrieval: Optional[Retrieval]) -> str:
+    """What we can say from the prefetched rows when the deadline ran out before the agent finished."""
+    if retrieval and intent == "COOKING_QUERY" and retrieval.recipes:
+        lines = ["### ⏱️ Here's What I Found So Far", "",
+                 "I ran out of time before writing up full recipes, but these look like a good match: 👨‍🍳", ""]
+        for row in retrieval.recipes[:3]:
+            meta = row.get("metadata") or {}
+            lines.append(f"- **{meta.get('title', 'Recipe')}**: {meta.get('description', '')}")
+            if meta.get("ingredients"):
+                lines.append(f"  - Ingredients: {', '.join(meta['ingredients'])}")
+        lines += ["", "Ask me about any of them for the full instructions! 😊"]
+        return "\n".join(lines)
+    if retrieval and intent == "PRODUCT_QUERY" and retrieval.products:
+        return ("### ⏱️ Here's What I Found So Far\n\n"
+                "I ran out of time before checking everything, but here are the closest matches: 🛍️\n\n"
+                f"{format_products(retrieval.products)}\n\nAsk again for more details! 😊")
+    if retrieval and intent == "SUPPORT_QUERY" and retrieval.policies:
+        articles = "\n\n".join(f"**{row.get('title', 'Policy')}**\n{row.get('content', '')}" for row in retrieval.policies)
+        return ("### ⏱️ Here's What I Found So Far\n\n"
+                f"{articles}\n\nFor anything else, call **16716** (8 AM - 11 PM). 📞")
+    return TIMEOUT_MESSAGE
+
+def _route(user_query: str) -> Tuple[str, str]:
+    # Plain "is X available / how much is X" questions are answered from the
+    # catalog without classification or an agent run
+    try:
+        fast_answer = answer_product_query(user_query)
+    except Exception as e:
+        logger.warning(f"Product fast path failed, using the agent: {e}")
+        fast_answer = None
+    if fast_answer is not None:
+        return "PRODUCT_QUERY", fast_answer
+    
+    agent = get_orchestrator_agent()
+    # Checkout/support wording gets ahead of small talk when the LLM is rate limited
+    set_priority(priority_for_query(user_query))
+    
+    prefetch = _start_retrieval(user_query)
+    
+    # Intent classification
+    classification_prompt = build_classification_prompt(user_query)
     
     try:
         response = agent.run(classification_prompt)
-        intent = response.content.strip()
+        intent = parse_intent(response.content)
+    except RequestShed as e:
+        logger.warning(f"Intent classification shed: {e}")
+        return "BUSY", BUSY_MESSAGE
+    except DeadlineExceeded as e:
+        logger.warning(f"Intent classification cut off: {e}")
+        return "TIMEOUT", TIMEOUT_MESSAGE
     except Exception as e:
-        print(f"Error during intent classification: {e}")
+        logger.error(f"Error during intent classification: {e}")
         # Get the actual model being used
-        import os
-        model_name = os.getenv("OPENROUTER_MODEL", "google/gemini-2.0-flash-exp:free")
+        model_name = resolve_model_id("router")
         # Return a helpful error message
-        return f"""### ⚠️ Service Temporarily Unavailable
+        return "UNAVAILABLE", f"""### ⚠️ Service Temporarily Unavailable
 
 I'm having trouble connecting to the AI service right now. This could be due to:
 
@@ -90,22 +285,101 @@ I'm having trouble connecting to the AI service right now. This could be due to:
 
 Sorry for the inconvenience! 😊"""
     
-    if "COOKING_QUERY" in intent:
-        return chef_logic(user_query)
-    elif "SUPPORT_QUERY" in intent:
-        support_agent = get_support_agent()
-        try:
-            return support_agent.run(user_query).content
-        except Exception as e:
-            print(f"Error in support agent: {e}")
-            return "I'm having trouble processing your request. Please try again or contact support at 16716."
-    elif "PRODUCT_QUERY" in intent:
-        # Route to product search agent
-        return product_search_logic(user_query)
-    else:
-        # General chat
+    parts = parse_intents(response.content, user_query) if multi_intent_enabled() else [(intent, user_query)]
+    if len(parts) > 1:
+        return _fan_out(parts, prefetch)
+    return intent, _answer(intent, user_query, prefetch)
+
+def _answer(intent: str, user_query: str, prefetch: Optional[Future]) -> str:
+    """Run the agent for one intent; a partial answer if the request deadline runs out."""
+    retrieval = None
+    try:
+        if intent == "COOKING_QUERY":
+            set_priority(NORMAL)
+            retrieval = _await_retrieval(prefetch)
+            return chef_logic(user_query, recipes=retrieval.recipes if retrieval else None)
+        elif intent == "SUPPORT_QUERY":
+            set_priority(CRITICAL)
+            retrieval = _await_retrieval(prefetch)
+            if retrieval:
+                policies = retrieval.policies
+            elif offline.is_degraded():
+                policies = offline.local_data().search_policies(user_query)
+            else:
+                policies = None
+            support_agent = get_support_agent(policies=policies)
+            try:
+                return support_agent.run(user_query).content
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in support agent: {e}")
+                return "I'm having trouble processing your request. Please try again or contact support at 16716."
+        elif intent == "PRODUCT_QUERY":
+            # Route to product search agent
+            set_priority(HIGH)
+            retrieval = _await_retrieval(prefetch)
+            return product_search_logic(user_query, products=retrieval.products if retrieval else None)
+        else:
+            # General chat
+            set_priority(LOW)
+            try:
+                chat_agent = get_orchestrator_agent(role="chat")
+                return chat_agent.run(f"Answer this user query politely: {user_query}").content
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.exception(f"Error in general chat: {e}")
+                return "I'm having trouble processing your request. Please try again or contact support at 16716."
+    except DeadlineExceeded as e:
+        logger.warning(f"{intent} answer cut off by the request deadline: {e}")
+        return partial_answer(intent, retrieval)
+
+# Branches of a multi-intent query run side by side, so the answer takes as
+# long as the slowest branch rather than the sum
+_branch_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FANOUT_WORKERS", "16")), thread_name_prefix="fanout"
+)
+
+SECTION_FALLBACK = {
+    "COOKING_QUERY": "I couldn't put the recipe part together just now. Please ask me about it again! 👨‍🍳",
+    "PRODUCT_QUERY": "I couldn't check the products part just now. Please ask me about it again! 🛍️",
+    "SUPPORT_QUERY": "I couldn't look up the support part just now. Please call **16716** for help! 📞",
+}
+
+def _fan_out(parts: List[Tuple[str, str]], prefetch: Optional[Future]) -> Tuple[str, str]:
+    """Answer each (intent, part) concurrently and merge the sections in the order asked."""
+    # The shared prefetch ranked rows against the whole message; each branch
+    # retrieves for its own clause instead (a no-op if it already started)
+    if prefetch is not None:
+        prefetch.cancel()
+    # Each branch gets a copy of the request's context (deadline, request ID,
+    # tool-call reuse) and sets its own LLM priority
+    futures = [
+        _branch_pool.submit(
+            contextvars.copy_context().run, traced(_answer), intent, sub_query, _start_retrieval(sub_query, intent)
+        )
+        for intent, sub_query in parts
+    ]
+    sections = []
+    for (intent, _), future in zip(parts, futures):
         try:
-            return agent.run(f"Answer this user query politely: {user_query}").content
+            sections.append(future.result())
         except Exception as e:
-            print(f"Error in general chat: {e}")
-            return "I'm having trouble processing your request. Please try again or contact support at 16716."
+            logger.exception(f"{intent} branch of a multi-intent query failed: {e}")
+            sections.append(SECTION_FALLBACK.get(intent, "I'm having trouble with part of your request."))
+    return "+".join(intent for intent, _ in parts), "\n\n---\n\n".join(sections)
+
+def handle_request(user_query: str, deadline_s: Optional[float] = None):
+    """
+    Answer a chat message.
+
+    Args:
+        user_query: The customer's message
+        deadline_s: Time budget for the whole answer (default REQUEST_DEADLINE_S)
+    """
+    token = deadline.start(deadline_s) if deadline_s else None
+    try:
+        return route_request(user_query)[1]
+    finally:
+        deadline.reset(token)
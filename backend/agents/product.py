@@ -1,22 +1,30 @@
 """
 Product Agent - Handles product search and availability queries
 """
+import logging
+from typing import List, Optional
 from phi.agent import Agent
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
+    from backend.deadline import DeadlineExceeded, tool_call_limit
     from backend.model import get_model
+    from backend.database.retrieval import format_products
     from backend.tools.product_search import search_products, get_available_products
 except ModuleNotFoundError:
+    from deadline import DeadlineExceeded, tool_call_limit
     from model import get_model
+    from database.retrieval import format_products
     from tools.product_search import search_products, get_available_products
 
+logger = logging.getLogger(__name__)
+
 def get_product_agent():
     return Agent(
         name="Product Agent",
-        model=get_model(),
+        model=get_model("product"),
         description="You are a friendly, enthusiastic Product Search Agent for recipe - Bangladesh's leading online grocery platform.",
         instructions=[
             "You help customers discover products with warmth and excitement!",
@@ -44,13 +52,19 @@ def get_product_agent():
             "Use line breaks and spacing to make responses easy to scan."
         ],
         tools=[search_products, get_available_products],
+        tool_call_limit=tool_call_limit("product"),
         markdown=True,
         show_tool_calls=False
     )
 
-def product_search_logic(user_query: str):
+def product_search_logic(user_query: str, products: Optional[List[dict]] = None):
     """
     Handle product search queries with beautiful, engaging responses
+
+    Args:
+        user_query: The customer's message
+        products: Closest catalog rows from retrieve_all, given to the agent as
+                  a starting point so a name search only happens when needed
     """
     try:
         agent = get_product_agent()
@@ -89,12 +103,21 @@ def product_search_logic(user_query: str):
         
         Make it feel personal, warm, and helpful - like chatting with a friendly shopkeeper who knows their products!
         """
+        if products:
+            prompt += f"""
+        Closest catalog matches for this query (current price and stock). Use these
+        directly if they answer the question; search only for anything missing:
+{format_products(products)}
+        """
         
         response = agent.run(prompt)
         return response.content
         
+    except DeadlineExceeded:
+        # The orchestrator answers with what was already retrieved
+        raise
     except Exception as e:
-        print(f"Error in product search: {e}")
+        logger.exception(f"Error in product search: {e}")
         return """### 🛍️ Oops! Having Trouble Accessing Products
 
 I'd love to help you find what you're looking for, but I'm having trouble connecting to our product database right now. 😔
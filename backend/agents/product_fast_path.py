@@ -0,0 +1,221 @@
+"""
+LLM-free answers for plain product availability / price questions
+
+"Is hilsa available?", "Price of Chinigura rice", "Do you have mustard oil and
+ghee?" only need names, prices and stock, which the catalog already has. For
+those, match the product terms against the cached catalog and render the same
+markdown layout product_search_logic asks the agent for, in milliseconds and
+without any LLM call. Anything open-ended (recommendations, comparisons,
+recipes, policies) or with a term we can't match goes to the agent as before.
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from backend.agents.intent import keyword_scores
+    from backend.database.catalog_cache import get_product_catalog
+except ModuleNotFoundError:
+    from agents.intent import keyword_scores
+    from database.catalog_cache import get_product_catalog
+
+CATEGORY_EMOJI = {
+    "Fish": "🐟",
+    "Meat": "🥩",
+    "Vegetables": "🥬",
+    "Fruits": "🍎",
+    "Dairy": "🥛",
+    "Grains": "🍚",
+    "Bakery": "🍞",
+    "Beverage": "☕",
+    "Snacks": "🍪",
+    "Spices": "🌶️",
+    "Condiments": "🧂",
+    "Essentials": "🛒",
+    "Packaged": "📦",
+}
+DEFAULT_EMOJI = "🛒"
+LOW_STOCK = 10
+MAX_PER_TERM = 10
+
+# Plain "do you have X / how much is X" shapes; `items` is what they ask about
+_QUESTION_PATTERNS = [re.compile(p) for p in (
+    r"^(?:is|are) (?:there )?(?:any )?(?P<items>.+?) (?:available|in stock)$",
+    r"^(?:do|does) (?:you|recipe) (?:have|sell|stock|carry) (?P<items>.+?)(?: in stock| available)?$",
+    r"^how much (?:is|are|does|do) (?P<items>.+?)(?: costs?)?$",
+    r"^(?:what(?:'s| is) the )?prices? (?:of|for) (?P<items>.+)$",
+    r"^what (?P<items>.+?) do you (?:have|sell|stock|carry)$",
+    r"^(?:show|list) (?:me )?(?:all )?(?:of )?(?:your |the )?(?P<items>.+?)(?: you have| do you have)?$",
+    r"^i (?:want|need|would like)(?: to buy| to order)? (?P<items>.+)$",
+    r"^(?P<items>.+?) (?:price|prices|available|in stock)$",
+    r"^(?P<items>[a-z][a-z ]{1,30})$",  # bare "hilsa" / "eggs", only if every word matches
+)]
+
+# Anything that asks for judgement rather than a lookup
+_OPEN_ENDED = re.compile(
+    r"\b(?:best|cheapest|cheaper|recommend|suggest|compare|vs|versus|difference|healthy|healthier|"
+    r"good for|which|why|should|under|below|above|alternative|instead|substitute|quality)\b"
+)
+_TRAILING = re.compile(r"\s+(?:today|now|right now|please|pls|currently|at the moment)$")
+_QUANTITY = re.compile(r"^\d+(?:\.\d+)?\s*(?:kg|g|gm|gram|grams|l|ltr|litre|liter|pcs|pieces|dozen|packs?)?\s+(?:of\s+)?")
+_LEADING = re.compile(r"^(?:some|any|the|a|an|all|your|fresh|of)\s+")
+_SPLIT = re.compile(r"\s*(?:,|&|/|\band\b|\bor\b)\s*")
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.answered = 0
+        self.declined = 0
+
+    def record(self, answered: bool):
+        with self._lock:
+            if answered:
+                self.answered += 1
+            else:
+                self.declined += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"answered": self.answered, "declined": self.declined}
+
+
+_stats = _Stats()
+
+
+def enabled() -> bool:
+    return os.getenv("PRODUCT_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+
+def _clean_term(term: str) -> str:
+    term = _QUANTITY.sub("", term.strip())
+    while True:
+        stripped = _LEADING.sub("", term)
+        if stripped == term:
+            return term.strip()
+        term = stripped
+
+
+def extract_product_terms(user_query: str) -> Optional[List[str]]:
+    """The product terms of a plain availability/price question, or None if it isn't one."""
+    text = re.sub(r"[?!.]+", " ", user_query.lower()).strip()
+    text = re.sub(r"\s+", " ", text)
+    if not text or _OPEN_ENDED.search(text):
+        return None
+    scores = keyword_scores(text)
+    if scores["COOKING_QUERY"] or scores["SUPPORT_QUERY"]:
+        return None
+    text = _TRAILING.sub("", text)
+
+    for pattern in _QUESTION_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            terms = [_clean_term(t) for t in _SPLIT.split(match.group("items"))]
+            terms = [t for t in terms if t]
+            if 0 < len(terms) <= 5 and all(len(t.split()) <= 4 for t in terms):
+                return terms
+            return None
+    return None
+
+
+def _word_variants(word: str) -> List[str]:
+    variants = {word, word + "s"}
+    if word.endswith("es") and len(word) > 4:
+        variants.add(word[:-2])
+    if word.endswith("s") and len(word) > 3:
+        variants.add(word[:-1])
+    return sorted(variants)
+
+
+def match_products(term: str, catalog: Sequence[dict]) -> List[dict]:
+    """Catalog rows whose name or category contains every word of `term` (whole words, plural-insensitive)."""
+    word_patterns = [
+        re.compile(r"\b(?:" + "|".join(re.escape(v) for v in _word_variants(w)) + r")\b")
+        for w in term.split()
+    ]
+    matches = [
+        p for p in catalog
+        if all(wp.search(f"{p['name']} {p.get('category') or ''}".lower()) for wp in word_patterns)
+    ]
+    # Same order as search_products: in-stock first
+    matches.sort(key=lambda p: -(p.get("stock_quantity") or 0))
+    return matches[:MAX_PER_TERM]
+
+
+def _join(terms: Sequence[str]) -> str:
+    return terms[0] if len(terms) == 1 else f"{', '.join(terms[:-1])} and {terms[-1]}"
+
+
+def _price(value) -> str:
+    value = float(value)
+    return f"{value:.0f}" if value.is_integer() else f"{value:.2f}"
+
+
+def render_products(terms: Sequence[str], products: Sequence[dict]) -> str:
+    """The layout product_search_logic's prompt asks for, filled in from catalog rows."""
+    by_category: Dict[str, List[dict]] = {}
+    for p in products:
+        by_category.setdefault(p.get("category") or "Other", []).append(p)
+
+    first_emoji = CATEGORY_EMOJI.get(next(iter(by_category)), DEFAULT_EMOJI)
+    lines = [f"Great choice! Here's what we have for {_join(terms)} today {first_emoji}", ""]
+
+    for category, items in by_category.items():
+        available = [p for p in items if (p.get("stock_quantity") or 0) > 0]
+        out_of_stock = [p for p in items if (p.get("stock_quantity") or 0) <= 0]
+        lines.append(f"### {CATEGORY_EMOJI.get(category, DEFAULT_EMOJI)} {category} Products")
+        lines.append("")
+        if available:
+            lines.append("**✨ Available Now:**")
+            for p in available:
+                lines.append(f"- **{p['name']}** - ৳{_price(p['price'])} (Stock: {p['stock_quantity']} units) ✅")
+            lines.append("")
+        if out_of_stock:
+            lines.append("**📦 Currently Out of Stock:**")
+            for p in out_of_stock:
+                lines.append(f"- **{p['name']}** - ৳{_price(p['price'])} ❌")
+            lines.append("")
+
+    stock = [p.get("stock_quantity") or 0 for p in products]
+    if any(s <= 0 for s in stock):
+        lines.append("Sorry, some of these are out of stock right now 😔 Let me know if you'd like an alternative!")
+    elif any(s < LOW_STOCK for s in stock):
+        lines.append("Limited stock on some items, so grab them while they last! ⏳")
+    else:
+        lines.append("Everything's in stock and ready for delivery! ✨")
+    lines.append("")
+    lines.append("Want me to suggest some delicious recipes with these? 👨‍🍳 Or shall I help you add them to your cart? 🛒")
+    return "\n".join(lines)
+
+
+def answer_product_query(user_query: str) -> Optional[str]:
+    """
+    Templated answer for a plain availability/price question, or None when the
+    query needs the product agent (open-ended, or a term with no catalog match).
+    """
+    if not enabled():
+        return None
+    terms = extract_product_terms(user_query)
+    if not terms:
+        _stats.record(False)
+        return None
+
+    catalog = get_product_catalog()
+    products, seen = [], set()
+    for term in terms:
+        matches = match_products(term, catalog)
+        if not matches:
+            _stats.record(False)
+            return None
+        for p in matches:
+            if p["name"] not in seen:
+                seen.add(p["name"])
+                products.append(p)
+
+    _stats.record(True)
+    return render_products(terms, products)
+
+
+def get_stats() -> Dict[str, int]:
+    return _stats.snapshot()
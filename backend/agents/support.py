@@ -1,5 +1,7 @@
+from typing import List, Optional
 from phi.agent import Agent
 from backend.model import get_model
+from backend.database.retrieval import format_policies
 
 SUPPORT_KNOWLEDGE = """
 [RETURN POLICY]
@@ -24,10 +26,18 @@ SUPPORT_KNOWLEDGE = """
 - Live Chat: Available in the app menu.
 """
 
-def get_support_agent():
+def get_support_agent(policies: Optional[List[dict]] = None):
+    """
+    Args:
+        policies: knowledge_base policy rows relevant to the query (from
+                  retrieve_all), added to the built-in knowledge
+    """
+    context = SUPPORT_KNOWLEDGE
+    if policies:
+        context += "\n[RELATED POLICY ARTICLES]\n" + format_policies(policies)
     return Agent(
         name="Support Agent",
-        model=get_model(),
+        model=get_model("support"),
         description="You are a helpful, friendly, and professional Customer Support Agent for recipe.",
         instructions=[
             "You answer questions about policies, delivery, refunds, and support.",
@@ -45,6 +55,6 @@ def get_support_agent():
             "End with a friendly closing and offer further assistance."
         ],
         # We can pass the knowledge as context in instructions or system prompt
-        additional_context=SUPPORT_KNOWLEDGE,
+        additional_context=context,
         markdown=True
     )
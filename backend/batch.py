@@ -0,0 +1,195 @@
+"""
+Bulk query processing for offline evaluation.
+
+Runs many queries through the orchestrator with bounded concurrency and yields
+one result per query as soon as it finishes, followed by a summary with
+throughput and per-route latency distributions.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from backend.singleflight import normalize_text
+    from backend.structured_logging import new_request_id, reset_request_id, set_request_id
+except ModuleNotFoundError:
+    from singleflight import normalize_text
+    from structured_logging import new_request_id, reset_request_id, set_request_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+
+def parse_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Parse batch input. Each non-empty line is either a JSON object with a
+    "message" (or "query") field and an optional "id", or a bare JSON string.
+    """
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"id": line_no, "error": f"invalid JSON: {e}"}
+            continue
+        if not isinstance(record, (dict, str)):
+            yield {"id": line_no, "error": "expected a JSON object or string"}
+            continue
+        if isinstance(record, str):
+            record = {"message": record}
+        message = record.get("message") or record.get("query")
+        item = {"id": record.get("id", line_no), "message": message}
+        if not message:
+            item["error"] = "missing 'message'"
+        yield item
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100.0 * len(values)))]
+
+
+class BatchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies: Dict[str, List[float]] = {}
+        self.total = 0
+        self.errors = 0
+        self.deduplicated = 0
+
+    def record(self, result: Dict[str, Any]):
+        self.total += 1
+        if result.get("error"):
+            self.errors += 1
+            return
+        if result.get("deduplicated"):
+            self.deduplicated += 1
+        self.latencies.setdefault(result["route"], []).append(result["latency_ms"])
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        routes = {
+            route: {
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values), 1),
+                "p50_ms": round(_percentile(values, 50), 1),
+                "p95_ms": round(_percentile(values, 95), 1),
+                "p99_ms": round(_percentile(values, 99), 1),
+                "max_ms": round(max(values), 1),
+            }
+            for route, values in sorted(self.latencies.items())
+        }
+        return {
+            "type": "summary",
+            "total": self.total,
+            "errors": self.errors,
+            "deduplicated": self.deduplicated,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_qps": round(self.total / elapsed, 3) if elapsed > 0 else None,
+            "routes": routes,
+        }
+
+
+def _default_router(message: str) -> Tuple[str, str]:
+    from backend.agents.orchestrator import route_request
+    return route_request(message)
+
+
+def run_batch(
+    items: Iterable[Dict[str, Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    router: Optional[Callable[[str], Tuple[str, str]]] = None,
+    request_id: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run queries with bounded concurrency, yielding results in completion order.
+
+    Identical queries (after normalization) inside one batch are computed once
+    and the result is shared. The last item yielded is the summary.
+
+    Args:
+        items: Parsed input records (see parse_jsonl)
+        concurrency: Maximum number of queries in flight
+        router: Function returning (route, response); defaults to route_request
+        request_id: Batch request ID; item logs are tagged "<request_id>:<item id>"
+    """
+    router = router or _default_router
+    concurrency = max(1, min(concurrency, MAX_CONCURRENCY))
+    stats = BatchStats()
+    shared: Dict[str, Future] = {}
+    shared_lock = threading.Lock()
+    batch_id = request_id or new_request_id()
+
+    def process(item: Dict[str, Any]) -> Dict[str, Any]:
+        token = set_request_id(f"{batch_id}:{item['id']}")
+        try:
+            return _process(item)
+        finally:
+            reset_request_id(token)
+
+    def _process(item: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"id": item["id"], "message": item.get("message")}
+        if item.get("error"):
+            result["error"] = item["error"]
+            return result
+
+        key = normalize_text(item["message"])
+        with shared_lock:
+            existing = shared.get(key)
+            if existing is None:
+                own = shared[key] = Future()
+        started = time.perf_counter()
+        try:
+            if existing is not None:
+                route, response = existing.result()
+                result["deduplicated"] = True
+            else:
+                try:
+                    route, response = router(item["message"])
+                except BaseException as e:
+                    own.set_exception(e)
+                    raise
+                own.set_result((route, response))
+            result.update(route=route, response=response)
+        except Exception as e:
+            logger.warning(f"Batch item {item['id']} failed: {e}")
+            result["error"] = str(e)
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        pending = set()
+        for item in items:
+            # Keep a bounded window so a huge input file isn't queued up front
+            if len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    stats.record(result)
+                    yield result
+            pending.add(executor.submit(process, item))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                stats.record(result)
+                yield result
+
+    yield stats.summary()
+
+
+def run_batch_jsonl(
+    lines: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY, request_id: Optional[str] = None
+) -> Iterator[str]:
+    """JSONL in, JSONL out: the streaming form used by /chat/batch and the CLI."""
+    for result in run_batch(parse_jsonl(lines), concurrency=concurrency, request_id=request_id):
+        yield json.dumps(result, ensure_ascii=False) + "\n"
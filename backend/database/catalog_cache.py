@@ -0,0 +1,152 @@
+"""
+In-process product catalog cache
+
+check_inventory needs the whole (small) product table to fuzzy-match
+ingredient names. Instead of downloading it on every call, keep one copy per
+worker and drop it when the change feed reports a write to `products`.
+A TTL bounds staleness when no change feed is running.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from backend.database.change_feed import InvalidationEvent, get_change_feed
+    from backend.database.offline import with_fallback
+    from backend.database.projections import DOCUMENT_SUMMARY, PRODUCT_CATALOG, CatalogProduct
+    from backend.database.snapshot import get_snapshot
+    from backend.singleflight import get_group
+except ModuleNotFoundError:
+    from database.change_feed import InvalidationEvent, get_change_feed
+    from database.offline import with_fallback
+    from database.projections import DOCUMENT_SUMMARY, PRODUCT_CATALOG, CatalogProduct
+    from database.snapshot import get_snapshot
+    from singleflight import get_group
+
+logger = logging.getLogger(__name__)
+
+
+def _load_products() -> List[CatalogProduct]:
+    try:
+        from backend.database.connection import get_supabase_client
+    except ModuleNotFoundError:
+        from database.connection import get_supabase_client
+    return get_supabase_client().table("products").select(PRODUCT_CATALOG).execute().data or []
+
+
+def _load_recipes() -> List[Dict[str, Any]]:
+    try:
+        from backend.database.connection import get_supabase_client
+    except ModuleNotFoundError:
+        from database.connection import get_supabase_client
+    rows = get_supabase_client().table("documents").select(DOCUMENT_SUMMARY).execute().data or []
+    return [row["metadata"] for row in rows if row.get("metadata")]
+
+
+class CatalogCache:
+    def __init__(self, table: str, loader: Callable[[], List[Dict[str, Any]]], ttl_s: float):
+        self.table = table
+        self.loader = loader
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._rows: Optional[List[Dict[str, Any]]] = None
+        # Last successful load, kept through invalidations for degraded mode
+        self._last_rows: Optional[List[Dict[str, Any]]] = None
+        self._loaded_at = 0.0
+        self._version = -1
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def peek(self) -> Optional[List[Dict[str, Any]]]:
+        """The cached rows if still fresh, else None."""
+        feed_version = get_change_feed().version(self.table)
+        with self._lock:
+            fresh = (
+                self._rows is not None
+                and self._version == feed_version
+                and time.monotonic() - self._loaded_at < self.ttl_s
+            )
+            if fresh:
+                self.hits += 1
+                return self._rows
+        return None
+
+    def get(self) -> List[Dict[str, Any]]:
+        rows = self.peek()
+        if rows is not None:
+            return rows
+        feed_version = get_change_feed().version(self.table)
+        # Concurrent misses share one reload
+        return get_group(f"catalog:{self.table}").do(self.table, lambda: self._reload(feed_version))
+
+    def last_rows(self) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            return self._last_rows
+
+    def _reload(self, feed_version: int) -> List[Dict[str, Any]]:
+        rows = self.loader()
+        with self._lock:
+            self._rows = self._last_rows = rows
+            self._loaded_at = time.monotonic()
+            self._version = feed_version
+            self.loads += 1
+        return rows
+
+    def invalidate(self, event: Optional[InvalidationEvent] = None):
+        with self._lock:
+            self._rows = None
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rows": len(self._rows) if self._rows is not None else None,
+                "version": self._version,
+                "hits": self.hits,
+                "loads": self.loads,
+                "invalidations": self.invalidations,
+            }
+
+
+_products = CatalogCache("products", _load_products, ttl_s=float(os.getenv("CATALOG_CACHE_TTL_S", "60")))
+get_change_feed().subscribe(_products.invalidate, tables=("products",))
+
+
+def get_product_catalog() -> List[CatalogProduct]:
+    """
+    All products (PRODUCT_CATALOG columns): from the shared snapshot when one
+    is published (SNAPSHOT_ENABLED), else from the per-worker cache.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.product_rows()
+    rows = _products.peek()
+    if rows is not None:
+        return rows
+    # Supabase down or slow: the last rows this worker loaded, else the local copy
+    return with_fallback("catalog", _products.get, lambda data: _products.last_rows() or data.products)
+
+
+# Recipes (`documents`) are not on the change feed, so only the TTL bounds staleness
+_recipes = CatalogCache("documents", _load_recipes, ttl_s=float(os.getenv("RECIPE_CATALOG_TTL_S", "300")))
+
+
+def get_recipe_catalog() -> List[Dict[str, Any]]:
+    """
+    All recipe metadata dicts (title, description, ingredients, instructions),
+    from the shared snapshot when one is published, else the per-worker cache.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return [snapshot.recipe(i) for i in range(len(snapshot.recipes))]
+    rows = _recipes.peek()
+    if rows is not None:
+        return rows
+    return with_fallback("recipe_catalog", _recipes.get, lambda data: _recipes.last_rows() or data.recipes)
+
+
+def get_stats() -> Dict[str, Any]:
+    return {"products": _products.stats(), "recipes": _recipes.stats()}
@@ -0,0 +1,253 @@
+"""
+Catalog change feed
+
+Turns changes to `products` and `knowledge_base` into versioned invalidation
+events for in-process caches. Two sources feed it:
+
+- ListenSource: Postgres LISTEN on the 'catalog_changes' channel, populated by
+  the triggers in migrations/20261019_catalog_change_feed.sql. Needs a direct
+  connection string in DATABASE_URL.
+- PollingSource: fallback that watches max(updated_at) and the row count of
+  each table through the Supabase client.
+
+Caches call `get_change_feed().subscribe(...)` to be told when to drop entries,
+and can compare `version(table)` to detect that they are stale.
+"""
+import json
+import logging
+import os
+import select
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "catalog_changes"
+WATCHED_TABLES = ("products", "knowledge_base")
+
+
+@dataclass(frozen=True)
+class InvalidationEvent:
+    table: str
+    version: int
+    op: str  # INSERT / UPDATE / DELETE, or POLL when the poller saw an unspecified change
+    ids: Tuple[str, ...] = field(default_factory=tuple)
+    source: str = "listen"
+
+
+Subscriber = Callable[[InvalidationEvent], None]
+
+
+class ChangeFeed:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {table: 0 for table in WATCHED_TABLES}
+        self._subscribers: List[Tuple[Optional[Tuple[str, ...]], Subscriber]] = []
+        self._sources: List["_Source"] = []
+        self.events_published = 0
+
+    def subscribe(self, callback: Subscriber, tables: Optional[Tuple[str, ...]] = None):
+        """
+        Register a cache invalidation callback.
+
+        Args:
+            callback: Called with every InvalidationEvent (from the feed's thread)
+            tables: Only deliver events for these tables (default: all)
+        """
+        with self._lock:
+            self._subscribers.append((tuple(tables) if tables else None, callback))
+
+    def version(self, table: str) -> int:
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def publish(self, table: str, op: str, ids: Tuple[str, ...] = (), source: str = "listen") -> InvalidationEvent:
+        with self._lock:
+            version = self._versions.get(table, 0) + 1
+            self._versions[table] = version
+            self.events_published += 1
+            subscribers = [cb for tables, cb in self._subscribers if tables is None or table in tables]
+        event = InvalidationEvent(table=table, version=version, op=op, ids=tuple(ids), source=source)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.warning(f"Change feed subscriber {callback!r} failed on {event}: {e}")
+        return event
+
+    @property
+    def running(self) -> bool:
+        return any(source.is_alive() for source in self._sources)
+
+    def has_running(self, source_type: type) -> bool:
+        return any(isinstance(s, source_type) and s.is_alive() for s in self._sources)
+
+    def start(self, source: "_Source"):
+        self._sources.append(source)
+        source.start()
+
+    def stop(self):
+        for source in self._sources:
+            source.stop()
+        self._sources = []
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            versions = dict(self._versions)
+        return {
+            "sources": [s.name for s in self._sources if s.is_alive()],
+            "versions": versions,
+            "events_published": self.events_published,
+        }
+
+
+class _Source(threading.Thread):
+    def __init__(self, feed: ChangeFeed, name: str):
+        super().__init__(name=name, daemon=True)
+        self.feed = feed
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ListenSource(_Source):
+    """Receives trigger notifications over a dedicated Postgres connection."""
+
+    def __init__(self, feed: ChangeFeed, dsn: str, on_failure: Optional[Callable[[], None]] = None):
+        super().__init__(feed, "change-feed-listen")
+        self.dsn = dsn
+        self.on_failure = on_failure
+
+    def run(self):
+        import psycopg2
+
+        backoff = 1.0
+        failures = 0
+        while not self._stop_event.is_set():
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL};")
+                logger.info(f"Change feed listening on Postgres channel '{CHANNEL}'")
+                # Anything may have changed while we were disconnected
+                for table in WATCHED_TABLES:
+                    self.feed.publish(table, "RESYNC", source="listen")
+                backoff, failures = 1.0, 0
+                self._listen(conn)
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Change feed LISTEN connection failed ({failures}): {e}")
+                if failures == 3 and self.on_failure is not None:
+                    self.on_failure()
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _listen(self, conn):
+        try:
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._handle(notify.payload)
+        finally:
+            conn.close()
+
+    def _handle(self, payload: str):
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed change feed payload: {payload!r}")
+            return
+        table = data.get("table")
+        if table:
+            ids = (data["id"],) if data.get("id") else ()
+            self.feed.publish(table, data.get("op", "UPDATE"), ids, source="listen")
+
+
+def supabase_marker(table: str):
+    """(max updated_at, row count) for a table; changes whenever a row is written or deleted."""
+    try:
+        from backend.database.connection import get_supabase_client
+    except ModuleNotFoundError:
+        from database.connection import get_supabase_client
+
+    response = (
+        get_supabase_client()
+        .table(table)
+        .select("updated_at", count="exact")
+        .order("updated_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    latest = response.data[0]["updated_at"] if response.data else None
+    return latest, response.count
+
+
+class PollingSource(_Source):
+    """Fallback for deployments without LISTEN access: polls a cheap per-table marker."""
+
+    def __init__(self, feed: ChangeFeed, interval_s: float = 5.0, fetch_marker: Callable[[str], object] = supabase_marker):
+        super().__init__(feed, "change-feed-poll")
+        self.interval_s = interval_s
+        self.fetch_marker = fetch_marker
+        self._markers: Dict[str, object] = {}
+
+    def poll_once(self):
+        for table in WATCHED_TABLES:
+            try:
+                marker = self.fetch_marker(table)
+            except Exception as e:
+                logger.warning(f"Change feed poll of {table} failed: {e}")
+                continue
+            previous = self._markers.get(table)
+            self._markers[table] = marker
+            if previous is not None and marker != previous:
+                self.feed.publish(table, "POLL", source="poll")
+
+    def run(self):
+        logger.info(f"Change feed polling {', '.join(WATCHED_TABLES)} every {self.interval_s}s")
+        while not self._stop_event.is_set():
+            self.poll_once()
+            self._stop_event.wait(self.interval_s)
+
+
+_feed = ChangeFeed()
+
+
+def get_change_feed() -> ChangeFeed:
+    return _feed
+
+
+def start_change_feed(mode: Optional[str] = None) -> ChangeFeed:
+    """
+    Start the change feed according to CHANGE_FEED_MODE:
+    auto (LISTEN if DATABASE_URL is set, else polling), listen, poll or off.
+    """
+    feed = get_change_feed()
+    if feed.running:
+        return feed
+
+    mode = (mode or os.getenv("CHANGE_FEED_MODE", "auto")).lower()
+    dsn = os.getenv("DATABASE_URL")
+    interval = float(os.getenv("CHANGE_FEED_POLL_INTERVAL_S", "5"))
+
+    def fall_back_to_polling():
+        if feed.has_running(PollingSource):
+            return
+        logger.warning("Change feed LISTEN unavailable, falling back to polling")
+        feed.start(PollingSource(feed, interval_s=interval))
+
+    if mode == "off":
+        logger.info("Change feed disabled (CHANGE_FEED_MODE=off)")
+    elif mode in ("auto", "listen") and dsn:
+        feed.start(ListenSource(feed, dsn, on_failure=fall_back_to_polling if mode == "auto" else None))
+    elif mode == "listen":
+        logger.warning("CHANGE_FEED_MODE=listen but DATABASE_URL is not set; change feed not started")
+    else:
+        feed.start(PollingSource(feed, interval_s=interval))
+    return feed
@@ -0,0 +1,179 @@
+"""
+Micro-batching of query embeddings across concurrent requests
+
+The ONNX model embeds a batch of 16 queries in little more time than one, but
+every request path (recipe search, retrieve_all, DatabaseOperations) embeds a
+single query. EmbeddingBatcher puts those calls on a queue; one worker thread
+takes the first waiting query, keeps collecting for up to EMBED_BATCH_MAX_WAIT_MS
+or EMBED_BATCH_SIZE queries, embeds them in one call and resolves each
+caller's future.
+
+Under light load a query waits at most the max-wait (a couple of
+milliseconds) on top of its own embedding; under load, callers share model
+runs instead of queueing behind each other on the ONNX session.
+
+Callers that give up (embed() past EMBED_TIMEOUT_S or the request deadline,
+or an async caller whose wrapped future is cancelled) cancel their future; the
+worker drops cancelled queries instead of embedding them.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from backend import deadline
+except ModuleNotFoundError:
+    import deadline
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets (last bucket is open-ended)
+HISTOGRAM_BOUNDS = (1, 2, 4, 8, 16, 32, 64)
+
+EmbedFn = Callable[[Sequence[str]], List[List[float]]]
+
+
+def _bucket(size: int) -> str:
+    low = 1
+    for bound in HISTOGRAM_BOUNDS:
+        if size <= bound:
+            return str(bound) if low == bound else f"{low}-{bound}"
+        low = bound + 1
+    return f">{HISTOGRAM_BOUNDS[-1]}"
+
+
+class EmbeddingBatcher:
+    def __init__(self, embed_batch: EmbedFn, max_batch_size: int = 32, max_wait_s: float = 0.002,
+                 timeout_s: float = 30.0):
+        """
+        Args:
+            embed_batch: Embeds a list of query texts, returning one vector per text
+            max_batch_size: Most queries embedded in one model call
+            max_wait_s: How long the first query of a batch waits for company
+            timeout_s: Longest embed() waits for its vector (less if the request deadline is closer)
+        """
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self.timeout_s = timeout_s
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.restarts = 0
+        self.queue_wait_s = 0.0
+        self.embed_s = 0.0
+        self.histogram: Dict[str, int] = {_bucket(b): 0 for b in HISTOGRAM_BOUNDS}
+        self.histogram[_bucket(HISTOGRAM_BOUNDS[-1] + 1)] = 0
+
+    def _ensure_started(self):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    if self._thread is not None:
+                        logger.error("Embedding batcher thread died; restarting it")
+                        with self._stats_lock:
+                            self.restarts += 1
+                    self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        future = self.submit(text)
+        try:
+            return future.result(timeout=deadline.capped(self.timeout_s))
+        except FuturesTimeout:
+            # Still queued: the worker skips it
+            future.cancel()
+            deadline.check("query embedding")
+            raise
+
+    def _collect(self) -> List[Tuple[str, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Take whatever is already queued even once the wait is over
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # Whatever went wrong, fail this batch's callers and keep the worker alive
+                logger.exception(f"Embedding batch failed unexpectedly: {e}")
+                for _, future, _ in batch:
+                    if future.running():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch: List[Tuple[str, Future, float]]):
+        # Marks the rest as running, so a late cancel can't make set_result raise
+        live = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if len(live) < len(batch):
+            with self._stats_lock:
+                self.cancelled += len(batch) - len(live)
+        batch = live
+        if not batch:
+            return
+        texts = [text for text, _, _ in batch]
+        started = time.perf_counter()
+        try:
+            vectors = self.embed_batch(texts)
+            if len(vectors) != len(texts):
+                raise RuntimeError(f"Embedded {len(vectors)} vectors for {len(texts)} texts")
+            error = None
+        except Exception as e:
+            vectors, error = None, e
+            logger.warning(f"Batched embedding of {len(texts)} queries failed: {e}")
+        finished = time.perf_counter()
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.errors += error is not None
+            self.queue_wait_s += sum(started - enqueued for _, _, enqueued in batch)
+            self.embed_s += finished - started
+            self.histogram[_bucket(len(batch))] += 1
+
+        for i, (_, future, _) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(vectors[i])
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000,
+                "batches": self.batches,
+                "items": self.items,
+                "errors": self.errors,
+                "cancelled": self.cancelled,
+                "restarts": self.restarts,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+                "mean_queue_wait_ms": round(self.queue_wait_s / self.items * 1000, 3) if self.items else None,
+                "mean_embed_ms": round(self.embed_s / self.batches * 1000, 3) if self.batches else None,
+                "batch_size_histogram": dict(self.histogram),
+                "queued": self._queue.qsize(),
+            }
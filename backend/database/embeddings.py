@@ -0,0 +1,123 @@
+"""
+Shared query embedding model
+
+FastEmbedEmbeddings loads its ONNX model on construction, so creating one per
+search adds that load to every request. Everything that embeds queries at
+request time goes through the single lazily created instance here.
+
+embed_query() goes through the micro-batcher (embedding_batcher.py) so
+concurrent requests share model runs; EMBED_BATCHING=false embeds each query
+directly.
+
+The model and its ONNX runtime settings come from the environment
+(embedding_config()), and the seed/embedding scripts build their model the
+same way, so stored vectors and query vectors always match:
+
+    EMBED_MODEL            FastEmbed model name (default BAAI/bge-small-en-v1.5).
+                           The schema stores 384-d vectors; a model with another
+                           dimension needs the schema changed and a re-embed.
+    EMBED_THREADS          onnxruntime intra-op threads (default: onnxruntime's choice)
+    EMBED_DOC_BATCH_SIZE   texts per model run when embedding documents (default 256)
+    EMBED_MAX_LENGTH       tokens kept per text (default 512); shorter is faster
+    EMBED_CACHE_DIR        where model files are downloaded to
+
+scripts/benchmark_embeddings.py measures these settings on the recipe/product
+corpus.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+
+try:
+    from backend.database.embedding_batcher import EmbeddingBatcher
+except ModuleNotFoundError:
+    from database.embedding_batcher import EmbeddingBatcher
+
+_lock = threading.Lock()
+_embeddings = None
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+DEFAULT_MODEL = "BAAI/bge-small-en-v1.5"  # 384 dimensions
+
+
+def embedding_config() -> Dict[str, Any]:
+    """FastEmbedEmbeddings arguments from EMBED_* (unset ones keep FastEmbed's defaults)."""
+    threads = os.getenv("EMBED_THREADS")
+    return {
+        "model_name": os.getenv("EMBED_MODEL", DEFAULT_MODEL),
+        "threads": int(threads) if threads else None,
+        "batch_size": int(os.getenv("EMBED_DOC_BATCH_SIZE", "256")),
+        "max_length": int(os.getenv("EMBED_MAX_LENGTH", "512")),
+        "cache_dir": os.getenv("EMBED_CACHE_DIR") or None,
+    }
+
+
+def create_embeddings(**overrides: Any) -> FastEmbedEmbeddings:
+    """A new model with embedding_config(), plus any overrides (used by the benchmark)."""
+    return FastEmbedEmbeddings(**{**embedding_config(), **overrides})
+
+
+def get_embeddings() -> FastEmbedEmbeddings:
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = create_embeddings()
+    return _embeddings
+
+
+def embed_queries(texts: Sequence[str]) -> List[List[float]]:
+    """Query embeddings for several texts in one model call (same vectors as embed_query)."""
+    model = get_embeddings()
+    return [v.tolist() for v in model.model.query_embed(list(texts), batch_size=max(len(texts), 1))]
+
+
+def batching_enabled() -> bool:
+    return os.getenv("EMBED_BATCHING", "true").lower() in ("1", "true", "yes")
+
+
+def get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        with _lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher(
+                    embed_queries,
+                    max_batch_size=int(os.getenv("EMBED_BATCH_SIZE", "32")),
+                    max_wait_s=float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "2")) / 1000,
+                    timeout_s=float(os.getenv("EMBED_TIMEOUT_S", "30")),
+                )
+    return _batcher
+
+
+def embed_query(text: str) -> List[float]:
+    if batching_enabled():
+        return get_batcher().embed(text)
+    return list(get_embeddings().embed_query(text))
+
+
+async def aembed_query(text: str) -> List[float]:
+    """embed_query for async callers: awaits the batcher's future instead of blocking the event loop."""
+    if batching_enabled():
+        return await asyncio.wrap_future(get_batcher().submit(text))
+    return list(await asyncio.get_running_loop().run_in_executor(None, get_embeddings().embed_query, text))
+
+
+def vector_literal(values: List[float], digits: int = 5) -> str:
+    """
+    pgvector text form ("[0.0123,-0.045,...]") rounded to `digits` significant
+    digits. A JSON float list carries ~17 digits per value; halfvec/binary
+    searches can't use more than ~4, so this more than halves the RPC payload.
+    """
+    return "[" + ",".join(f"{v:.{digits}g}" for v in values) + "]"
+
+
+def get_stats() -> Dict[str, Any]:
+    config = {k: v for k, v in embedding_config().items() if k != "cache_dir"}
+    if _batcher is None:
+        return {"config": config, "batching": batching_enabled(), "batches": 0}
+    return {"config": config, "batching": batching_enabled(), **_batcher.stats()}
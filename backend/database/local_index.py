@@ -0,0 +1,121 @@
+"""
+In-process vector index with optional quantization
+
+Exact cosine search over a (small) embedding matrix held in the worker, for
+corpora like our recipes/products/policies where a database round trip costs
+more than the search itself. Vectors can be kept as:
+
+    float32   exact scores, 4 bytes per dimension
+    float16   2 bytes per dimension (same precision as pgvector halfvec)
+    int8      1 byte per dimension + one float32 scale per row
+    binary    1 bit per dimension (sign), Hamming distance
+
+For the lossy modes, search scores every row with the quantized codes, keeps
+the best `rerank_factor * k` and re-ranks that shortlist against the float32
+vectors. Pass the float32 matrix as an np.memmap to keep it out of RAM: only
+the shortlisted rows are ever read.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MODES = ("float32", "float16", "int8", "binary")
+
+# Rows scored per matmul, bounds the float32 temporaries for int8/float16 codes
+_CHUNK = 8192
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row scalar quantization: v ~= codes * scale."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class LocalVectorIndex:
+    def __init__(
+        self,
+        ids: Sequence,
+        vectors: np.ndarray,
+        mode: str = "float32",
+        rerank_factor: int = 4,
+        normalized: bool = False,
+    ):
+        """
+        Args:
+            ids: One identifier per row, returned by search()
+            vectors: (n, dim) embeddings; may be an np.memmap
+            mode: One of MODES
+            rerank_factor: Shortlist size multiplier for lossy modes (0 = no re-rank)
+            normalized: Set when vectors are already unit length (skips a copy)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown index mode {mode!r}, expected one of {MODES}")
+        self.ids = list(ids)
+        self.mode = mode
+        self.rerank_factor = rerank_factor
+        self.vectors = vectors if normalized else normalize(vectors)
+        self.scales: Optional[np.ndarray] = None
+        if mode == "float32":
+            self.codes = self.vectors
+        elif mode == "float16":
+            self.codes = np.asarray(self.vectors, dtype=np.float16)
+        elif mode == "int8":
+            self.codes, self.scales = quantize_int8(np.asarray(self.vectors))
+        else:
+            self.codes = np.packbits(np.asarray(self.vectors) > 0, axis=1)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        """Higher is closer, for every row."""
+        if self.mode == "float32":
+            return self.codes @ query
+        if self.mode == "binary":
+            packed = np.packbits(query > 0)
+            return -_POPCOUNT[np.bitwise_xor(self.codes, packed)].sum(axis=1, dtype=np.int32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), _CHUNK):
+            block = self.codes[start:start + _CHUNK].astype(np.float32)
+            scores[start:start + _CHUNK] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, query: Sequence[float], k: int = 5) -> List[Tuple[object, float]]:
+        """Top-k (id, cosine similarity) pairs, best first."""
+        if not self.ids or k <= 0:
+            return []
+        query = normalize(np.asarray(query, dtype=np.float32))
+        scores = self._scores(query)
+
+        lossy = self.mode != "float32" and self.rerank_factor > 0
+        shortlist = min(len(scores), k * self.rerank_factor if lossy else k)
+        candidates = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        if lossy:
+            candidates = np.sort(candidates)  # sequential reads when vectors are memory-mapped
+            exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            order = np.argsort(-exact)[:k]
+            return [(self.ids[candidates[i]], float(exact[i])) for i in order]
+        order = candidates[np.argsort(-scores[candidates])][:k]
+        if self.mode == "float32":
+            return [(self.ids[i], float(scores[i])) for i in order]
+        # Lossy mode without re-rank: report the exact score anyway
+        return [(self.ids[i], float(np.asarray(self.vectors[i], dtype=np.float32) @ query)) for i in order]
+
+    def memory_bytes(self) -> dict:
+        """Bytes held for scoring, and for the float32 re-rank copy when it's in RAM."""
+        codes = self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+        rerank = 0
+        if self.mode != "float32" and not isinstance(self.vectors, np.memmap):
+            rerank = self.vectors.nbytes
+        return {"codes": codes, "rerank": rerank}
@@ -0,0 +1,43 @@
+-- Migration: Catalog change feed
+-- Publishes a NOTIFY on channel 'catalog_changes' whenever products or
+-- knowledge_base rows change, so backend workers can invalidate their
+-- in-process caches instead of re-reading whole tables.
+
+CREATE OR REPLACE FUNCTION notify_catalog_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    row_id TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := OLD.id::TEXT;
+    ELSE
+        row_id := NEW.id::TEXT;
+    END IF;
+
+    PERFORM pg_notify(
+        'catalog_changes',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_id
+        )::TEXT
+    );
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS products_change_feed ON products;
+CREATE TRIGGER products_change_feed
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+
+DROP TRIGGER IF EXISTS knowledge_base_change_feed ON knowledge_base;
+CREATE TRIGGER knowledge_base_change_feed
+    AFTER INSERT OR UPDATE OR DELETE ON knowledge_base
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+
+-- The polling fallback watches max(updated_at); make sure it is indexed.
+CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products(updated_at);
+CREATE INDEX IF NOT EXISTS idx_knowledge_updated_at ON knowledge_base(updated_at);
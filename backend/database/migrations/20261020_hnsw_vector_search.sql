@@ -0,0 +1,225 @@
+-- Migration: HNSW vector indexes and index-friendly search RPCs
+--
+-- The original match_* / search_knowledge functions filter with
+--   WHERE 1 - (embedding <=> q) > match_threshold
+-- before ORDER BY ... LIMIT. The distance predicate cannot be answered by an
+-- ANN index: the planner either seq-scans, computing every distance, or keeps
+-- walking the index well past k candidates when the threshold is selective.
+-- The ivfflat indexes were also created on empty tables, so their lists were
+-- useless, and `documents` (queried by vector_store.search_recipes) had no
+-- vector index at all.
+--
+-- This migration:
+--   1. replaces the ivfflat indexes with HNSW indexes (no training data needed)
+--   2. rewrites the RPCs to take the nearest match_count rows via the index
+--      (ORDER BY distance LIMIT) and apply the threshold afterwards
+-- Parameters are unchanged, so callers don't need to change. match_products
+-- also returns stock_quantity and image_url now (it is dropped and recreated,
+-- since a function's result columns can't be changed in place); match_recipes
+-- computes its ingredient matches for the k nearest recipes only.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- products only got an embedding column in the older schema files
+ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding VECTOR(384);
+
+-- ============================================
+-- 1. INDEXES
+-- ============================================
+DROP INDEX IF EXISTS idx_knowledge_embedding;
+DROP INDEX IF EXISTS idx_products_embedding;
+DROP INDEX IF EXISTS idx_recipes_embedding;
+DROP INDEX IF EXISTS idx_policies_embedding;
+
+CREATE INDEX IF NOT EXISTS idx_documents_embedding_hnsw
+  ON documents USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS idx_knowledge_embedding_hnsw
+  ON knowledge_base USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS idx_products_embedding_hnsw
+  ON products USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- recipes / policies only exist in deployments created from schema.sql
+DO $$
+BEGIN
+  IF to_regclass('recipes') IS NOT NULL THEN
+    EXECUTE 'CREATE INDEX IF NOT EXISTS idx_recipes_embedding_hnsw
+             ON recipes USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)';
+  END IF;
+  IF to_regclass('policies') IS NOT NULL THEN
+    EXECUTE 'CREATE INDEX IF NOT EXISTS idx_policies_embedding_hnsw
+             ON policies USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)';
+  END IF;
+END $$;
+
+-- ============================================
+-- 2. SEARCH FUNCTIONS
+-- Inner query: pure ANN (ORDER BY distance LIMIT k) -> HNSW index scan.
+-- Outer query: threshold on the k candidates only.
+-- ef_search is raised to at least the number of candidates we need.
+-- ============================================
+CREATE OR REPLACE FUNCTION match_documents (
+  query_embedding VECTOR(384),
+  match_threshold FLOAT,
+  match_count INT
+)
+RETURNS TABLE (
+  id UUID,
+  content TEXT,
+  metadata JSONB,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM set_config('hnsw.ef_search', GREATEST(40, match_count)::TEXT, true);
+  RETURN QUERY
+  SELECT nearest.id, nearest.content, nearest.metadata, 1 - nearest.distance AS similarity
+  FROM (
+    SELECT d.id, d.content, d.metadata, d.embedding <=> query_embedding AS distance
+    FROM documents d
+    ORDER BY d.embedding <=> query_embedding
+    LIMIT match_count
+  ) nearest
+  WHERE 1 - nearest.distance > match_threshold
+  ORDER BY nearest.distance;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION search_knowledge (
+  query_embedding VECTOR(384),
+  content_type_filter TEXT DEFAULT NULL,
+  match_threshold FLOAT DEFAULT 0.0,
+  match_count INT DEFAULT 5
+)
+RETURNS TABLE (
+  id UUID,
+  content_type TEXT,
+  title TEXT,
+  content TEXT,
+  metadata JSONB,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- The content_type filter is applied to the index's candidate list, so
+  -- widen ef_search when filtering to still find match_count rows.
+  PERFORM set_config(
+    'hnsw.ef_search',
+    GREATEST(40, CASE WHEN content_type_filter IS NULL THEN match_count ELSE match_count * 10 END)::TEXT,
+    true
+  );
+  RETURN QUERY
+  SELECT nearest.id, nearest.content_type, nearest.title, nearest.content, nearest.metadata,
+         1 - nearest.distance AS similarity
+  FROM (
+    SELECT kb.id, kb.content_type, kb.title, kb.content, kb.metadata,
+           kb.embedding <=> query_embedding AS distance
+    FROM knowledge_base kb
+    WHERE content_type_filter IS NULL OR kb.content_type = content_type_filter
+    ORDER BY kb.embedding <=> query_embedding
+    LIMIT match_count
+  ) nearest
+  WHERE 1 - nearest.distance > match_threshold
+  ORDER BY nearest.distance;
+END;
+$$;
+
+DROP FUNCTION IF EXISTS match_products(VECTOR(384), FLOAT, INT);
+CREATE OR REPLACE FUNCTION match_products (
+  query_embedding VECTOR(384),
+  match_threshold FLOAT,
+  match_count INT
+)
+RETURNS TABLE (
+  id UUID,
+  name TEXT,
+  description TEXT,
+  price NUMERIC,
+  stock_quantity INT,
+  category TEXT,
+  image_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM set_config('hnsw.ef_search', GREATEST(40, match_count)::TEXT, true);
+  RETURN QUERY
+  SELECT nearest.id, nearest.name, nearest.description, nearest.price, nearest.stock_quantity,
+         nearest.category, nearest.image_url, 1 - nearest.distance AS similarity
+  FROM (
+    SELECT p.id, p.name, p.description, p.price, p.stock_quantity, p.category, p.image_url,
+           p.embedding <=> query_embedding AS distance
+    FROM products p
+    WHERE p.embedding IS NOT NULL
+    ORDER BY p.embedding <=> query_embedding
+    LIMIT match_count
+  ) nearest
+  WHERE 1 - nearest.distance > match_threshold
+  ORDER BY nearest.distance;
+END;
+$$;
+
+-- recipes may not exist (see above); plpgsql bodies are only resolved when called
+CREATE OR REPLACE FUNCTION match_recipes (
+  query_embedding VECTOR(384),
+  match_threshold FLOAT,
+  match_count INT,
+  available_products UUID[] DEFAULT '{}'
+)
+RETURNS TABLE (
+  id UUID,
+  name TEXT,
+  description TEXT,
+  ingredients JSONB,
+  instructions TEXT[],
+  prep_time INTEGER,
+  cooking_time INTEGER,
+  serving_size INTEGER,
+  image_url TEXT,
+  similarity FLOAT,
+  matching_ingredients INTEGER,
+  missing_ingredients JSONB
+)
+LANGUAGE plpgsql STABLE
+AS $$
+BEGIN
+  PERFORM set_config('hnsw.ef_search', GREATEST(40, match_count)::TEXT, true);
+  RETURN QUERY
+  SELECT nearest.id, nearest.name, nearest.description, nearest.ingredients, nearest.instructions,
+         nearest.prep_time, nearest.cooking_time, nearest.serving_size, nearest.image_url,
+         1 - nearest.distance AS similarity,
+         (
+           SELECT COUNT(*)::INTEGER
+           FROM jsonb_array_elements(nearest.ingredients) AS i
+           WHERE (i->>'product_id')::UUID = ANY(available_products)
+         ) AS matching_ingredients,
+         (
+           SELECT jsonb_agg(i)
+           FROM jsonb_array_elements(nearest.ingredients) AS i
+           WHERE NOT ((i->>'product_id')::UUID = ANY(available_products))
+         ) AS missing_ingredients
+  FROM (
+    SELECT r.id, r.name, r.description, r.ingredients, r.instructions, r.prep_time,
+           r.cooking_time, r.serving_size, r.image_url, r.embedding <=> query_embedding AS distance
+    FROM recipes r
+    WHERE r.embedding IS NOT NULL
+    ORDER BY r.embedding <=> query_embedding
+    LIMIT match_count
+  ) nearest
+  WHERE 1 - nearest.distance > match_threshold
+  -- By position: the bare names would clash with the OUT columns in plpgsql
+  ORDER BY 11 DESC, 10 DESC;
+END;
+$$;
+
+ANALYZE documents;
+ANALYZE knowledge_base;
+ANALYZE products;
+DO $$
+BEGIN
+  IF to_regclass('recipes') IS NOT NULL THEN
+    EXECUTE 'ANALYZE recipes';
+  END IF;
+END $$;
@@ -0,0 +1,72 @@
+-- Migration: Single-round-trip multi-collection retrieval
+--
+-- One query embedding in, per-collection top-k out:
+--   recipe  -> documents        (what vector_store.search_recipes queries)
+--   product -> products
+--   policy  -> knowledge_base WHERE content_type = 'policy'
+-- Each branch is an ANN-first subquery (see 20261020_hnsw_vector_search.sql)
+-- so it uses its own HNSW index; a collection with k = 0 is skipped.
+
+CREATE OR REPLACE FUNCTION retrieve_all (
+  query_embedding VECTOR(384),
+  recipe_count INT DEFAULT 5,
+  product_count INT DEFAULT 5,
+  policy_count INT DEFAULT 3,
+  match_threshold FLOAT DEFAULT 0.0
+)
+RETURNS TABLE (
+  collection TEXT,
+  id UUID,
+  title TEXT,
+  content TEXT,
+  metadata JSONB,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM set_config(
+    'hnsw.ef_search',
+    GREATEST(40, recipe_count, product_count, policy_count * 10)::TEXT,
+    true
+  );
+  RETURN QUERY
+  SELECT r.collection, r.id, r.title, r.content, r.metadata, 1 - r.distance AS similarity
+  FROM (
+    (
+      SELECT 'recipe'::TEXT AS collection, d.id, d.metadata->>'title' AS title, d.content, d.metadata,
+             d.embedding <=> query_embedding AS distance
+      FROM documents d
+      WHERE recipe_count > 0
+      ORDER BY d.embedding <=> query_embedding
+      LIMIT recipe_count
+    )
+    UNION ALL
+    (
+      SELECT 'product'::TEXT, p.id, p.name, p.description,
+             jsonb_build_object(
+               'price', p.price,
+               'stock_quantity', p.stock_quantity,
+               'category', p.category,
+               'unit', p.unit
+             ),
+             p.embedding <=> query_embedding
+      FROM products p
+      WHERE product_count > 0 AND p.embedding IS NOT NULL
+      ORDER BY p.embedding <=> query_embedding
+      LIMIT product_count
+    )
+    UNION ALL
+    (
+      SELECT 'policy'::TEXT, kb.id, kb.title, kb.content, kb.metadata,
+             kb.embedding <=> query_embedding
+      FROM knowledge_base kb
+      WHERE policy_count > 0 AND kb.content_type = 'policy'
+      ORDER BY kb.embedding <=> query_embedding
+      LIMIT policy_count
+    )
+  ) r
+  WHERE 1 - r.distance > match_threshold
+  ORDER BY r.collection, r.distance;
+END;
+$$;
@@ -0,0 +1,177 @@
+-- Migration: Quantized vector indexes and retrieve_all variants (pgvector >= 0.7)
+--
+-- The HNSW indexes from 20261020_hnsw_vector_search.sql hold full float32
+-- vectors (1.5 KB per row for 384 dims). Two quantized alternatives are
+-- indexed alongside them, as expression indexes so the heap keeps the exact
+-- float32 vector for re-ranking:
+--
+--   halfvec  embedding::halfvec(384)            768 B/row, near-identical recall
+--   binary   binary_quantize(embedding)::bit    48 B/row, needs a re-rank
+--
+-- retrieve_all_halfvec / retrieve_all_binary return the same rows as
+-- retrieve_all (20261021_multi_collection_retrieval.sql). The binary variant
+-- takes rerank_factor * k Hamming-nearest candidates per collection and
+-- orders them by exact cosine distance. database/retrieval.py picks the RPC
+-- from VECTOR_QUANTIZATION (off / halfvec / binary).
+
+CREATE INDEX IF NOT EXISTS idx_documents_embedding_halfvec
+  ON documents USING hnsw ((embedding::halfvec(384)) halfvec_cosine_ops);
+CREATE INDEX IF NOT EXISTS idx_knowledge_embedding_halfvec
+  ON knowledge_base USING hnsw ((embedding::halfvec(384)) halfvec_cosine_ops);
+CREATE INDEX IF NOT EXISTS idx_products_embedding_halfvec
+  ON products USING hnsw ((embedding::halfvec(384)) halfvec_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS idx_documents_embedding_binary
+  ON documents USING hnsw ((binary_quantize(embedding)::bit(384)) bit_hamming_ops);
+CREATE INDEX IF NOT EXISTS idx_knowledge_embedding_binary
+  ON knowledge_base USING hnsw ((binary_quantize(embedding)::bit(384)) bit_hamming_ops);
+CREATE INDEX IF NOT EXISTS idx_products_embedding_binary
+  ON products USING hnsw ((binary_quantize(embedding)::bit(384)) bit_hamming_ops);
+
+CREATE OR REPLACE FUNCTION retrieve_all_halfvec (
+  query_embedding VECTOR(384),
+  recipe_count INT DEFAULT 5,
+  product_count INT DEFAULT 5,
+  policy_count INT DEFAULT 3,
+  match_threshold FLOAT DEFAULT 0.0
+)
+RETURNS TABLE (
+  collection TEXT,
+  id UUID,
+  title TEXT,
+  content TEXT,
+  metadata JSONB,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  q HALFVEC(384) := query_embedding::halfvec(384);
+BEGIN
+  PERFORM set_config(
+    'hnsw.ef_search',
+    GREATEST(40, recipe_count, product_count, policy_count * 10)::TEXT,
+    true
+  );
+  RETURN QUERY
+  SELECT r.collection, r.id, r.title, r.content, r.metadata, 1 - r.distance AS similarity
+  FROM (
+    (
+      SELECT 'recipe'::TEXT AS collection, d.id, d.metadata->>'title' AS title, d.content, d.metadata,
+             d.embedding::halfvec(384) <=> q AS distance
+      FROM documents d
+      WHERE recipe_count > 0
+      ORDER BY d.embedding::halfvec(384) <=> q
+      LIMIT recipe_count
+    )
+    UNION ALL
+    (
+      SELECT 'product'::TEXT, p.id, p.name, p.description,
+             jsonb_build_object(
+               'price', p.price,
+               'stock_quantity', p.stock_quantity,
+               'category', p.category,
+               'unit', p.unit
+             ),
+             p.embedding::halfvec(384) <=> q
+      FROM products p
+      WHERE product_count > 0 AND p.embedding IS NOT NULL
+      ORDER BY p.embedding::halfvec(384) <=> q
+      LIMIT product_count
+    )
+    UNION ALL
+    (
+      SELECT 'policy'::TEXT, kb.id, kb.title, kb.content, kb.metadata,
+             kb.embedding::halfvec(384) <=> q
+      FROM knowledge_base kb
+      WHERE policy_count > 0 AND kb.content_type = 'policy'
+      ORDER BY kb.embedding::halfvec(384) <=> q
+      LIMIT policy_count
+    )
+  ) r
+  WHERE 1 - r.distance > match_threshold
+  ORDER BY r.collection, r.distance;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION retrieve_all_binary (
+  query_embedding VECTOR(384),
+  recipe_count INT DEFAULT 5,
+  product_count INT DEFAULT 5,
+  policy_count INT DEFAULT 3,
+  match_threshold FLOAT DEFAULT 0.0,
+  rerank_factor INT DEFAULT 4
+)
+RETURNS TABLE (
+  collection TEXT,
+  id UUID,
+  title TEXT,
+  content TEXT,
+  metadata JSONB,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  q BIT(384) := binary_quantize(query_embedding)::bit(384);
+BEGIN
+  PERFORM set_config(
+    'hnsw.ef_search',
+    GREATEST(40, (recipe_count + product_count) * rerank_factor, policy_count * rerank_factor * 10)::TEXT,
+    true
+  );
+  RETURN QUERY
+  SELECT r.collection, r.id, r.title, r.content, r.metadata, 1 - r.distance AS similarity
+  FROM (
+    (
+      SELECT c.collection, c.id, c.title, c.content, c.metadata, c.distance
+      FROM (
+        SELECT 'recipe'::TEXT AS collection, d.id, d.metadata->>'title' AS title, d.content, d.metadata,
+               d.embedding <=> query_embedding AS distance
+        FROM documents d
+        WHERE recipe_count > 0
+        ORDER BY binary_quantize(d.embedding)::bit(384) <~> q
+        LIMIT recipe_count * rerank_factor
+      ) c
+      ORDER BY c.distance
+      LIMIT recipe_count
+    )
+    UNION ALL
+    (
+      SELECT c.collection, c.id, c.title, c.content, c.metadata, c.distance
+      FROM (
+        SELECT 'product'::TEXT AS collection, p.id, p.name AS title, p.description AS content,
+               jsonb_build_object(
+                 'price', p.price,
+                 'stock_quantity', p.stock_quantity,
+                 'category', p.category,
+                 'unit', p.unit
+               ) AS metadata,
+               p.embedding <=> query_embedding AS distance
+        FROM products p
+        WHERE product_count > 0 AND p.embedding IS NOT NULL
+        ORDER BY binary_quantize(p.embedding)::bit(384) <~> q
+        LIMIT product_count * rerank_factor
+      ) c
+      ORDER BY c.distance
+      LIMIT product_count
+    )
+    UNION ALL
+    (
+      SELECT c.collection, c.id, c.title, c.content, c.metadata, c.distance
+      FROM (
+        SELECT 'policy'::TEXT AS collection, kb.id, kb.title, kb.content, kb.metadata,
+               kb.embedding <=> query_embedding AS distance
+        FROM knowledge_base kb
+        WHERE policy_count > 0 AND kb.content_type = 'policy'
+        ORDER BY binary_quantize(kb.embedding)::bit(384) <~> q
+        LIMIT policy_count * rerank_factor
+      ) c
+      ORDER BY c.distance
+      LIMIT policy_count
+    )
+  ) r
+  WHERE 1 - r.distance > match_threshold
+  ORDER BY r.collection, r.distance;
+END;
+$$;
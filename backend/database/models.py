@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Union
-from pydantic import BaseModel, Field, UUID4
+from pydantic import BaseModel, Field, TypeAdapter, UUID4
 from enum import Enum
 from typing import List, Optional
 
@@ -91,3 +91,10 @@ class RecipeSuggestionResponse(BaseModel):
     missing_ingredients: List[Dict[str, Any]]
     missing_ingredients_cost: float
     similarity: float
+
+# Whole-list validators: one pydantic-core call per result set instead of a
+# Model(**row) per row. Build them once; constructing a TypeAdapter is not cheap.
+PRODUCT_LIST = TypeAdapter(List[Product])
+PRODUCT_SEARCH_RESULTS = TypeAdapter(List[ProductSearchResult])
+POLICY_SEARCH_RESULTS = TypeAdapter(List[PolicySearchResult])
+RECIPE_SUGGESTIONS = TypeAdapter(List[RecipeSuggestionResponse])
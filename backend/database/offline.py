@@ -0,0 +1,364 @@
+"""
+Degraded mode: local data when Supabase is down or slow
+
+Product, catalog and recipe lookups go through with_fallback(). The Supabase
+call gets OFFLINE_LATENCY_BUDGET_S (or less, if the request's deadline is
+closer); if it fails or runs over, the worker switches to degraded mode
+(logged once per switch) and answers from local data instead:
+
+- the last published catalog snapshot (scripts/build_snapshot.py), i.e. the
+  last successful sync, when there is one
+- otherwise the seed files shipped in data/ (products.json, recipes.json,
+  policies.json)
+
+Only outages switch modes: connection errors, timeouts and 5xx-class errors
+(is_outage). A request Supabase rejects (bad filter, missing column, 4xx) is
+re-raised as it is; local data would not make it any better.
+
+While degraded, Supabase is skipped entirely and probed again every
+OFFLINE_RETRY_S, so requests don't each wait out a timeout. Every request that
+was served from local data gets STALE_NOTICE appended by the orchestrator,
+including requests that shared a coalesced call (capture_stale / mark_stale).
+OFFLINE_FALLBACK=false turns all of this off.
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, TypeVar
+
+import httpx
+from postgrest.exceptions import APIError
+
+try:
+    from backend import deadline
+    from backend.database.snapshot import Snapshot, default_dir, read_current
+except ModuleNotFoundError:
+    import deadline
+    from database.snapshot import Snapshot, default_dir, read_current
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Row = Dict[str, Any]
+
+STALE_NOTICE = (
+    "\n\n---\n_⚠️ Our live catalog is unreachable right now, so the prices, stock and recipes above "
+    "come from a saved copy and are **possibly stale**._"
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+_STOPWORDS = {
+    "the", "and", "with", "for", "what", "can", "cook", "make", "have", "some", "want", "recipe",
+    "recipes", "how", "you", "your", "are", "any", "show", "give", "something", "dish", "need",
+}
+
+
+def enabled() -> bool:
+    return os.getenv("OFFLINE_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+
+# Postgres SQLSTATE classes (connection, resources, cancelled/timed out, system,
+# internal) and PostgREST codes (can't reach the database or its pool) that
+# mean the server side is failing rather than the query being wrong
+_OUTAGE_SQLSTATE_CLASSES = ("08", "53", "57", "58", "XX")
+_OUTAGE_POSTGREST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether `error` means Supabase is unreachable or failing (connection, timeout, 5xx)."""
+    if isinstance(error, (httpx.TransportError, OSError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, APIError):
+        if isinstance(error.code, int):
+            # Non-JSON error body: postgrest puts the HTTP status in `code`
+            return error.code >= 500
+        code = error.code or ""
+        return code in _OUTAGE_POSTGREST_CODES or code[:2] in _OUTAGE_SQLSTATE_CLASSES
+    return False
+
+
+def _words(text: str) -> Set[str]:
+    words = set()
+    for word in re.findall(r"[a-z]+", text.lower()):
+        if len(word) >= 3 and word not in _STOPWORDS:
+            words.add(word[:-1] if word.endswith("s") and len(word) > 3 else word)
+    return words
+
+
+class LocalData:
+    """Products, recipes and policies held in memory, searchable without Supabase."""
+
+    def __init__(self, products: List[Row], recipes: List[Row], policies: List[Row], source: str):
+        self.products = products
+        self.recipes = recipes
+        self.policies = policies
+        self.source = source
+        self._recipe_words = [
+            (_words(r.get("title", "")), _words(" ".join(r.get("ingredients", []))), _words(r.get("description", "")))
+            for r in recipes
+        ]
+        self._policy_words = [_words(f"{p.get('title', '')} {p.get('content', '')}") for p in policies]
+
+    def search_products(self, query: Optional[str], category: Optional[str] = None, limit: int = 10,
+                        in_stock_only: bool = False) -> List[Row]:
+        """Same matching as the PostgREST ilike filters in tools/product_search.py."""
+        query = (query or "").lower()
+        rows = [
+            {k: p.get(k) for k in ("name", "price", "stock_quantity", "category")}
+            for p in self.products
+            if (not query or query in p["name"].lower() or query in (p.get("category") or "").lower())
+            and (not category or p.get("category") == category)
+            and (not in_stock_only or (p.get("stock_quantity") or 0) > 0)
+        ]
+        if in_stock_only:
+            rows.sort(key=lambda p: p["name"])
+        else:
+            rows.sort(key=lambda p: -(p.get("stock_quantity") or 0))
+        return rows[:limit]
+
+    def search_recipes(self, query: str, k: int = 5) -> List[Row]:
+        """match_documents-shaped rows, ranked by keyword overlap (title > ingredients > description)."""
+        words = _words(query)
+        scored = []
+        for recipe, (title, ingredients, description) in zip(self.recipes, self._recipe_words):
+            score = 3 * len(words & title) + 2 * len(words & ingredients) + len(words & description)
+            scored.append((score, recipe))
+        scored.sort(key=lambda item: -item[0])
+        # With no overlap at all still offer a few recipes rather than nothing
+        return [{"metadata": r, "similarity": float(s)} for s, r in scored[:k]]
+
+    def search_policies(self, query: str, k: int = 3) -> List[Row]:
+        words = _words(query)
+        scored = sorted(
+            ((len(words & pw), p) for p, pw in zip(self.policies, self._policy_words)),
+            key=lambda item: -item[0],
+        )
+        return [{"title": p["title"], "content": p["content"], "similarity": float(s)} for s, p in scored[:k] if s]
+
+
+def _read_json(name: str) -> List[Row]:
+    with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_local_data() -> LocalData:
+    """The last published snapshot if there is one, else the bundled seed files."""
+    policies = _read_json("policies.json")
+    version = read_current()
+    if version:
+        try:
+            snapshot = Snapshot(os.path.join(default_dir(), version))
+            recipes = [snapshot.recipe(i) for i in range(len(snapshot.recipes))]
+            return LocalData(list(snapshot.product_rows()), recipes, policies, source=f"snapshot {version}")
+        except Exception as e:
+            logger.warning(f"Could not read snapshot {version} for degraded mode, using data/*.json: {e}")
+    return LocalData(_read_json("products.json"), _read_json("recipes.json"), policies, source="data/*.json")
+
+
+class DegradedMode:
+    def __init__(self, retry_s: float, check_interval_s: float = 5.0):
+        self.retry_s = retry_s
+        # How often data() looks for a newly published snapshot (like SnapshotHandle)
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._data: Optional[LocalData] = None
+        self._data_version: Optional[str] = None
+        self._checked_at = 0.0
+        self.active = False
+        self.since: Optional[float] = None
+        self.reason: Optional[str] = None
+        self.retry_at = 0.0
+        self.switches = 0
+        self.local_answers = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.client_errors = 0
+
+    def data(self) -> LocalData:
+        now = time.monotonic()
+        data = self._data
+        if data is not None and now - self._checked_at < self.check_interval_s:
+            return data
+        with self._lock:
+            if self._data is not None and now - self._checked_at < self.check_interval_s:
+                return self._data
+            self._checked_at = now
+            version = read_current()
+            if self._data is None or version != self._data_version:
+                self._data = load_local_data()
+                self._data_version = version
+            return self._data
+
+    def skip_remote(self) -> bool:
+        with self._lock:
+            return self.active and time.monotonic() < self.retry_at
+
+    def record_failure(self, operation: str, reason: str, timed_out: bool):
+        with self._lock:
+            self.timeouts += timed_out
+            self.failures += not timed_out
+            self.retry_at = time.monotonic() + self.retry_s
+            if self.active:
+                return
+            self.active, self.since, self.reason = True, time.time(), f"{operation}: {reason}"
+            self.switches += 1
+        logger.warning(
+            f"Supabase unavailable ({operation}: {reason}); entering degraded mode, serving local data "
+            f"(possibly stale), retrying in {self.retry_s:.0f}s"
+        )
+
+    def record_success(self):
+        if not self.active:
+            return
+        with self._lock:
+            if not self.active:
+                return
+            down_for = time.time() - self.since
+            self.active, self.since, self.reason = False, None, None
+        logger.warning(f"Supabase reachable again after {down_for:.0f}s; leaving degraded mode")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": enabled(),
+                "degraded": self.active,
+                "since": self.since,
+                "reason": self.reason,
+                "switches": self.switches,
+                "local_answers": self.local_answers,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "client_errors": self.client_errors,
+                "local_source": self._data.source if self._data else None,
+            }
+
+
+_mode = DegradedMode(
+    retry_s=float(os.getenv("OFFLINE_RETRY_S", "30")),
+    check_interval_s=float(os.getenv("SNAPSHOT_CHECK_INTERVAL_S", "5")),
+)
+# Remote calls run here so the caller can stop waiting at the latency budget
+_remote_pool = ThreadPoolExecutor(max_workers=int(os.getenv("OFFLINE_WORKERS", "16")), thread_name_prefix="supabase")
+# Operations served from local data during the current request (None outside one)
+_stale: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("stale_sources", default=None)
+
+
+def latency_budget_s() -> float:
+    return float(os.getenv("OFFLINE_LATENCY_BUDGET_S", "3"))
+
+
+def is_degraded() -> bool:
+    return enabled() and _mode.active
+
+
+def _serve_local(operation: str, local: Callable[[LocalData], T]) -> T:
+    result = local(_mode.data())
+    with _mode._lock:
+        _mode.local_answers += 1
+    stale = _stale.get()
+    if stale is not None:
+        stale.add(operation)
+    return result
+
+
+def bounded(operation: str, remote: Callable[[], T]) -> T:
+    """
+    remote(), but waited on no longer than the request's remaining deadline.
+
+    Raises deadline.DeadlineExceeded when the deadline passes first. Without a
+    deadline this is a plain call.
+    """
+    left = deadline.remaining()
+    if left is None:
+        return remote()
+    deadline.check(operation)
+    future = _remote_pool.submit(contextvars.copy_context().run, remote)
+    try:
+        return future.result(timeout=left)
+    except FuturesTimeout:
+        raise deadline.DeadlineExceeded(f"Request deadline passed during {operation}") from None
+
+
+def with_fallback(operation: str, remote: Callable[[], T], local: Callable[[LocalData], T]) -> T:
+    """
+    remote() within the latency budget, else local(LocalData) and degraded mode.
+
+    Args:
+        operation: Name used in logs and stats (e.g. "search_products")
+        remote: The Supabase call; raises on failure
+        local: Builds the same shape of result from local data
+    """
+    if not enabled():
+        return bounded(operation, remote)
+    if _mode.skip_remote():
+        return _serve_local(operation, local)
+
+    future = _remote_pool.submit(contextvars.copy_context().run, remote)
+    budget = latency_budget_s()
+    # Never wait past the request's own deadline (deadline.py)
+    wait_s = deadline.capped(budget)
+    try:
+        result = future.result(timeout=wait_s)
+    except FuturesTimeout:
+        if wait_s < budget:
+            # Out of request time, not a sign Supabase is down: answer locally this once
+            logger.info(f"{operation}: request deadline reached, answering from local data")
+        else:
+            _mode.record_failure(operation, f"no answer within {budget:.1f}s", timed_out=True)
+    except Exception as e:
+        if not is_outage(e):
+            # Supabase answered, it just rejected this call: not a reason to go degraded
+            with _mode._lock:
+                _mode.client_errors += 1
+            _mode.record_success()
+            raise
+        _mode.record_failure(operation, repr(e), timed_out=False)
+    else:
+        _mode.record_success()
+        return result
+    return _serve_local(operation, local)
+
+
+def local_data() -> LocalData:
+    return _mode.data()
+
+
+def begin_request() -> contextvars.Token:
+    """Start tracking which lookups of this request were answered from local data."""
+    return _stale.set(set())
+
+
+def end_request(token: contextvars.Token):
+    _stale.reset(token)
+
+
+def served_stale() -> bool:
+    return bool(_stale.get())
+
+
+def capture_stale(fn: Callable[[], T]) -> Tuple[T, FrozenSet[str]]:
+    """fn() and the operations it answered from local data, for a result other requests will share."""
+    stale: Set[str] = set()
+    token = _stale.set(stale)
+    try:
+        return fn(), frozenset(stale)
+    finally:
+        _stale.reset(token)
+
+
+def mark_stale(operations: Iterable[str]):
+    """Flag the current request as served from local data by a shared call (see capture_stale)."""
+    stale = _stale.get()
+    if stale is not None:
+        stale.update(operations)
+
+
+def get_stats() -> Dict[str, Any]:
+    return _mode.stats()
@@ -4,17 +4,16 @@ from datetime import datetime
 import json
 import numpy as np
 from supabase import Client
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 from .connection import get_supabase_client
+from .embeddings import aembed_query, get_embeddings
+from .projections import PRODUCT_DETAIL, RECIPE_DETAIL
 from .models import (
     Product, ProductCreate, Recipe, RecipeCreate, Policy, PolicyCreate,
     ProductSearchResult, RecipeSearchResult, PolicySearchResult,
-    RecipeSuggestionRequest, RecipeSuggestionResponse, Ingredient
+    RecipeSuggestionRequest, RecipeSuggestionResponse, Ingredient,
+    PRODUCT_LIST, PRODUCT_SEARCH_RESULTS, POLICY_SEARCH_RESULTS, RECIPE_SUGGESTIONS,
 )
 
-# Initialize embeddings
-embeddings = FastEmbedEmbeddings()
-
 class DatabaseOperations:
     def __init__(self, supabase: Optional[Client] = None):
         self.supabase = supabase or get_supabase_client()
@@ -27,7 +26,7 @@ class DatabaseOperations:
         embedding = await self._get_embedding(text)
         
         # Prepare product data
-        product_data = product.dict()
+        product_data = product.model_dump()
         product_data['embedding'] = embedding
         
         # Insert into database
@@ -36,7 +35,7 @@ class DatabaseOperations:
 
     async def get_product(self, product_id: str) -> Optional[Product]:
         """Get a product by ID."""
-        result = self.supabase.table('products').select('*').eq('id', product_id).execute()
+        result = self.supabase.table('products').select(PRODUCT_DETAIL).eq('id', product_id).execute()
         return Product(**result.data[0]) if result.data else None
 
     async def search_products(
@@ -59,7 +58,7 @@ class DatabaseOperations:
             }
         ).execute()
         
-        return [ProductSearchResult(**item) for item in result.data]
+        return PRODUCT_SEARCH_RESULTS.validate_python(result.data)
 
     # Recipe Operations
     async def create_recipe(self, recipe: RecipeCreate) -> Recipe:
@@ -73,7 +72,7 @@ class DatabaseOperations:
         embedding = await self._get_embedding(text)
         
         # Prepare recipe data
-        recipe_data = recipe.dict()
+        recipe_data = recipe.model_dump()
         recipe_data['embedding'] = embedding
         
         # Insert into database
@@ -82,7 +81,7 @@ class DatabaseOperations:
 
     async def get_recipe(self, recipe_id: str) -> Optional[Recipe]:
         """Get a recipe by ID."""
-        result = self.supabase.table('recipes').select('*').eq('id', recipe_id).execute()
+        result = self.supabase.table('recipes').select(RECIPE_DETAIL).eq('id', recipe_id).execute()
         return Recipe(**result.data[0]) if result.data else None
 
     async def suggest_recipes(
@@ -124,33 +123,34 @@ class DatabaseOperations:
                 }
             ).execute()
         
+        # Price all missing ingredients with one products query instead of one per ingredient
+        missing_ids = {
+            str(ing['product_id'])
+            for item in result.data
+            for ing in item.get('missing_ingredients', [])
+            if ing.get('product_id')
+        }
+        prices = {str(p.id): p.price for p in await self.get_products_by_ids(list(missing_ids))}
+
         # Process results and calculate missing ingredients cost
         suggestions = []
         for item in result.data:
-            recipe = Recipe(**{k: v for k, v in item.items() if k in Recipe.__fields__})
-            
-            # Calculate total cost of missing ingredients
             missing_ingredients = item.get('missing_ingredients', [])
-            missing_cost = 0.0
-            
-            for ing in missing_ingredients:
-                # Get product price if available
-                product_id = ing.get('product_id')
-                if product_id:
-                    product = await self.get_product(product_id)
-                    if product and product.price:
-                        missing_cost += product.price * float(ing.get('quantity', 1))
-            
-            # Create response
-            suggestions.append(RecipeSuggestionResponse(
-                recipe=recipe,
-                matching_ingredients=item.get('matching_ingredients', []),
-                missing_ingredients=missing_ingredients,
-                missing_ingredients_cost=missing_cost,
-                similarity=item.get('similarity', 0.0)
-            ))
-        
-        return suggestions
+            missing_cost = sum(
+                prices[str(ing['product_id'])] * float(ing.get('quantity', 1))
+                for ing in missing_ingredients
+                if ing.get('product_id') and prices.get(str(ing['product_id']))
+            )
+            suggestions.append({
+                'recipe': {k: v for k, v in item.items() if k in Recipe.model_fields},
+                'matching_ingredients': item.get('matching_ingredients', []),
+                'missing_ingredients': missing_ingredients,
+                'missing_ingredients_cost': missing_cost,
+                'similarity': item.get('similarity', 0.0),
+            })
+
+        # Validate the whole list in one call
+        return RECIPE_SUGGESTIONS.validate_python(suggestions)
 
     # Policy Operations
     async def create_policy(self, policy: PolicyCreate) -> Policy:
@@ -160,7 +160,7 @@ class DatabaseOperations:
         embedding = await self._get_embedding(text)
         
         # Prepare policy data
-        policy_data = policy.dict()
+        policy_data = policy.model_dump()
         policy_data['embedding'] = embedding
         
         # Insert into database
@@ -187,22 +187,19 @@ class DatabaseOperations:
             }
         ).execute()
         
-        # Convert to PolicySearchResult objects
-        policies = []
-        for item in result.data:
-            policy_data = item.get('metadata', {})
-            policy_data['id'] = item['id']
-            policy_data['content'] = item['content']
-            policy_data['similarity'] = item.get('similarity', 0.0)
-            policies.append(PolicySearchResult(**policy_data))
-        
-        return policies
+        # Convert to PolicySearchResult objects, validated as one list
+        policies = [
+            {**item.get('metadata', {}), 'id': item['id'], 'content': item['content'],
+             'similarity': item.get('similarity', 0.0)}
+            for item in result.data
+        ]
+        return POLICY_SEARCH_RESULTS.validate_python(policies)
 
     # Helper Methods
     async def _get_embedding(self, text: str) -> List[float]:
         """Get embedding for the given text."""
-        # Generate embedding using FastEmbed (synchronous for now)
-        embedding = embeddings.embed_query(text)
+        # Shared model, micro-batched with concurrent requests (see embeddings.py)
+        embedding = await aembed_query(text)
         return list(map(float, embedding))  # Convert numpy types to native Python types
 
     async def batch_upsert_products(self, products: List[Dict[str, Any]]) -> int:
@@ -212,7 +209,7 @@ class DatabaseOperations:
             f"{p.get('name', '')} {p.get('description', '')}" 
             for p in products
         ]
-        embeddings_list = await embeddings.aembed_documents(texts)
+        embeddings_list = await get_embeddings().aembed_documents(texts)
         
         # Add embeddings to product data
         for i, product in enumerate(products):
@@ -235,8 +232,8 @@ class DatabaseOperations:
             return []
             
         result = self.supabase.table('products')\
-            .select('*')\
+            .select(PRODUCT_DETAIL)\
             .in_('id', product_ids)\
             .execute()
             
-        return [Product(**item) for item in result.data]
+        return PRODUCT_LIST.validate_python(result.data)
@@ -0,0 +1,54 @@
+"""
+Column projections for Supabase reads
+
+Once the embedding scripts have run, every `products` / knowledge row carries a
+384-float vector that PostgREST serializes as several KB of JSON text. `select("*")`
+ships that to the app (and from there into LLM tool output) on every read.
+Each read path asks for exactly the columns it uses instead, and the row
+shapes it gets back are spelled out below.
+
+Never add `embedding` to a projection here; vector search happens in the
+database (match_* / retrieve_all RPCs), which return only scores.
+"""
+from typing import Optional, TypedDict
+
+# --- products ---------------------------------------------------------------
+
+# Product search tool output handed to the LLM
+PRODUCT_LISTING = "name, price, stock_quantity, category"
+
+# check_inventory's in-process catalog (matched by name, priced, stock-checked)
+PRODUCT_CATALOG = "id, name, price, stock_quantity, category"
+
+# DatabaseOperations -> models.Product
+PRODUCT_DETAIL = "id, name, description, price, category, image_url, stock_quantity, created_at, updated_at"
+
+# Text the embedding scripts build product vectors from
+PRODUCT_EMBEDDING_SOURCE = "id, name, category, description"
+
+# --- recipes / policies (schema.sql deployments) ----------------------------
+
+# DatabaseOperations -> models.Recipe
+RECIPE_DETAIL = (
+    "id, name, description, ingredients, instructions, prep_time, cooking_time, "
+    "serving_size, image_url, created_at, updated_at"
+)
+
+# --- knowledge_base / documents --------------------------------------------
+
+KNOWLEDGE_SUMMARY = "id, content_type, title"
+DOCUMENT_SUMMARY = "id, metadata"
+
+# Cheapest thing to select when only a count or existence check is needed
+ID_ONLY = "id"
+
+
+class ProductListing(TypedDict):
+    name: str
+    price: float
+    stock_quantity: int
+    category: Optional[str]
+
+
+class CatalogProduct(ProductListing):
+    id: str
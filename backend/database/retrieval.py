@@ -0,0 +1,197 @@
+"""
+Multi-collection retrieval
+
+Embeds the query once and fetches the nearest recipes, products and policies
+in a single `retrieve_all` RPC (migrations/20261021_multi_collection_retrieval.sql)
+instead of one embedding + RPC per collection. The orchestrator starts this
+while the intent classifier is still running and hands each agent the slice it
+needs, so the agents usually don't have to go back to the database.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from backend.database.connection import get_supabase_client
+    from backend.database.embeddings import embed_query, vector_literal
+    from backend.database.offline import bounded, is_degraded
+    from backend.deadline import DeadlineExceeded
+    from backend.singleflight import coalesce
+except ModuleNotFoundError:
+    from database.connection import get_supabase_client
+    from database.embeddings import embed_query, vector_literal
+    from database.offline import bounded, is_degraded
+    from deadline import DeadlineExceeded
+    from singleflight import coalesce
+
+logger = logging.getLogger(__name__)
+
+# After the RPC fails (e.g. migration not applied yet) skip it for this long
+UNAVAILABLE_COOLDOWN_S = 300.0
+
+Row = Dict[str, Any]
+
+
+@dataclass
+class Retrieval:
+    recipes: List[Row] = field(default_factory=list)
+    products: List[Row] = field(default_factory=list)
+    policies: List[Row] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_s = 0.0
+        self.unavailable_until = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "skipped": self.skipped,
+                "avg_ms": round(self.total_s / self.calls * 1000, 1) if self.calls else None,
+                "available": time.monotonic() >= self.unavailable_until,
+            }
+
+
+_stats = _Stats()
+
+
+def prefetch_enabled() -> bool:
+    return os.getenv("RETRIEVAL_PREFETCH", "true").lower() in ("1", "true", "yes")
+
+
+# VECTOR_QUANTIZATION -> RPC searching that index (migrations/20261022_quantized_vector_search.sql)
+QUANTIZED_RPCS = {
+    "off": "retrieve_all",
+    "halfvec": "retrieve_all_halfvec",
+    "binary": "retrieve_all_binary",
+}
+
+
+def _rpc_call(query: str) -> Tuple[str, Dict[str, Any]]:
+    mode = os.getenv("VECTOR_QUANTIZATION", "off").lower()
+    if mode not in QUANTIZED_RPCS:
+        logger.warning(f"Unknown VECTOR_QUANTIZATION={mode!r}, using full-precision search")
+        mode = "off"
+    embedding = embed_query(query)
+    if mode == "off":
+        return QUANTIZED_RPCS[mode], {"query_embedding": embedding}
+    params = {"query_embedding": vector_literal(embedding)}
+    if mode == "binary":
+        params["rerank_factor"] = int(os.getenv("VECTOR_RERANK_FACTOR", "4"))
+    return QUANTIZED_RPCS[mode], params
+
+
+@coalesce("retrieve_all")
+def retrieve(
+    query: str,
+    recipe_count: int = 5,
+    product_count: int = 5,
+    policy_count: int = 3,
+    match_threshold: float = 0.0,
+) -> Optional[Retrieval]:
+    """
+    Top-k recipes, products and policies for a query in one round trip.
+
+    Returns None when the RPC is unavailable; callers fall back to their own
+    per-collection searches.
+    """
+    # Degraded mode: the agents' own lookups answer from local data
+    if time.monotonic() < _stats.unavailable_until or is_degraded():
+        with _stats._lock:
+            _stats.skipped += 1
+        return None
+
+    started = time.perf_counter()
+    rpc_name = QUANTIZED_RPCS["off"]
+    try:
+        rpc_name, params = _rpc_call(query)
+        rpc = get_supabase_client().rpc(
+            rpc_name,
+            {
+                **params,
+                "recipe_count": recipe_count,
+                "product_count": product_count,
+                "policy_count": policy_count,
+                "match_threshold": match_threshold,
+            },
+        )
+        # Never outlive the request's deadline (deadline.py)
+        result = bounded(rpc_name, rpc.execute)
+    except DeadlineExceeded as e:
+        # Out of request time, not a sign the RPC is broken: no cooldown
+        logger.info(f"{rpc_name} not used: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"{rpc_name} failed, using per-collection search for {UNAVAILABLE_COOLDOWN_S:.0f}s: {e}")
+        with _stats._lock:
+            _stats.failures += 1
+            _stats.unavailable_until = time.monotonic() + UNAVAILABLE_COOLDOWN_S
+        return None
+
+    retrieval = Retrieval(elapsed_s=time.perf_counter() - started)
+    buckets = {"recipe": retrieval.recipes, "product": retrieval.products, "policy": retrieval.policies}
+    for row in result.data or []:
+        bucket = buckets.get(row.get("collection"))
+        if bucket is not None:
+            bucket.append(row)
+
+    with _stats._lock:
+        _stats.calls += 1
+        _stats.total_s += retrieval.elapsed_s
+    return retrieval
+
+
+def format_recipes(rows: List[Row]) -> str:
+    """Render match_documents / retrieve_all recipe rows the way search_recipes always has."""
+    if not rows:
+        return "No recipes found matching your query."
+
+    output = f"Found {len(rows)} recipe(s):\n\n"
+    for i, row in enumerate(rows, 1):
+        metadata = row.get("metadata") or {}
+        output += f"{'='*60}\n"
+        output += f"Recipe {i}: {metadata.get('title', 'Unknown')}\n"
+        output += f"{'='*60}\n"
+
+        if 'description' in metadata:
+            output += f"Description: {metadata['description']}\n\n"
+
+        if 'ingredients' in metadata:
+            output += "Ingredients:\n"
+            for ing in metadata['ingredients']:
+                output += f"  - {ing}\n"
+            output += "\n"
+
+        if 'instructions' in metadata:
+            output += f"Instructions:\n{metadata['instructions']}\n\n"
+
+    return output
+
+
+def format_products(rows: List[Row]) -> str:
+    lines = []
+    for row in rows:
+        meta = row.get("metadata") or {}
+        stock = meta.get("stock_quantity") or 0
+        status = f"Stock: {stock}" if stock > 0 else "Out of stock"
+        lines.append(f"- {row.get('title')} ({meta.get('category', 'General')}) - ৳{meta.get('price')} ({status})")
+    return "\n".join(lines)
+
+
+def format_policies(rows: List[Row]) -> str:
+    return "\n\n".join(f"[{row.get('title', 'Policy').upper()}]\n{row.get('content', '')}" for row in rows)
+
+
+def get_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
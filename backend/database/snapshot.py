@@ -0,0 +1,312 @@
+"""
+Memory-mapped catalog + vector snapshot shared by all workers
+
+A builder (scripts/build_snapshot.py) writes products, recipe metadata and
+their embeddings as flat .npy arrays plus one UTF-8 string table, into a new
+version directory, then atomically repoints `CURRENT` at it:
+
+    <SNAPSHOT_DIR>/
+        CURRENT                      "20261019T081500-123456" (replaced via os.replace)
+        20261019T081500-123456/
+            manifest.json            version, row counts, dims
+            strings.bin              every name/category/id/JSON blob, concatenated
+            products.npy             fixed-width rows: offsets into strings.bin + price/stock
+            product_embeddings.npy   float32 (n_products, dim), unit length
+            recipes.npy              offsets of title and metadata JSON
+            recipe_embeddings.npy    float32 (n_recipes, dim), unit length
+
+Workers open every file with mmap, read-only. The pages live once in the OS
+page cache no matter how many uvicorn/gunicorn workers map them, so per-worker
+memory stays flat as the worker count grows. get_snapshot() notices a new
+CURRENT within SNAPSHOT_CHECK_INTERVAL_S and swaps to it; the old mapping is
+released once no request holds it any more.
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from backend.database.local_index import LocalVectorIndex, normalize
+except ModuleNotFoundError:
+    from database.local_index import LocalVectorIndex, normalize
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CURRENT = "CURRENT"
+KEEP_VERSIONS = 3
+
+_STR = [("off", "<u8"), ("len", "<u4")]
+PRODUCT_DTYPE = np.dtype([
+    ("id", _STR), ("name", _STR), ("category", _STR),
+    ("price", "<f8"), ("stock_quantity", "<i4"),
+])
+RECIPE_DTYPE = np.dtype([("title", _STR), ("metadata", _STR)])
+
+
+def default_dir() -> str:
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("SNAPSHOT_DIR", os.path.join(backend_dir, "data", "snapshot"))
+
+
+class _StringTable:
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._size = 0
+
+    def add(self, text: Optional[str]):
+        data = (text or "").encode("utf-8")
+        ref = (self._size, len(data))
+        self._parts.append(data)
+        self._size += len(data)
+        return ref
+
+    def write(self, path: str):
+        with open(path, "wb") as f:
+            for part in self._parts:
+                f.write(part)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _save(path: str, array: np.ndarray):
+    with open(path, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_snapshot(
+    products: Sequence[Dict[str, Any]],
+    recipes: Sequence[Dict[str, Any]],
+    product_vectors: Optional[np.ndarray] = None,
+    recipe_vectors: Optional[np.ndarray] = None,
+    root: Optional[str] = None,
+    source: str = "",
+) -> str:
+    """
+    Write a new snapshot version and publish it. Returns the version name.
+
+    Args:
+        products: Rows with name, price, stock_quantity, category (id optional)
+        recipes: Recipe metadata dicts (title, description, ingredients, instructions)
+        product_vectors / recipe_vectors: (n, dim) embeddings in the same order, or None
+        root: Snapshot directory (default SNAPSHOT_DIR)
+    """
+    root = root or default_dir()
+    os.makedirs(root, exist_ok=True)
+    # Sortable, so pruning and "newest" are just name order
+    now = time.time()
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f"-{int(now % 1 * 1e6):06d}"
+    staging = os.path.join(root, f".{version}.tmp")
+    os.makedirs(staging)
+
+    strings = _StringTable()
+    product_rows = np.zeros(len(products), dtype=PRODUCT_DTYPE)
+    for i, p in enumerate(products):
+        product_rows[i] = (
+            strings.add(str(p.get("id") or "")), strings.add(p["name"]), strings.add(p.get("category")),
+            float(p["price"]), int(p.get("stock_quantity") or 0),
+        )
+    recipe_rows = np.zeros(len(recipes), dtype=RECIPE_DTYPE)
+    for i, r in enumerate(recipes):
+        recipe_rows[i] = (strings.add(r.get("title")), strings.add(json.dumps(r, ensure_ascii=False)))
+
+    dims = {}
+    strings.write(os.path.join(staging, "strings.bin"))
+    _save(os.path.join(staging, "products.npy"), product_rows)
+    _save(os.path.join(staging, "recipes.npy"), recipe_rows)
+    for name, vectors, count in (("product", product_vectors, len(products)), ("recipe", recipe_vectors, len(recipes))):
+        if vectors is None:
+            continue
+        vectors = normalize(vectors)
+        if len(vectors) != count:
+            raise ValueError(f"{len(vectors)} {name} vectors for {count} {name}s")
+        _save(os.path.join(staging, f"{name}_embeddings.npy"), vectors)
+        dims[name] = int(vectors.shape[1])
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.time(),
+        "source": source,
+        "products": len(products),
+        "recipes": len(recipes),
+        "dims": dims,
+    }
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.rename(staging, os.path.join(root, version))
+    pointer = os.path.join(root, f".{CURRENT}.{version}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(root, CURRENT))
+    _prune(root, keep=version)
+    logger.info(f"Published snapshot {version}: {len(products)} products, {len(recipes)} recipes")
+    return version
+
+
+def _prune(root: str, keep: str):
+    """Drop old versions. Workers still mapping one keep their pages until they swap (unlink is safe)."""
+    versions = sorted(d for d in os.listdir(root) if not d.startswith(".") and d != CURRENT)
+    for old in versions[:-KEEP_VERSIONS]:
+        if old != keep:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+
+def read_current(root: Optional[str] = None) -> Optional[str]:
+    try:
+        with open(os.path.join(root or default_dir(), CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class Snapshot:
+    """One published version, mapped read-only."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        with open(os.path.join(path, "strings.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._strings = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.products = np.load(os.path.join(path, "products.npy"), mmap_mode="r")
+        self.recipes = np.load(os.path.join(path, "recipes.npy"), mmap_mode="r")
+        self.product_vectors = self._load_optional("product_embeddings.npy")
+        self.recipe_vectors = self._load_optional("recipe_embeddings.npy")
+        self._lock = threading.Lock()
+        self._product_dicts: Optional[List[Dict[str, Any]]] = None
+        self._recipe_index: Optional[LocalVectorIndex] = None
+
+    def _load_optional(self, name: str) -> Optional[np.ndarray]:
+        path = os.path.join(self.path, name)
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def _str(self, ref) -> str:
+        off, length = int(ref["off"]), int(ref["len"])
+        return bytes(self._strings[off:off + length]).decode("utf-8")
+
+    def product(self, i: int) -> Dict[str, Any]:
+        row = self.products[i]
+        return {
+            "id": self._str(row["id"]) or None,
+            "name": self._str(row["name"]),
+            "price": float(row["price"]),
+            "stock_quantity": int(row["stock_quantity"]),
+            "category": self._str(row["category"]) or None,
+        }
+
+    def product_rows(self) -> List[Dict[str, Any]]:
+        """All products as PRODUCT_CATALOG-shaped dicts, decoded once per version."""
+        with self._lock:
+            if self._product_dicts is None:
+                self._product_dicts = [self.product(i) for i in range(len(self.products))]
+            return self._product_dicts
+
+    def recipe(self, i: int) -> Dict[str, Any]:
+        return json.loads(self._str(self.recipes[i]["metadata"]))
+
+    def recipe_index(self, mode: str = "float32") -> Optional[LocalVectorIndex]:
+        """Index over the mapped recipe vectors (no copy for float32)."""
+        if self.recipe_vectors is None:
+            return None
+        with self._lock:
+            if self._recipe_index is None or self._recipe_index.mode != mode:
+                self._recipe_index = LocalVectorIndex(
+                    range(len(self.recipes)), self.recipe_vectors, mode=mode, normalized=True
+                )
+            return self._recipe_index
+
+    def search_recipes(self, query_vector: Sequence[float], k: int = 5) -> List[Dict[str, Any]]:
+        """match_documents-shaped rows ({metadata, similarity}) for the k nearest recipes."""
+        index = self.recipe_index(os.getenv("SNAPSHOT_INDEX_MODE", "float32"))
+        if index is None:
+            return []
+        return [{"metadata": self.recipe(i), "similarity": score} for i, score in index.search(query_vector, k)]
+
+    def close(self):
+        if isinstance(self._strings, mmap.mmap):
+            self._strings.close()
+
+
+class SnapshotHandle:
+    """Tracks CURRENT and swaps to newly published versions."""
+
+    def __init__(self, root: Optional[str] = None, check_interval_s: float = 5.0):
+        self.root = root or default_dir()
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self._checked_at = 0.0
+        self.swaps = 0
+
+    def get(self) -> Optional[Snapshot]:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval_s:
+            return self._snapshot
+        with self._lock:
+            if now - self._checked_at < self.check_interval_s:
+                return self._snapshot
+            self._checked_at = now
+            version = read_current(self.root)
+            if version and (self._snapshot is None or self._snapshot.version != version):
+                try:
+                    # The previous Snapshot's maps are released when the last
+                    # request holding it drops its reference
+                    self._snapshot = Snapshot(os.path.join(self.root, version))
+                    self.swaps += 1
+                    logger.info(f"Mapped catalog snapshot {version}")
+                except Exception as e:
+                    logger.warning(f"Could not open snapshot {version}: {e}")
+            elif not version:
+                self._snapshot = None
+            return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "root": self.root,
+            "version": snapshot.version if snapshot else None,
+            "products": len(snapshot.products) if snapshot else 0,
+            "recipes": len(snapshot.recipes) if snapshot else 0,
+            "swaps": self.swaps,
+        }
+
+
+_handle: Optional[SnapshotHandle] = None
+_handle_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv("SNAPSHOT_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def get_snapshot() -> Optional[Snapshot]:
+    """The current snapshot, or None when SNAPSHOT_ENABLED is off or nothing is published."""
+    global _handle
+    if not enabled():
+        return None
+    if _handle is None:
+        with _handle_lock:
+            if _handle is None:
+                _handle = SnapshotHandle(check_interval_s=float(os.getenv("SNAPSHOT_CHECK_INTERVAL_S", "5")))
+    return _handle.get()
+
+
+def get_stats() -> Dict[str, Any]:
+    if _handle is None:
+        return {"enabled": enabled(), "version": None}
+    return {"enabled": enabled(), **_handle.stats()}
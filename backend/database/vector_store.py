@@ -1,13 +1,27 @@
 from langchain_community.vectorstores import SupabaseVectorStore
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+import logging
 import os
 import sys
 
 # Handle imports for both direct execution and module import
 try:
     from backend.database.connection import get_supabase_client
+    from backend.database.embeddings import embed_query, get_embeddings
+    from backend.database.offline import with_fallback
+    from backend.database.retrieval import format_recipes
+    from backend.database.snapshot import get_snapshot
+    from backend.singleflight import coalesce
+    from backend.tool_cache import memoize
 except ModuleNotFoundError:
     from database.connection import get_supabase_client
+    from database.embeddings import embed_query, get_embeddings
+    from database.offline import with_fallback
+    from database.retrieval import format_recipes
+    from database.snapshot import get_snapshot
+    from singleflight import coalesce
+    from tool_cache import memoize
+
+logger = logging.getLogger(__name__)
 
 def get_vector_store():
     supabase = get_supabase_client()
@@ -18,7 +32,7 @@ def get_vector_store():
     # Let's use a model that is compatible or update the schema.
     # For simplicity, let's stick to standard FastEmbed which is 384.
     # WE MUST UPDATE SCHEMA.SQL TO 384 DIMENSIONS.
-    embeddings = FastEmbedEmbeddings()
+    embeddings = get_embeddings()
     
     vector_store = SupabaseVectorStore(
         client=supabase,
@@ -32,9 +46,12 @@ def add_recipes(texts: list[str], metadatas: list[dict]):
     vector_store = get_vector_store()
     vector_store.add_texts(texts=texts, metadatas=metadatas)
 
+# Recipes (`documents`) are not on the change feed, so only the TTL bounds reuse
+@memoize("search_recipes", ttl_s=300, cache_if=lambda text: not text.startswith("Error searching recipes"))
+@coalesce("search_recipes")
 def search_recipes(query: str, k: int = 5) -> str:
     """
-    Search for recipes using direct Supabase query
+    Search for recipes in the shared snapshot, or with a direct Supabase query
     
     Args:
         query: Search term for recipes
@@ -44,50 +61,35 @@ def search_recipes(query: str, k: int = 5) -> str:
         Formatted string with recipe details
     """
     try:
+        # Shared in-memory snapshot, when one is published: no database round trip
+        snapshot = get_snapshot()
+        if snapshot is not None and snapshot.recipe_vectors is not None:
+            rows = snapshot.search_recipes(embed_query(query), k)
+            if rows:
+                return format_recipes(rows)
+        
         # Fallback to direct Supabase query
-        print("Searching recipes...")
+        logger.debug("Searching recipes via match_documents")
         supabase = get_supabase_client()
-        embeddings = FastEmbedEmbeddings()
         
         # Generate embedding for query
-        query_embedding = list(embeddings.embed_query(query))
+        query_embedding = embed_query(query)
         
         # Call the match function directly
-        result = supabase.rpc(
-            'match_documents',
-            {
-                'query_embedding': query_embedding,
-                'match_threshold': 0.0,
-                'match_count': k
-            }
-        ).execute()
-        
-        if not result.data:
-            return "No recipes found matching your query."
-        
-        # Format as string
-        output = f"Found {len(result.data)} recipe(s):\n\n"
-        
-        for i, row in enumerate(result.data, 1):
-            metadata = row['metadata']
-            output += f"{'='*60}\n"
-            output += f"Recipe {i}: {metadata.get('title', 'Unknown')}\n"
-            output += f"{'='*60}\n"
-            
-            if 'description' in metadata:
-                output += f"Description: {metadata['description']}\n\n"
-            
-            if 'ingredients' in metadata:
-                output += "Ingredients:\n"
-                for ing in metadata['ingredients']:
-                    output += f"  - {ing}\n"
-                output += "\n"
-            
-            if 'instructions' in metadata:
-                output += f"Instructions:\n{metadata['instructions']}\n\n"
+        def remote():
+            return supabase.rpc(
+                'match_documents',
+                {
+                    'query_embedding': query_embedding,
+                    'match_threshold': 0.0,
+                    'match_count': k
+                }
+            ).execute().data
         
-        return output
+        # Keyword search over the local recipes when Supabase is down or slow
+        rows = with_fallback("search_recipes", remote, lambda data: data.search_recipes(query, k))
+        return format_recipes(rows)
         
     except Exception as e:
-        print(f"Error searching recipes: {e}")
+        logger.warning(f"Error searching recipes: {e}")
         return f"Error searching recipes: {str(e)}"
@@ -0,0 +1,101 @@
+"""
+Per-request deadlines and tool-call budgets
+
+A /chat request gets one overall time budget: the X-Request-Timeout header
+(seconds, capped at REQUEST_DEADLINE_MAX_S) or REQUEST_DEADLINE_S. It lives in
+a contextvar, so everything the request calls can see how much is left:
+
+- LLM calls (model_pool.PooledOpenAIChat) refuse to start once it has run out,
+  queue no longer than it and pass it to the OpenAI client as the HTTP timeout
+- Supabase calls (database/offline.with_fallback / bounded, including the
+  retrieve_all RPC) wait at most the remaining time, then answer from local
+  data (or give up, with OFFLINE_FALLBACK=false)
+- a request that joins an identical one already running (single-flight) waits
+  for it no longer than its own deadline
+- the retrieval prefetch wait in the orchestrator is capped by it
+
+When the budget runs out mid-answer the orchestrator returns a partial answer
+built from whatever was already retrieved instead of an error.
+
+Agents with tools also get a cap on tool calls per run (phidata's
+tool_call_limit): once reached, the model has to answer with what it has.
+"""
+import contextvars
+import os
+import time
+from typing import Dict, Optional
+
+DEADLINE_HEADER = "x-request-timeout"
+
+# Tool calls allowed per agent run, by agent role
+DEFAULT_TOOL_CALL_LIMITS = {
+    "chef": 4,     # search_recipes or plan_meals + a few check_inventory calls
+    "product": 3,  # search_products / get_available_products
+}
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before this step could run."""
+
+
+def default_s() -> float:
+    return float(os.getenv("REQUEST_DEADLINE_S", "30"))
+
+
+def parse_timeout(value: Optional[str]) -> float:
+    """Seconds from the X-Request-Timeout header, clamped; the default when absent or invalid."""
+    max_s = float(os.getenv("REQUEST_DEADLINE_MAX_S", "120"))
+    try:
+        seconds = float(value) if value else default_s()
+    except ValueError:
+        seconds = default_s()
+    return min(max(seconds, 1.0), max_s)
+
+
+def start(seconds: float) -> contextvars.Token:
+    """Give the current request `seconds` from now (until reset)."""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def ensure_started() -> Optional[contextvars.Token]:
+    """Start the default deadline unless the caller already set one. Returns the token to reset, if any."""
+    if _deadline.get() is not None:
+        return None
+    return start(default_s())
+
+
+def reset(token: Optional[contextvars.Token]):
+    if token is not None:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request (may be negative), or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def capped(timeout_s: float) -> float:
+    """`timeout_s`, shortened to what is left of the request's budget."""
+    left = remaining()
+    return timeout_s if left is None else max(0.0, min(timeout_s, left))
+
+
+def check(stage: str):
+    """Raise DeadlineExceeded if the request has no time left for `stage`."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Request deadline passed {-left:.1f}s before {stage}")
+
+
+def tool_call_limit(role: str) -> Optional[int]:
+    """Cap on tool calls per run for an agent role (AGENT_TOOL_CALL_LIMITS="chef=4,product=3")."""
+    limits: Dict[str, int] = dict(DEFAULT_TOOL_CALL_LIMITS)
+    for item in os.getenv("AGENT_TOOL_CALL_LIMITS", "").split(","):
+        if "=" in item:
+            name, limit = item.split("=", 1)
+            limits[name.strip()] = int(limit)
+    limit = limits.get(role)
+    return limit if limit and limit > 0 else None
@@ -0,0 +1,37 @@
+"""
+Fast JSON responses
+
+FastAPI's default JSONResponse goes through json.dumps; FastJSONResponse uses
+orjson instead (in requirements.txt). Without orjson it falls back to the
+standard encoder and logs a warning at import, since the speedup is then gone.
+It is the app's default response class (main.py).
+
+Returning a dict still runs FastAPI's jsonable_encoder over it first. An
+endpoint that returns a list of models can skip both steps by returning
+Response(adapter.dump_json(rows), media_type="application/json") with one of
+the TypeAdapters in database/models.py; scripts/benchmark_serialization.py
+compares the options.
+"""
+import logging
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.warning("orjson is not installed; JSON responses use the slower standard json encoder")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
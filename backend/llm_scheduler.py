@@ -0,0 +1,257 @@
+"""
+Client-side, rate-limit-aware scheduler for LLM calls.
+
+Every completion request takes a slot from per-model token buckets (requests
+per minute and tokens per minute) before it is sent. When a model is saturated,
+callers queue by priority class. Callers whose estimated wait is longer than
+their deadline are shed immediately instead of piling up and eventually
+failing with a 429.
+"""
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priority classes (lower value is served first)
+CRITICAL = 0  # support, refunds, checkout/cart
+HIGH = 1      # product availability and prices
+NORMAL = 2    # recipes, intent classification
+LOW = 3       # small talk in the OTHER route
+
+PRIORITY_NAMES = {CRITICAL: "critical", HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=NORMAL)
+
+_CHECKOUT_WORDS = ("checkout", "cart", "order", "payment", "pay", "bkash", "refund", "return", "cancel")
+# Whole words, plural allowed: "orders" counts, "border" / "payday" don't
+_CHECKOUT_PATTERN = re.compile(r"\b(?:" + "|".join(_CHECKOUT_WORDS) + r")s?\b")
+
+
+def set_priority(priority: int):
+    """Set the priority class for LLM calls made by the current request."""
+    _priority.set(priority)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def priority_for_query(user_query: str) -> int:
+    """Initial priority before intent is known: checkout/support wording jumps the queue."""
+    return CRITICAL if _CHECKOUT_PATTERN.search(user_query.lower()) else NORMAL
+
+
+class RequestShed(RuntimeError):
+    """Raised when a call cannot be scheduled before its deadline."""
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        # Allowed to go negative so an underestimate is paid back by later callers
+        self.tokens -= delta
+
+
+class _ModelQueue:
+    def __init__(self, rpm: Optional[float], tpm: Optional[float]):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.waiters = []
+        self.max_depth = 0
+        self.blocked_until = 0.0
+
+    def wait_time(self, est_tokens: float, now: float) -> float:
+        wait = max(0.0, self.blocked_until - now)
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(est_tokens, now))
+        return wait
+
+    def backlog_time(self, priority: int) -> float:
+        """Rough time needed to drain the waiters that would be served before `priority`."""
+        ahead = [w for w in self.waiters if w[0] <= priority]
+        seconds = 0.0
+        if self.requests:
+            seconds = max(seconds, len(ahead) / self.requests.rate)
+        if self.tokens:
+            seconds = max(seconds, sum(w[2] for w in ahead) / self.tokens.rate)
+        return seconds
+
+
+class LLMScheduler:
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None, default_deadline_s: float = 20.0):
+        self.limits = limits or {}
+        self.default_deadline_s = default_deadline_s
+        self._cond = threading.Condition()
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+        self._waits = deque(maxlen=1000)
+        self._admitted: Dict[str, int] = {}
+        self._shed: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "LLMScheduler":
+        """
+        LLM_RATE_LIMITS is a JSON object of model id -> {"rpm": ..., "tpm": ...};
+        the "*" entry (or LLM_DEFAULT_RPM / LLM_DEFAULT_TPM) applies to all other models.
+        """
+        limits = json.loads(os.getenv("LLM_RATE_LIMITS", "{}") or "{}")
+        default = limits.setdefault("*", {})
+        if os.getenv("LLM_DEFAULT_RPM"):
+            default.setdefault("rpm", float(os.getenv("LLM_DEFAULT_RPM")))
+        if os.getenv("LLM_DEFAULT_TPM"):
+            default.setdefault("tpm", float(os.getenv("LLM_DEFAULT_TPM")))
+        return cls(limits, default_deadline_s=float(os.getenv("LLM_QUEUE_DEADLINE_S", "20")))
+
+    def _queue(self, model_id: str) -> _ModelQueue:
+        queue = self._queues.get(model_id)
+        if queue is None:
+            limits = self.limits.get(model_id) or self.limits.get("*") or {}
+            queue = self._queues[model_id] = _ModelQueue(limits.get("rpm"), limits.get("tpm"))
+        return queue
+
+    def _count(self, counter: Dict[str, int], priority: int):
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        counter[name] = counter.get(name, 0) + 1
+
+    def acquire(self, model_id: str, est_tokens: float, priority: Optional[int] = None, deadline_s: Optional[float] = None):
+        """
+        Block until a slot for `model_id` is available, or raise RequestShed.
+
+        Args:
+            model_id: Model the request will be sent to
+            est_tokens: Estimated prompt + completion tokens
+            priority: Priority class, defaults to the current request's
+            deadline_s: Maximum time to queue, defaults to LLM_QUEUE_DEADLINE_S
+        """
+        priority = current_priority() if priority is None else priority
+        started = time.monotonic()
+        deadline = started + (self.default_deadline_s if deadline_s is None else deadline_s)
+
+        with self._cond:
+            queue = self._queue(model_id)
+            estimate = max(queue.wait_time(est_tokens, started), queue.backlog_time(priority))
+            if started + estimate > deadline:
+                self._count(self._shed, priority)
+                raise RequestShed(
+                    f"{model_id} is saturated: estimated wait {estimate:.1f}s exceeds deadline {deadline - started:.1f}s"
+                )
+
+            if not queue.waiters and estimate <= 0 and not (queue.requests or queue.tokens):
+                # Unlimited model with nobody queued: admit without touching the heap
+                self._count(self._admitted, priority)
+                self._waits.append(0.0)
+                return
+
+            waiter = (priority, next(self._seq), est_tokens)
+            heapq.heappush(queue.waiters, waiter)
+            queue.max_depth = max(queue.max_depth, len(queue.waiters))
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = queue.wait_time(est_tokens, now)
+                    if queue.waiters[0] is waiter and wait <= 0:
+                        break
+                    if now + wait > deadline or now >= deadline:
+                        self._count(self._shed, priority)
+                        raise RequestShed(f"{model_id}: queue deadline exceeded after {now - started:.1f}s")
+                    self._cond.wait(timeout=min(max(wait, 0.01), deadline - now))
+
+                if queue.requests:
+                    queue.requests.consume(1, now)
+                if queue.tokens:
+                    queue.tokens.consume(est_tokens, now)
+            finally:
+                queue.waiters.remove(waiter)
+                heapq.heapify(queue.waiters)
+                self._cond.notify_all()
+
+            self._count(self._admitted, priority)
+            self._waits.append(time.monotonic() - started)
+
+    def estimated_wait(self, model_id: str, est_tokens: float, priority: Optional[int] = None) -> float:
+        """Seconds a call would currently have to queue for `model_id`."""
+        priority = current_priority() if priority is None else priority
+        with self._cond:
+            queue = self._queue(model_id)
+            return max(queue.wait_time(est_tokens, time.monotonic()), queue.backlog_time(priority))
+
+    def settle(self, model_id: str, est_tokens: float, actual_tokens: Optional[float]):
+        """Correct the token bucket once the real usage is known."""
+        if actual_tokens is None:
+            return
+        with self._cond:
+            queue = self._queue(model_id)
+            if queue.tokens:
+                queue.tokens.adjust(actual_tokens - est_tokens)
+
+    def penalize(self, model_id: str, retry_after_s: float):
+        """Stop sending to `model_id` for a while after the provider returned 429."""
+        with self._cond:
+            queue = self._queue(model_id)
+            queue.blocked_until = max(queue.blocked_until, time.monotonic() + retry_after_s)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits)
+            queues = {
+                model_id: {"depth": len(q.waiters), "max_depth": q.max_depth}
+                for model_id, q in self._queues.items()
+            }
+            admitted = dict(self._admitted)
+            shed = dict(self._shed)
+
+        def pct(p):
+            return waits[min(len(waits) - 1, int(p / 100.0 * len(waits)))] if waits else None
+
+        return {
+            "queues": queues,
+            "admitted": admitted,
+            "shed": shed,
+            "wait_p50_s": pct(50),
+            "wait_p95_s": pct(95),
+            "wait_max_s": waits[-1] if waits else None,
+        }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler.from_env()
+        return _scheduler
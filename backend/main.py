@@ -1,18 +1,51 @@
+import logging
 import sys
 import os
 
 # Add the project root to the python path to allow imports from backend
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, HTTPException
+# Before the backend imports below, so their module-level loggers go through the queue
+from backend.structured_logging import (
+    configure_logging, get_request_id, get_stats as get_logging_stats, new_request_id,
+    reset_request_id, set_request_id, shutdown_logging,
+)
+configure_logging()
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from backend.agents.orchestrator import handle_request
+from backend.singleflight import get_stats as get_singleflight_stats
+from backend.model_pool import get_pool
+from backend.llm_scheduler import get_scheduler
+from backend.batch import DEFAULT_CONCURRENCY, run_batch_jsonl
+from backend.database.change_feed import get_change_feed, start_change_feed
+from backend.database.catalog_cache import get_stats as get_catalog_cache_stats
+from backend.database.retrieval import get_stats as get_retrieval_stats
+from backend.agents.product_fast_path import get_stats as get_product_fast_path_stats
+from backend.database.snapshot import get_stats as get_snapshot_stats
+from backend.database.embeddings import get_stats as get_embedding_stats
+from backend.database.offline import get_stats as get_offline_stats
+from backend.tool_cache import get_stats as get_tool_cache_stats
+from backend.deadline import DEADLINE_HEADER, parse_timeout
+from backend.warmup import get_warmup, readiness, start_warmup
+from backend.json_response import FastJSONResponse
+from backend.profiling import (
+    ADMIN_TOKEN_HEADER, FORMATS as PROFILE_FORMATS, PROFILE_HEADER, get_stats as get_profiling_stats,
+    is_admin, list_profiles, profile_path, save as save_profile, should_profile, start as start_profile,
+    stop as stop_profile, track_thread,
+)
 
 load_dotenv()
 
-app = FastAPI(title="recipe AI Multi-Agent System")
+logger = logging.getLogger(__name__)
+
+# orjson-encoded responses when orjson is installed (json_response.py)
+app = FastAPI(title="recipe AI Multi-Agent System", default_response_class=FastJSONResponse)
 
 # Configure CORS - Allow all origins for production
 app.add_middleware(
@@ -23,6 +56,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Registered before request_id_middleware so it runs inside it and sees the request ID
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    """Sample the stacks of requests asked for by an admin or picked at PROFILE_SAMPLE_RATE (profiling.py)."""
+    profile_paths = os.getenv("PROFILE_PATHS", "/chat").split(",")
+    if request.url.path not in profile_paths or not should_profile(
+        request.headers.get(PROFILE_HEADER), request.headers.get(ADMIN_TOKEN_HEADER)
+    ):
+        return await call_next(request)
+    profile, token = start_profile(f"{request.method} {request.url.path}", get_request_id())
+    try:
+        response = await call_next(request)
+    finally:
+        stop_profile(profile, token)
+        # Serializing and writing the files is blocking I/O: keep it off the event loop
+        profile_id = await run_in_threadpool(save_profile, profile)
+    if profile_id:
+        response.headers["X-Profile-ID"] = profile_id
+    return response
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag every log line of a request with X-Request-ID (generated when absent)."""
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = set_request_id(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.on_event("startup")
+def start_background_services():
+    start_change_feed()
+    start_warmup()
+
+@app.on_event("shutdown")
+def stop_background_services():
+    get_change_feed().stop()
+    get_warmup().stop()
+    shutdown_logging()
+
 class ChatRequest(BaseModel):
     message: str
 
@@ -30,17 +106,81 @@ class ChatRequest(BaseModel):
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+def readiness_check():
+    """503 until the embedding model, catalog and database are warm (see warmup.py)."""
+    report = readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "singleflight": get_singleflight_stats(),
+        "model_pool": get_pool().stats(),
+        "llm_scheduler": get_scheduler().stats(),
+        "change_feed": get_change_feed().stats(),
+        "catalog_cache": get_catalog_cache_stats(),
+        "retrieval": get_retrieval_stats(),
+        "product_fast_path": get_product_fast_path_stats(),
+        "snapshot": get_snapshot_stats(),
+        "logging": get_logging_stats(),
+        "embeddings": get_embedding_stats(),
+        "offline": get_offline_stats(),
+        "tool_cache": get_tool_cache_stats(),
+        "profiling": get_profiling_stats(),
+    }
+
+def _require_admin(request: Request):
+    if not is_admin(request.headers.get(ADMIN_TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/profiles")
+def list_profiles_endpoint(request: Request):
+    """Stored request profiles, newest first, with their download links."""
+    _require_admin(request)
+    return {
+        "profiles": [
+            {**p, "downloads": {fmt: f"/profiles/{p['id']}?format={fmt}" for fmt in PROFILE_FORMATS}}
+            for p in list_profiles()
+        ]
+    }
+
+@app.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, request: Request, format: str = "speedscope"):
+    """One profile as speedscope JSON or collapsed stacks (format=folded)."""
+    _require_admin(request)
+    path = profile_path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if format == "speedscope" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
 @app.post("/chat")
-def chat_endpoint(request: ChatRequest):
+def chat_endpoint(request: ChatRequest, http_request: Request):
     try:
-        response = handle_request(request.message)
+        # X-Request-Timeout (seconds) bounds the whole answer, see deadline.py
+        deadline_s = parse_timeout(http_request.headers.get(DEADLINE_HEADER))
+        # Sampled when this request is being profiled (profiling.py)
+        with track_thread():
+            response = handle_request(request.message, deadline_s=deadline_s)
         return {"response": response}
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Error processing request: {e}")
+        logger.exception(f"Error processing request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: Request, concurrency: int = DEFAULT_CONCURRENCY):
+    """
+    Run a JSONL body of queries ({"id": ..., "message": ...} per line) and
+    stream one JSON result per line, followed by a summary line.
+    """
+    body = (await request.body()).decode("utf-8")
+    return StreamingResponse(
+        # The stream is consumed after this handler returns, so pass the ID along explicitly
+        run_batch_jsonl(body.splitlines(), concurrency=concurrency, request_id=get_request_id()),
+        media_type="application/x-ndjson",
+    )
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to recipe AI Backend"}
@@ -3,6 +3,11 @@ from phi.model.openai import OpenAIChat
 from dotenv import load_dotenv
 import logging
 
+try:
+    from backend.model_pool import ModelEndpoint, PooledOpenAIChat
+except ModuleNotFoundError:
+    from model_pool import ModelEndpoint, PooledOpenAIChat
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,8 +18,41 @@ load_dotenv(os.path.join(backend_dir, '.env'))
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemini-2.0-flash-exp:free")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+# Comma-separated backup models, tried (and hedged to) in order when the primary is slow or failing
+OPENROUTER_FALLBACK_MODELS = [
+    m.strip() for m in os.getenv("OPENROUTER_FALLBACK_MODELS", "").split(",") if m.strip()
+]
+
+# Which model tier each agent role uses. Routing and small talk don't need the
+# model that writes multi-recipe chef answers.
+ROLE_TIERS = {
+    "router": "small",    # orchestrator intent classification
+    "chat": "small",      # OTHER route: greetings, thanks, small talk
+    "support": "medium",
+    "product": "medium",
+    "chef": "large",
+}
+
+def resolve_model_id(role: str = None) -> str:
+    """
+    Resolve the OpenRouter model for an agent role.
 
-def get_model():
+    Lookup order: LLM_MODEL_<ROLE> (e.g. LLM_MODEL_CHEF), then the role's tier
+    LLM_MODEL_<TIER> (SMALL / MEDIUM / LARGE), then OPENROUTER_MODEL.
+    Read at call time so benchmarks can switch tier configurations in-process.
+    """
+    default = os.getenv("OPENROUTER_MODEL", OPENROUTER_MODEL)
+    if not role:
+        return default
+    tier = ROLE_TIERS.get(role)
+    return (
+        os.getenv(f"LLM_MODEL_{role.upper()}")
+        or (tier and os.getenv(f"LLM_MODEL_{tier.upper()}"))
+        or default
+    )
+
+def get_model(role: str = None):
     if not OPENROUTER_API_KEY:
         # Fallback to OpenAI if OpenRouter key is missing but OpenAI key exists
         if os.getenv("OPENAI_API_KEY"):
@@ -22,13 +60,21 @@ def get_model():
             return OpenAIChat(id="gpt-4o")
         raise ValueError("OPENROUTER_API_KEY or OPENAI_API_KEY must be set.")
 
-    logger.info(f"Using OpenRouter with model: {OPENROUTER_MODEL}")
+    model_id = resolve_model_id(role)
+    fallbacks = [m for m in OPENROUTER_FALLBACK_MODELS if m != model_id]
+    logger.info(f"Using OpenRouter with model: {model_id} for role {role or 'default'} (fallbacks: {fallbacks or 'none'})")
+    
+    endpoints = [
+        ModelEndpoint(model_id=m, base_url=OPENROUTER_BASE_URL, api_key=OPENROUTER_API_KEY)
+        for m in [model_id] + fallbacks
+    ]
     
     # OpenRouter requires specific headers
-    return OpenAIChat(
-        id=OPENROUTER_MODEL,
+    return PooledOpenAIChat(
+        id=model_id,
         api_key=OPENROUTER_API_KEY,
-        base_url="https://openrouter.ai/api/v1",
+        base_url=OPENROUTER_BASE_URL,
+        endpoints=endpoints,
         extra_headers={
             "HTTP-Referer": "http://localhost:3000",  # Required by OpenRouter
             "X-Title": "recipe AI Multi-Agent System"  # Optional but recommended
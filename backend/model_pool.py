@@ -0,0 +1,512 @@
+"""
+Model pool with per-endpoint circuit breakers and hedged requests.
+
+Every chat completion goes to the first healthy model in the pool. If it has
+not answered within the model's recent latency percentile, a hedged request is
+sent to the next healthy model and whichever answers first wins. Failures trip
+a circuit breaker so a rate-limited or broken model is skipped until its
+cooldown expires.
+"""
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from openai import APITimeoutError, OpenAI, RateLimitError
+from phi.model.openai import OpenAIChat
+
+try:
+    from backend import deadline
+    from backend.llm_scheduler import RequestShed, current_priority, get_scheduler
+    from backend.profiling import traced
+except ModuleNotFoundError:
+    import deadline
+    from llm_scheduler import RequestShed, current_priority, get_scheduler
+    from profiling import traced
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class PoolConfig:
+    hedge_enabled: bool = True
+    hedge_percentile: float = 95.0
+    hedge_min_delay_s: float = 1.0
+    hedge_default_delay_s: float = 8.0
+    hedge_min_samples: int = 10
+    breaker_failure_threshold: int = 3
+    breaker_cooldown_s: float = 30.0
+    request_timeout_s: float = 60.0
+    max_workers: int = 16
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            hedge_enabled=_env_bool("LLM_HEDGE_ENABLED", True),
+            hedge_percentile=_env_float("LLM_HEDGE_PERCENTILE", 95.0),
+            hedge_min_delay_s=_env_float("LLM_HEDGE_MIN_DELAY_S", 1.0),
+            hedge_default_delay_s=_env_float("LLM_HEDGE_DEFAULT_DELAY_S", 8.0),
+            hedge_min_samples=int(_env_float("LLM_HEDGE_MIN_SAMPLES", 10)),
+            breaker_failure_threshold=int(_env_float("LLM_BREAKER_FAILURES", 3)),
+            breaker_cooldown_s=_env_float("LLM_BREAKER_COOLDOWN_S", 30.0),
+            request_timeout_s=_env_float("LLM_REQUEST_TIMEOUT_S", 60.0),
+            max_workers=int(_env_float("LLM_POOL_WORKERS", 16)),
+        )
+
+
+@dataclass(frozen=True)
+class ModelEndpoint:
+    model_id: str
+    base_url: str
+    api_key: str = field(repr=False)
+
+    @property
+    def key(self) -> str:
+        return f"{self.base_url}|{self.model_id}"
+
+
+class CircuitBreaker:
+    """Classic closed -> open -> half-open breaker driven by consecutive failures."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, cooldown_s: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_s:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half-open: let exactly one trial request through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def cancel_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p / 100.0 * (len(samples) - 1)))))
+        return samples[index]
+
+
+class AllModelsUnavailable(RuntimeError):
+    pass
+
+
+class _EndpointState:
+    def __init__(self, endpoint: ModelEndpoint, config: PoolConfig):
+        self.endpoint = endpoint
+        self.breaker = CircuitBreaker(config.breaker_failure_threshold, config.breaker_cooldown_s)
+        self.latency = LatencyTracker()
+        self.successes = 0
+        self.failures = 0
+        self.hedges_sent = 0
+        self.wins = 0
+
+
+class ModelPool:
+    def __init__(self, config: Optional[PoolConfig] = None):
+        self.config = config or PoolConfig.from_env()
+        self._lock = threading.Lock()
+        self._states: Dict[str, _EndpointState] = {}
+        self._clients: Dict[tuple, OpenAI] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="llm-pool")
+
+    def _state(self, endpoint: ModelEndpoint) -> _EndpointState:
+        with self._lock:
+            state = self._states.get(endpoint.key)
+            if state is None:
+                state = self._states[endpoint.key] = _EndpointState(endpoint, self.config)
+            return state
+
+    def client(self, endpoint: ModelEndpoint) -> OpenAI:
+        cache_key = (endpoint.base_url, endpoint.api_key)
+        with self._lock:
+            client = self._clients.get(cache_key)
+            if client is None:
+                # The pool does its own failover, so keep SDK retries low
+                client = OpenAI(
+                    api_key=endpoint.api_key,
+                    base_url=endpoint.base_url,
+                    timeout=self.config.request_timeout_s,
+                    max_retries=1,
+                )
+                self._clients[cache_key] = client
+            return client
+
+    def warm(self, endpoints: List[ModelEndpoint]) -> int:
+        """
+        Open a connection on each distinct client with a GET /models (no tokens
+        spent), so the first completion doesn't pay for DNS + TLS. Returns the
+        number of clients warmed.
+        """
+        warmed = set()
+        for endpoint in endpoints:
+            cache_key = (endpoint.base_url, endpoint.api_key)
+            if cache_key not in warmed:
+                self.client(endpoint).models.list()
+                warmed.add(cache_key)
+        return len(warmed)
+
+    def hedge_delay(self, endpoint: ModelEndpoint) -> Optional[float]:
+        if not self.config.hedge_enabled:
+            return None
+        tracker = self._state(endpoint).latency
+        if len(tracker) < self.config.hedge_min_samples:
+            return self.config.hedge_default_delay_s
+        return max(self.config.hedge_min_delay_s, tracker.percentile(self.config.hedge_percentile))
+
+    def _run(self, endpoint: ModelEndpoint, fn: Callable[[ModelEndpoint], Any]) -> Any:
+        state = self._state(endpoint)
+        started = time.monotonic()
+        try:
+            result = fn(endpoint)
+        except (RequestShed, deadline.DeadlineExceeded):
+            # Shedding and request deadlines are our own limits, not a sign the model is unhealthy
+            state.breaker.cancel_trial()
+            raise
+        except Exception as e:
+            state.failures += 1
+            state.breaker.record_failure()
+            logger.warning(f"LLM call to {endpoint.model_id} failed after {time.monotonic() - started:.2f}s: {e}")
+            raise
+        state.successes += 1
+        state.latency.record(time.monotonic() - started)
+        state.breaker.record_success()
+        return result
+
+    def call(
+        self,
+        endpoints: List[ModelEndpoint],
+        fn: Callable[[ModelEndpoint], Any],
+        queue_wait: Optional[Callable[[ModelEndpoint], float]] = None,
+    ) -> Any:
+        """
+        Run `fn(endpoint)` against the pool, hedging and failing over as needed.
+
+        Args:
+            endpoints: Endpoints in preference order (primary first)
+            fn: Performs the actual request for one endpoint
+            queue_wait: Optional estimate of how long a call would queue locally
+                        for an endpoint; saturated endpoints are tried last
+
+        Returns:
+            The first successful result
+        """
+        remaining = list(endpoints)
+        if queue_wait is not None and len(remaining) > 1:
+            # Stable sort keeps preference order among endpoints that can take the call now
+            remaining.sort(key=lambda ep: queue_wait(ep) > (self.hedge_delay(ep) or 0.0))
+        pending = {}
+        last_error: Optional[Exception] = None
+
+        def launch_next(hedge: bool) -> bool:
+            while remaining:
+                endpoint = remaining.pop(0)
+                state = self._state(endpoint)
+                if not state.breaker.allow():
+                    continue
+                if hedge:
+                    state.hedges_sent += 1
+                    logger.info(f"Hedging LLM request to backup model {endpoint.model_id}")
+                # The request's context rides along, so a profiled request samples this worker too
+                call = functools.partial(traced(self._run), endpoint, fn)
+                pending[self._executor.submit(contextvars.copy_context().run, call)] = endpoint
+                return True
+            return False
+
+        if not launch_next(hedge=False):
+            raise AllModelsUnavailable("All models in the pool have open circuit breakers")
+
+        while pending:
+            # Only wait for the hedge delay of the most recently launched request
+            # if there is still somebody to hedge to.
+            newest = list(pending.values())[-1]
+            timeout = self.hedge_delay(newest) if remaining else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                launch_next(hedge=True)
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                self._state(endpoint).wins += 1
+                # Losing hedges keep running in the background; their outcome
+                # still feeds the breakers and latency trackers.
+                return result
+
+            if not pending and not launch_next(hedge=False):
+                break
+
+        if last_error is not None:
+            raise last_error
+        raise AllModelsUnavailable("All models in the pool have open circuit breakers")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            states = list(self._states.values())
+        return {
+            s.endpoint.model_id: {
+                "base_url": s.endpoint.base_url,
+                "breaker": s.breaker.state,
+                "successes": s.successes,
+                "failures": s.failures,
+                "hedges_sent": s.hedges_sent,
+                "wins": s.wins,
+                "p50_s": s.latency.percentile(50),
+                "p95_s": s.latency.percentile(95),
+            }
+            for s in states
+        }
+
+
+_pool: Optional[ModelPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ModelPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ModelPool()
+        return _pool
+
+
+_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "512"))
+
+
+def _retry_after_seconds(error: RateLimitError, default: float = 10.0) -> float:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+def _estimate_tokens(messages: List[Dict[str, Any]], request_kwargs: Dict[str, Any]) -> int:
+    """~4 characters per token for the prompt plus the expected completion size."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages)
+    chars += len(str(request_kwargs.get("tools") or ""))
+    return chars // 4 + (request_kwargs.get("max_tokens") or _EXPECTED_OUTPUT_TOKENS)
+
+
+class PooledOpenAIChat(OpenAIChat):
+    """
+    OpenAIChat whose completions are served by the shared ModelPool.
+
+    Tools, response format and sampling params still come from this model (the
+    agent configures them here); only the endpoint and model id vary.
+    """
+
+    endpoints: List[ModelEndpoint] = []
+
+    def invoke(self, messages):
+        formatted = [self.format_message(m) for m in messages]
+        request_kwargs = self.request_kwargs
+        pool = get_pool()
+        scheduler = get_scheduler()
+        # Captured once here, so hedges and failovers launched later all use the caller's values
+        priority = current_priority()
+        est_tokens = _estimate_tokens(formatted, request_kwargs)
+        # Every step of an agent's tool loop comes through here, so this also ends the loop
+        deadline.check("LLM call")
+        left = deadline.remaining()
+        expires_at = None if left is None else time.monotonic() + left
+
+        def complete(endpoint: ModelEndpoint):
+            client = pool.client(endpoint)
+            queue_deadline = None
+            cut_short = False
+            if expires_at is not None:
+                left = expires_at - time.monotonic()
+                queue_deadline = min(scheduler.default_deadline_s, left)
+                cut_short = left < pool.config.request_timeout_s
+                if cut_short:
+                    # No SDK retry either: it could not finish in time
+                    client = client.with_options(timeout=max(left, 0.1), max_retries=0)
+            scheduler.acquire(endpoint.model_id, est_tokens, priority, deadline_s=queue_deadline)
+            try:
+                response = client.chat.completions.create(
+                    model=endpoint.model_id,
+                    messages=formatted,
+                    **request_kwargs,
+                )
+            except RateLimitError as e:
+                scheduler.penalize(endpoint.model_id, _retry_after_seconds(e))
+                raise
+            except APITimeoutError as e:
+                if cut_short:
+                    raise deadline.DeadlineExceeded(f"{endpoint.model_id} did not answer before the request deadline") from e
+                raise
+            usage = getattr(response, "usage", None)
+            scheduler.settle(endpoint.model_id, est_tokens, getattr(usage, "total_tokens", None))
+            return response
+
+        return pool.call(
+            self.endpoints,
+            complete,
+            queue_wait=lambda endpoint: scheduler.estimated_wait(endpoint.model_id, est_tokens, priority),
+        )
+
+    def invoke_stream(self, messages):
+        """
+        Stream from the first endpoint whose breaker lets the call through.
+
+        Streams cannot be hedged, but they go through the same scheduler,
+        deadline and breaker bookkeeping as invoke(): success is recorded at the
+        first chunk, and an endpoint that fails before yielding anything fails
+        over to the next one.
+        """
+        formatted = [self.format_message(m) for m in messages]
+        request_kwargs = self.request_kwargs
+        pool = get_pool()
+        scheduler = get_scheduler()
+        priority = current_priority()
+        est_tokens = _estimate_tokens(formatted, request_kwargs)
+        deadline.check("LLM call")
+        last_error: Optional[Exception] = None
+
+        for endpoint in self.endpoints:
+            state = pool._state(endpoint)
+            if not state.breaker.allow():
+                continue
+            client = pool.client(endpoint)
+            queue_deadline = None
+            cut_short = False
+            left = deadline.remaining()
+            if left is not None:
+                queue_deadline = min(scheduler.default_deadline_s, left)
+                cut_short = left < pool.config.request_timeout_s
+                if cut_short:
+                    client = client.with_options(timeout=max(left, 0.1), max_retries=0)
+            started = time.monotonic()
+            yielded = False
+            usage = None
+            try:
+                scheduler.acquire(endpoint.model_id, est_tokens, priority, deadline_s=queue_deadline)
+                stream = client.chat.completions.create(
+                    model=endpoint.model_id,
+                    messages=formatted,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **request_kwargs,
+                )
+                for chunk in stream:
+                    if not yielded:
+                        state.successes += 1
+                        state.latency.record(time.monotonic() - started)
+                        state.breaker.record_success()
+                        yielded = True
+                    usage = getattr(chunk, "usage", None) or usage
+                    yield chunk
+            except GeneratorExit:
+                # The consumer stopped reading: says nothing about the model's health
+                if not yielded:
+                    state.breaker.cancel_trial()
+                raise
+            except (RequestShed, deadline.DeadlineExceeded):
+                state.breaker.cancel_trial()
+                raise
+            except Exception as e:
+                if isinstance(e, APITimeoutError) and cut_short:
+                    # Our deadline, not the model's fault (as in invoke)
+                    state.breaker.cancel_trial()
+                    raise deadline.DeadlineExceeded(
+                        f"{endpoint.model_id} did not answer before the request deadline"
+                    ) from e
+                if isinstance(e, RateLimitError):
+                    scheduler.penalize(endpoint.model_id, _retry_after_seconds(e))
+                state.failures += 1
+                state.breaker.record_failure()
+                logger.warning(f"LLM stream from {endpoint.model_id} failed after {time.monotonic() - started:.2f}s: {e}")
+                if yielded:
+                    # Part of the answer is already out; another model can't continue it
+                    raise
+                last_error = e
+                continue
+            scheduler.settle(endpoint.model_id, est_tokens, getattr(usage, "total_tokens", None))
+            return
+
+        if last_error is not None:
+            raise last_error
+        raise AllModelsUnavailable("All models in the pool have open circuit breakers")
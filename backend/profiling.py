@@ -0,0 +1,360 @@
+"""
+On-demand sampling profiler for /chat requests
+
+A profiled request has its Python stacks sampled every PROFILE_INTERVAL_MS by
+one background thread (sys._current_frames(), no tracing hooks), so the
+request runs at close to full speed and unprofiled requests pay nothing.
+A request is profiled when:
+
+- it carries X-Profile: 1 and X-Admin-Token matching PROFILE_ADMIN_TOKEN, or
+- it is picked at random at PROFILE_SAMPLE_RATE (0 to 1, default 0)
+
+Only the threads working for the request are sampled: the endpoint's thread
+(track_thread) and pool workers running functions wrapped with traced() (the
+orchestrator's retrieval prefetch and fan-out branches, and the model pool's
+LLM calls, hedges included).
+
+Each profile is written to PROFILE_DIR twice: <id>.speedscope.json (one
+sampled profile per thread, opens in https://www.speedscope.app) and
+<id>.folded (collapsed stacks in microseconds, for flamegraph.pl / inferno).
+Writing happens in save(), off the event loop (main.py runs it in the
+threadpool). The newest PROFILE_KEEP profiles are kept. GET /profiles lists them and
+GET /profiles/{id}?format=speedscope|folded downloads one (both need the
+admin token).
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+FORMATS = {"speedscope": ".speedscope.json", "folded": ".folded"}
+MAX_DEPTH = 128
+
+Frame = Tuple[str, str, int]  # (file, function, first line)
+_PROFILE_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+def enabled() -> bool:
+    return os.getenv("PROFILING", "true").lower() in ("1", "true", "yes")
+
+
+def admin_token() -> Optional[str]:
+    return os.getenv("PROFILE_ADMIN_TOKEN") or None
+
+
+def is_admin(token: Optional[str]) -> bool:
+    expected = admin_token()
+    return expected is not None and token == expected
+
+
+def sample_rate() -> float:
+    return float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+
+def interval_s() -> float:
+    return float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+
+
+def profile_dir() -> str:
+    return os.getenv("PROFILE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "profiles"
+    )
+
+
+def should_profile(profile_header: Optional[str], token: Optional[str]) -> bool:
+    """Whether to profile a request with these X-Profile / X-Admin-Token header values."""
+    if not enabled():
+        return False
+    if profile_header and profile_header.lower() in ("1", "true", "yes") and is_admin(token):
+        return True
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+class Profile:
+    def __init__(self, name: str, request_id: Optional[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.request_id = request_id
+        self.created = time.time()
+        self.started = time.perf_counter()
+        self.duration_s = 0.0
+        self._lock = threading.Lock()
+        # Thread id -> (thread name, how many tracked scopes are open on it)
+        self._threads: Dict[int, Tuple[str, int]] = {}
+        # Thread name -> stack -> milliseconds spent in it
+        self.stacks: Dict[str, Counter] = {}
+        self.samples = 0
+
+    def enter_thread(self):
+        thread = threading.current_thread()
+        with self._lock:
+            name, depth = self._threads.get(thread.ident, (thread.name, 0))
+            self._threads[thread.ident] = (name, depth + 1)
+
+    def exit_thread(self):
+        ident = threading.get_ident()
+        with self._lock:
+            name, depth = self._threads.get(ident, ("", 1))
+            if depth <= 1:
+                self._threads.pop(ident, None)
+            else:
+                self._threads[ident] = (name, depth - 1)
+
+    def sample(self, frames: Dict[int, Any], weight_ms: float):
+        with self._lock:
+            threads = list(self._threads.items())
+        for ident, (thread_name, _) in threads:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack: List[Frame] = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            with self._lock:
+                self.stacks.setdefault(thread_name, Counter())[tuple(stack)] += weight_ms
+                self.samples += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "request_id": self.request_id,
+            "created": self.created,
+            "duration_s": round(self.duration_s, 4),
+            "samples": self.samples,
+            "interval_ms": interval_s() * 1000,
+        }
+
+
+def _frame_name(frame: Frame) -> str:
+    filename, function, _ = frame
+    return f"{function} ({os.path.basename(filename)})"
+
+
+def to_speedscope(profile: Profile) -> Dict[str, Any]:
+    frames: List[Dict[str, Any]] = []
+    index: Dict[Frame, int] = {}
+    profiles = []
+    for thread_name, stacks in profile.stacks.items():
+        samples, weights = [], []
+        for stack, ms in stacks.most_common():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[1], "file": frame[0], "line": frame[2]})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(round(ms, 3))
+        profiles.append({
+            "type": "sampled",
+            "name": thread_name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 3),
+            "samples": samples,
+            "weights": weights,
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"{profile.name} {profile.request_id or profile.id}",
+        "exporter": "recipe-ai profiling.py",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def to_folded(profile: Profile) -> str:
+    lines = []
+    for thread_name, stacks in profile.stacks.items():
+        for stack, ms in stacks.most_common():
+            names = [thread_name] + [_frame_name(frame).replace(";", ":") for frame in stack]
+            # Whole microseconds: folded-stack tools expect integer counts
+            lines.append(f"{';'.join(names)} {max(1, round(ms * 1000))}")
+    return "\n".join(lines) + "\n"
+
+
+class Sampler:
+    """One background thread sampling every active profile; runs only while there is one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Dict[str, Profile] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.profiles = 0
+        self.samples = 0
+        self.sampling_s = 0.0
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: Profile):
+        with self._lock:
+            self._active.pop(profile.id, None)
+            self.profiles += 1
+            self.samples += profile.samples
+
+    def _run(self):
+        last = time.perf_counter()
+        while True:
+            with self._lock:
+                profiles = list(self._active.values())
+                if not profiles:
+                    self._thread = None
+                    return
+            started = time.perf_counter()
+            # Weigh each sample by the time since the previous one: under GIL
+            # contention samples come less often than the interval
+            weight_ms, last = (started - last) * 1000, started
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.sample(frames, weight_ms)
+            del frames
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.sampling_s += elapsed
+            time.sleep(max(interval_s() - elapsed, 0.0005))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active": len(self._active),
+                "profiles": self.profiles,
+                "samples": self.samples,
+                "sampling_s": round(self.sampling_s, 4),
+            }
+
+
+_sampler = Sampler()
+_current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("profile", default=None)
+
+
+def start(name: str, request_id: Optional[str] = None) -> Tuple[Profile, contextvars.Token]:
+    """Begin profiling the current request (until stop)."""
+    profile = Profile(name, request_id)
+    token = _current.set(profile)
+    _sampler.add(profile)
+    return profile, token
+
+
+def stop(profile: Profile, token: contextvars.Token):
+    """Stop sampling; call from the context start() ran in, then save() the profile."""
+    _current.reset(token)
+    _sampler.remove(profile)
+    profile.duration_s = time.perf_counter() - profile.started
+
+
+def save(profile: Profile) -> Optional[str]:
+    """Write a stopped profile's files and return its id (None if writing failed). Blocking I/O."""
+    try:
+        _write(profile)
+    except OSError as e:
+        logger.warning(f"Could not write profile {profile.id}: {e}")
+        return None
+    logger.info(f"Profiled {profile.name}: {profile.samples} samples over {profile.duration_s:.2f}s -> {profile.id}")
+    return profile.id
+
+
+@contextlib.contextmanager
+def track_thread() -> Iterator[None]:
+    """Sample the calling thread for the current request's profile, if there is one."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    profile.enter_thread()
+    try:
+        yield
+    finally:
+        profile.exit_thread()
+
+
+def traced(fn: Callable) -> Callable:
+    """`fn` with track_thread() around it, for work handed to a pool inside copy_context().run."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with track_thread():
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def _write(profile: Profile):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, profile.id)
+    with open(base + FORMATS["speedscope"], "w", encoding="utf-8") as f:
+        json.dump(to_speedscope(profile), f)
+    with open(base + FORMATS["folded"], "w", encoding="utf-8") as f:
+        f.write(to_folded(profile))
+    with open(base + ".meta.json", "w", encoding="utf-8") as f:
+        json.dump(profile.summary(), f)
+    _prune(directory, keep=int(os.getenv("PROFILE_KEEP", "50")))
+
+
+def _prune(directory: str, keep: int):
+    metas = sorted(
+        (name for name in os.listdir(directory) if name.endswith(".meta.json")),
+        key=lambda name: os.path.getmtime(os.path.join(directory, name)),
+        reverse=True,
+    )
+    for name in metas[keep:]:
+        profile_id = name[: -len(".meta.json")]
+        for suffix in (*FORMATS.values(), ".meta.json"):
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(directory, profile_id + suffix))
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Summaries of the stored profiles, newest first."""
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if name.endswith(".meta.json"):
+            with contextlib.suppress(OSError, ValueError):
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+    profiles.sort(key=lambda p: p.get("created", 0), reverse=True)
+    return profiles
+
+
+def profile_path(profile_id: str, fmt: str) -> Optional[str]:
+    """The file of a stored profile, or None for unknown ids / formats."""
+    if not _PROFILE_ID.match(profile_id) or fmt not in FORMATS:
+        return None
+    path = os.path.join(profile_dir(), profile_id + FORMATS[fmt])
+    return path if os.path.isfile(path) else None
+
+
+def get_stats() -> Dict[str, Any]:
+    return {
+        "enabled": enabled(),
+        "sample_rate": sample_rate(),
+        "header_enabled": admin_token() is not None,
+        **_sampler.stats(),
+    }
@@ -6,12 +6,15 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 
 try:
     from database.connection import get_supabase_client
+    from database.embeddings import create_embeddings
+    from database.projections import PRODUCT_EMBEDDING_SOURCE
 except:
     from backend.database.connection import get_supabase_client
+    from backend.database.embeddings import create_embeddings
+    from backend.database.projections import PRODUCT_EMBEDDING_SOURCE
 
 def add_product_embeddings():
     """Add embeddings to all products"""
@@ -20,10 +23,10 @@ def add_product_embeddings():
     print("="*80)
     
     supabase = get_supabase_client()
-    embeddings = FastEmbedEmbeddings()
+    embeddings = create_embeddings()
     
     # Get all products
-    response = supabase.table("products").select("*").execute()
+    response = supabase.table("products").select(PRODUCT_EMBEDDING_SOURCE).execute()
     products = response.data
     
     print(f"\nFound {len(products)} products")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Embedding benchmark: latency, throughput and retrieval recall per setting
+
+For every combination of --models x --threads x --max-lengths, builds the
+model the way the app does (database/embeddings.create_embeddings, i.e. the
+EMBED_* settings with these overrides) and reports:
+
+    load       model construction (download excluded once cached)
+    per-query  p50 / p95 latency of one query_embed call per query
+    batched    queries/s at each --batch-sizes (what the micro-batcher sees
+               under load) and documents/s for the corpus (the seed scripts)
+    recall@k   on our corpus: recipes and products from data/*.json embedded
+               like the seed scripts do, searched by queries with known answers
+               (recipe names, "what can I cook with X and Y", product names)
+
+Use it to pick EMBED_MODEL / EMBED_THREADS / EMBED_BATCH_SIZE /
+EMBED_MAX_LENGTH per deployment. Models other than 384-d ones need the
+schema changed before they can be used for real.
+
+Usage:
+    python scripts/benchmark_embeddings.py
+    python scripts/benchmark_embeddings.py --threads 1,2,4 --batch-sizes 1,8,32,128
+    python scripts/benchmark_embeddings.py --models BAAI/bge-small-en-v1.5,sentence-transformers/all-MiniLM-L6-v2
+    python scripts/benchmark_embeddings.py --max-lengths 128,256,512 --json results.json
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.database.embeddings import DEFAULT_MODEL, create_embeddings
+from backend.database.local_index import normalize
+from backend.scripts.build_snapshot import product_text, recipe_text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Too common to say anything about which recipe is meant
+STAPLES = {"onion", "garlic", "ginger", "salt", "oil", "turmeric", "chili", "water", "sugar"}
+
+
+def read(name):
+    with open(os.path.join(BACKEND_DIR, "data", name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def base_name(name):
+    return name.split("(")[0].strip().lower()
+
+
+def labeled_queries(recipes, products):
+    """(kind, query, indexes of the correct documents) triples."""
+    queries = []
+    for i, recipe in enumerate(recipes):
+        queries.append(("recipe", f"How do I make {recipe['title']}?", {i}))
+        distinctive = [ing for ing in recipe["ingredients"] if not STAPLES & set(base_name(ing).split())]
+        if len(distinctive) >= 2:
+            a, b = base_name(distinctive[0]), base_name(distinctive[1])
+            answers = {
+                j for j, r in enumerate(recipes)
+                if any(a in base_name(x) for x in r["ingredients"]) and any(b in base_name(x) for x in r["ingredients"])
+            }
+            queries.append(("recipe", f"What can I cook with {a} and {b}?", answers))
+    seen = set()
+    for i, product in enumerate(products):
+        name = base_name(product["name"])
+        if name in seen:
+            continue
+        seen.add(name)
+        answers = {j for j, p in enumerate(products) if name in p["name"].lower()}
+        queries.append(("product", f"Do you have {name} in stock?", answers or {i}))
+    return queries
+
+
+def recall_at_k(doc_vectors, query_vectors, answers, k):
+    scores = query_vectors @ doc_vectors.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return statistics.mean(len(set(row) & truth) / min(k, len(truth)) for row, truth in zip(top.tolist(), answers))
+
+
+def query_vectors(model, texts, batch_size):
+    return np.array([v for v in model.model.query_embed(list(texts), batch_size=batch_size)], dtype=np.float32)
+
+
+def run_config(model_name, threads, max_length, batch_sizes, queries, recipes, products, k, rounds):
+    started = time.perf_counter()
+    model = create_embeddings(model_name=model_name, threads=threads, max_length=max_length)
+    load_s = time.perf_counter() - started
+    texts = [q for _, q, _ in queries]
+
+    # Warm the ONNX session before timing
+    query_vectors(model, texts[:8], 8)
+
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        query_vectors(model, [text], 1)
+        latencies.append(time.perf_counter() - started)
+
+    batched = {}
+    workload = texts * rounds
+    for size in batch_sizes:
+        started = time.perf_counter()
+        query_vectors(model, workload, size)
+        batched[size] = len(workload) / (time.perf_counter() - started)
+
+    docs = [recipe_text(r) for r in recipes] + [product_text(p) for p in products]
+    started = time.perf_counter()
+    doc_vectors = normalize(np.array(model.embed_documents(docs), dtype=np.float32))
+    docs_per_s = len(docs) / (time.perf_counter() - started)
+    recipe_vectors, product_vectors = doc_vectors[:len(recipes)], doc_vectors[len(recipes):]
+
+    recall = {}
+    for kind, vectors in (("recipe", recipe_vectors), ("product", product_vectors)):
+        subset = [(q, answers) for qkind, q, answers in queries if qkind == kind]
+        q_vectors = normalize(query_vectors(model, [q for q, _ in subset], 64))
+        recall[kind] = recall_at_k(vectors, q_vectors, [answers for _, answers in subset], k)
+
+    latencies.sort()
+    return {
+        "model": model_name,
+        "threads": threads,
+        "max_length": max_length,
+        "dim": int(doc_vectors.shape[1]),
+        "load_s": round(load_s, 2),
+        "query_p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+        "query_p95_ms": round(1000 * latencies[int(len(latencies) * 0.95)], 2),
+        "batched_qps": {size: round(qps, 1) for size, qps in batched.items()},
+        "docs_per_s": round(docs_per_s, 1),
+        f"recipe_recall@{k}": round(recall["recipe"], 3),
+        f"product_recall@{k}": round(recall["product"], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default=DEFAULT_MODEL, help="Comma-separated FastEmbed model names")
+    parser.add_argument("--threads", default="0", help="Comma-separated onnxruntime thread counts (0 = default)")
+    parser.add_argument("--max-lengths", default="512", help="Comma-separated max token lengths")
+    parser.add_argument("--batch-sizes", default="1,8,32,128", help="Batch sizes for the batched throughput run")
+    parser.add_argument("--rounds", type=int, default=4, help="Times the query set is repeated for throughput")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    recipes, products = read("recipes.json"), read("products.json")
+    queries = labeled_queries(recipes, products)
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",")]
+    print(f"{len(recipes)} recipes, {len(products)} products, {len(queries)} labeled queries, k={args.k}\n")
+
+    results = []
+    configs = itertools.product(
+        args.models.split(","), [int(x) for x in args.threads.split(",")], [int(x) for x in args.max_lengths.split(",")]
+    )
+    for model_name, threads, max_length in configs:
+        result = run_config(model_name, threads or None, max_length, batch_sizes, queries,
+                            recipes, products, args.k, args.rounds)
+        results.append(result)
+        batched = "  ".join(f"b{size}={qps:.0f}/s" for size, qps in result["batched_qps"].items())
+        print(f"{model_name}  threads={threads or 'default'}  max_length={max_length}  dim={result['dim']}")
+        print(f"    load {result['load_s']}s | per query p50 {result['query_p50_ms']}ms "
+              f"p95 {result['query_p95_ms']}ms | docs {result['docs_per_s']}/s")
+        print(f"    batched queries: {batched}")
+        print(f"    recall@{args.k}: recipes {result[f'recipe_recall@{args.k}']}  "
+              f"products {result[f'product_recall@{args.k}']}\n")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
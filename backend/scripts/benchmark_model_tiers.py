@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark latency and cost per route for different model tier configurations
+
+Each configuration assigns models to the small / medium / large tiers
+(see ROLE_TIERS in model.py). Every route's agent is run on a few
+representative queries and we report p50/p95 latency, tokens and cost.
+
+Usage:
+    python scripts/benchmark_model_tiers.py
+    python scripts/benchmark_model_tiers.py \\
+        --config "single:small=x-ai/grok-4.1-fast,medium=x-ai/grok-4.1-fast,large=x-ai/grok-4.1-fast" \\
+        --config "tiered:small=google/gemini-2.0-flash-exp:free,medium=google/gemini-2.0-flash-001,large=x-ai/grok-4.1-fast" \\
+        --prices prices.json --runs 3
+
+prices.json maps model id -> {"input": USD per 1M tokens, "output": USD per 1M tokens}.
+Point OPENROUTER_BASE_URL at a fake server to dry-run without spending credits.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.model import ROLE_TIERS, resolve_model_id
+
+SAMPLE_QUERIES = {
+    "router": ["Is hilsa available?", "What can I cook with chicken and rice?", "How long does delivery take?", "Hello!"],
+    "chat": ["Hello!", "Thank you so much", "Who are you?"],
+    "support": ["What is your return policy?", "How do I get a refund for a bKash payment?"],
+    "product": ["How much does tomato cost?", "Show me fish"],
+    "chef": ["I have chicken and rice, what can I cook?", "Give me a hilsa recipe"],
+}
+
+
+def parse_config(spec):
+    name, _, tiers = spec.partition(":")
+    config = {}
+    for part in tiers.split(","):
+        tier, _, model_id = part.partition("=")
+        config[tier.strip().lower()] = model_id.strip()
+    return name, config
+
+
+def default_configs():
+    base = os.getenv("OPENROUTER_MODEL", "google/gemini-2.0-flash-exp:free")
+    configs = [("single", {"small": base, "medium": base, "large": base})]
+    tiered = {tier: os.getenv(f"LLM_MODEL_{tier.upper()}") for tier in ("small", "medium", "large")}
+    if any(tiered.values()):
+        configs.append(("tiered", {tier: model_id or base for tier, model_id in tiered.items()}))
+    return configs
+
+
+def apply_config(config):
+    for tier in ("small", "medium", "large"):
+        os.environ[f"LLM_MODEL_{tier.upper()}"] = config[tier]
+    for role in ROLE_TIERS:
+        os.environ.pop(f"LLM_MODEL_{role.upper()}", None)
+
+
+def build_agent(role):
+    if role in ("router", "chat"):
+        from backend.agents.orchestrator import get_orchestrator_agent
+        return get_orchestrator_agent(role=role)
+    if role == "support":
+        from backend.agents.support import get_support_agent
+        return get_support_agent()
+    if role == "product":
+        from backend.agents.product import get_product_agent
+        return get_product_agent()
+    from backend.agents.chef import get_chef_agent
+    return get_chef_agent()
+
+
+def prompt_for(role, query):
+    if role == "router":
+        from backend.agents.orchestrator import build_classification_prompt
+        return build_classification_prompt(query)
+    if role == "chat":
+        return f"Answer this user query politely: {query}"
+    return query
+
+
+def run_once(role, query):
+    agent = build_agent(role)
+    started = time.perf_counter()
+    response = agent.run(prompt_for(role, query))
+    elapsed = time.perf_counter() - started
+    metrics = response.metrics or {}
+    return elapsed, sum(metrics.get("input_tokens", [])), sum(metrics.get("output_tokens", []))
+
+
+def cost(prices, model_id, input_tokens, output_tokens):
+    price = prices.get(model_id)
+    if price is None:
+        return None
+    return (input_tokens * price.get("input", 0) + output_tokens * price.get("output", 0)) / 1_000_000
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100.0 * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", default=[], help="name:small=ID,medium=ID,large=ID")
+    parser.add_argument("--prices", help="JSON file of per-model prices (USD per 1M tokens)")
+    parser.add_argument("--runs", type=int, default=1, help="Repetitions per query")
+    parser.add_argument("--output", help="Write raw results as JSON")
+    args = parser.parse_args()
+
+    configs = [parse_config(c) for c in args.config] or default_configs()
+    prices = {}
+    if args.prices:
+        with open(args.prices) as f:
+            prices = json.load(f)
+    elif os.getenv("LLM_MODEL_PRICES"):
+        prices = json.loads(os.getenv("LLM_MODEL_PRICES"))
+
+    print("=" * 80)
+    print("📊 MODEL TIER BENCHMARK")
+    print("=" * 80)
+
+    results = []
+    for name, config in configs:
+        apply_config(config)
+        print(f"\n⚙️  Configuration '{name}': {config}")
+        print(f"{'route':<10} {'model':<40} {'p50 s':>7} {'p95 s':>7} {'in tok':>7} {'out tok':>8} {'$/call':>10}")
+
+        for role, queries in SAMPLE_QUERIES.items():
+            model_id = resolve_model_id(role)
+            latencies, inputs, outputs, errors = [], [], [], 0
+            for _ in range(args.runs):
+                for query in queries:
+                    try:
+                        elapsed, input_tokens, output_tokens = run_once(role, query)
+                    except Exception as e:
+                        errors += 1
+                        print(f"   ⚠️  {role} failed on {query!r}: {e}")
+                        continue
+                    latencies.append(elapsed)
+                    inputs.append(input_tokens)
+                    outputs.append(output_tokens)
+
+            avg_in = statistics.mean(inputs) if inputs else 0
+            avg_out = statistics.mean(outputs) if outputs else 0
+            call_cost = cost(prices, model_id, avg_in, avg_out)
+            row = {
+                "config": name,
+                "route": role,
+                "model": model_id,
+                "p50_s": percentile(latencies, 50),
+                "p95_s": percentile(latencies, 95),
+                "avg_input_tokens": avg_in,
+                "avg_output_tokens": avg_out,
+                "cost_per_call_usd": call_cost,
+                "errors": errors,
+            }
+            results.append(row)
+            cost_str = f"{call_cost:.6f}" if call_cost is not None else "n/a"
+            print(f"{role:<10} {model_id[:40]:<40} {row['p50_s']:>7.2f} {row['p95_s']:>7.2f} "
+                  f"{avg_in:>7.0f} {avg_out:>8.0f} {cost_str:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Raw results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
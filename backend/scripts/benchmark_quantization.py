@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Quantized embedding benchmark: memory, bytes on the wire, latency, recall@k
+
+Embeds our corpus (data/products.json, recipes.json, policies.json) and the
+queries from data/routing_eval.jsonl with the app's FastEmbed model, then
+compares the LocalVectorIndex modes (database/local_index.py) against exact
+float32 search:
+
+    float32          baseline
+    float16          what a pgvector halfvec index stores
+    int8 (+rerank)   scalar quantization, shortlist re-ranked in float32
+    binary (+rerank) what a binary_quantize() bit index stores
+
+--synthetic N pads the corpus with N clustered random vectors to see how the
+modes behave beyond our ~120 documents. --rpc also times the retrieve_all /
+retrieve_all_halfvec / retrieve_all_binary RPCs against Supabase.
+
+Usage:
+    python scripts/benchmark_quantization.py --k 5
+    python scripts/benchmark_quantization.py --synthetic 100000
+    python scripts/benchmark_quantization.py --rpc
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.database.local_index import LocalVectorIndex, normalize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIM = 384
+
+MODES = [
+    ("float32", "float32", 0),
+    ("float16", "float16", 0),
+    ("int8", "int8", 0),
+    ("int8 + rerank x4", "int8", 4),
+    ("binary", "binary", 0),
+    ("binary + rerank x4", "binary", 4),
+    ("binary + rerank x10", "binary", 10),
+]
+
+
+def load_corpus():
+    def read(name):
+        with open(os.path.join(BACKEND_DIR, "data", name), encoding="utf-8") as f:
+            return json.load(f)
+
+    docs = []
+    for p in read("products.json"):
+        docs.append((f"product:{p['name']}", f"{p['name']} {p['category']}"))
+    for r in read("recipes.json"):
+        docs.append((f"recipe:{r['title']}", f"{r['title']} {r['description']} {', '.join(r['ingredients'])}"))
+    for p in read("policies.json"):
+        docs.append((f"policy:{p['title']}", f"{p['title']} {p['content']}"))
+    with open(os.path.join(BACKEND_DIR, "data", "routing_eval.jsonl"), encoding="utf-8") as f:
+        queries = [json.loads(line)["query"] for line in f if line.strip()]
+    return docs, queries
+
+
+def embed(texts):
+    from backend.database.embeddings import get_embeddings
+
+    return normalize(np.array(get_embeddings().embed_documents(texts), dtype=np.float32))
+
+
+def synthetic(rows, seed=7, clusters=200):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    return normalize(centers[labels] + 0.35 * rng.normal(size=(rows, DIM)).astype(np.float32))
+
+
+def wire_bytes(query_vector):
+    from backend.database.embeddings import vector_literal
+
+    as_list = len(json.dumps([float(x) for x in query_vector]))
+    as_literal = len(json.dumps(vector_literal([float(x) for x in query_vector])))
+    return as_list, as_literal
+
+
+def run_local(ids, vectors, queries, k):
+    exact = LocalVectorIndex(ids, vectors, mode="float32", normalized=True)
+    truth = [{i for i, _ in exact.search(q, k)} for q in queries]
+
+    print(f"\n{'mode':<22}{'index MB':>10}{'rerank MB':>11}{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}")
+    for name, mode, rerank in MODES:
+        index = LocalVectorIndex(ids, vectors, mode=mode, rerank_factor=rerank, normalized=True)
+        latencies, hits = [], 0
+        for q, expected in zip(queries, truth):
+            started = time.perf_counter()
+            found = index.search(q, k)
+            latencies.append(time.perf_counter() - started)
+            hits += len({i for i, _ in found} & expected)
+        ms = np.array(latencies) * 1000
+        mem = index.memory_bytes()
+        print(f"{name:<22}{mem['codes'] / 1e6:>10.2f}{mem['rerank'] / 1e6:>11.2f}"
+              f"{np.percentile(ms, 50):>9.3f}{np.percentile(ms, 95):>9.3f}"
+              f"{hits / (k * len(queries)):>10.3f}")
+
+
+def run_rpc(query_texts, k):
+    from backend.database.connection import get_supabase_client
+    from backend.database.embeddings import embed_query, vector_literal
+
+    client = get_supabase_client()
+    counts = {"recipe_count": k, "product_count": k, "policy_count": k, "match_threshold": 0.0}
+    embeddings = [embed_query(q) for q in query_texts]
+    truth = []
+    print(f"\n{'rpc':<24}{'request B':>10}{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}")
+    for rpc, literal in (("retrieve_all", False), ("retrieve_all_halfvec", True), ("retrieve_all_binary", True)):
+        latencies, hits, request_bytes = [], 0, 0
+        for i, embedding in enumerate(embeddings):
+            params = {"query_embedding": vector_literal(embedding) if literal else embedding, **counts}
+            request_bytes += len(json.dumps(params))
+            started = time.perf_counter()
+            rows = client.rpc(rpc, params).execute().data or []
+            latencies.append(time.perf_counter() - started)
+            found = {(r["collection"], r["id"]) for r in rows}
+            if rpc == "retrieve_all":
+                truth.append(found)
+            hits += len(found & truth[i])
+        total = sum(len(t) for t in truth) or 1
+        ms = np.array(latencies) * 1000
+        print(f"{rpc:<24}{request_bytes // len(embeddings):>10}{np.percentile(ms, 50):>9.1f}"
+              f"{np.percentile(ms, 95):>9.1f}{hits / total:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--synthetic", type=int, default=0, help="Add N synthetic vectors to the corpus")
+    parser.add_argument("--synthetic-only", action="store_true",
+                        help="Skip the embedding model (synthetic corpus and queries only)")
+    parser.add_argument("--rpc", action="store_true", help="Also benchmark the Supabase retrieve_all RPC variants")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("🧮 QUANTIZED EMBEDDING BENCHMARK")
+    print("=" * 80)
+
+    if args.synthetic_only:
+        rows = args.synthetic or 10_000
+        ids, vectors = list(range(rows)), synthetic(rows)
+        query_texts, queries = None, synthetic(100, seed=11)
+    else:
+        docs, query_texts = load_corpus()
+        try:
+            vectors = embed([text for _, text in docs])
+            queries = embed(query_texts)
+        except Exception as e:
+            print(f"❌ Could not load the embedding model ({e}); rerun with --synthetic-only")
+            sys.exit(1)
+        ids = [doc_id for doc_id, _ in docs]
+        if args.synthetic:
+            vectors = np.vstack([vectors, synthetic(args.synthetic)])
+            ids += [f"synthetic:{i}" for i in range(args.synthetic)]
+
+    as_list, as_literal = wire_bytes(queries[0])
+    print(f"Corpus: {len(ids):,} vectors x {DIM} dims, {len(queries)} queries, k={args.k}")
+    print(f"Query embedding on the wire: JSON float list {as_list:,} B, 5-digit vector literal {as_literal:,} B")
+
+    run_local(ids, vectors, queries, args.k)
+
+    if args.rpc:
+        if query_texts is None:
+            print("\n--rpc needs the real corpus queries; drop --synthetic-only")
+        else:
+            run_rpc(query_texts, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Routing accuracy and latency benchmark for the orchestrator classifier
+
+Scores intent classifiers on the labeled dataset in data/routing_eval.jsonl:
+strict accuracy (== label), lenient accuracy (any acceptable label for
+ambiguous/mixed queries), a confusion matrix, p50/p95 latency and tokens/call.
+
+Classifiers:
+    keyword     Rule-based classifier from agents/intent.py (no LLM)
+    majority    Always predicts the most frequent label (sanity baseline)
+    llm         The orchestrator's LLM classification step. Runs offline by
+                replaying --recordings; use --live to call the real model
+                and --record to save the replies for later offline runs.
+                Without recordings a deterministic stub model answers the
+                real classification prompt instead (keyword hits formatted
+                as an LLM reply), so the prompt -> reply -> parse_intent path
+                is still exercised; its tokens are estimated (4 chars/token)
+                and its accuracy is the keyword classifier's, not the LLM's.
+
+Usage:
+    python scripts/benchmark_routing.py
+    python scripts/benchmark_routing.py --live --record data/routing_recordings.json
+    python scripts/benchmark_routing.py --recordings data/routing_recordings.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.agents.intent import keyword_classify, keyword_scores
+from backend.agents.orchestrator import INTENTS, build_classification_prompt, parse_intent
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATASET = os.path.join(BACKEND_DIR, "data", "routing_eval.jsonl")
+DEFAULT_RECORDINGS = os.path.join(BACKEND_DIR, "data", "routing_recordings.json")
+
+
+def load_dataset(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def keyword_classifier(query):
+    started = time.perf_counter()
+    label = keyword_classify(query)
+    return label, time.perf_counter() - started, 0
+
+
+def majority_classifier(dataset):
+    label = Counter(row["label"] for row in dataset).most_common(1)[0][0]
+    return lambda query: (label, 0.0, 0)
+
+
+def replay_classifier(recordings):
+    def classify(query):
+        record = recordings.get(query)
+        if record is None:
+            return None, 0.0, 0
+        tokens = record.get("input_tokens", 0) + record.get("output_tokens", 0)
+        return parse_intent(record["output"]), record.get("latency_s", 0.0), tokens
+    return classify
+
+
+def stub_reply(query):
+    """What a well-behaved model would answer: one "INTENT: query" line per matching intent."""
+    scores = keyword_scores(query)
+    hits = [intent for intent in INTENTS if intent != "OTHER" and scores[intent]]
+    if len(hits) > 1:
+        return "\n".join(f"{intent}: {query}" for intent in hits)
+    return hits[0] if hits else keyword_classify(query)
+
+
+def stub_classifier():
+    def classify(query):
+        started = time.perf_counter()
+        prompt = build_classification_prompt(query)
+        reply = stub_reply(query)
+        label = parse_intent(reply)
+        return label, time.perf_counter() - started, (len(prompt) + len(reply)) // 4
+    return classify
+
+
+def live_classifier(recordings):
+    from backend.agents.orchestrator import build_classification_prompt, get_orchestrator_agent
+
+    def classify(query):
+        agent = get_orchestrator_agent()
+        started = time.perf_counter()
+        response = agent.run(build_classification_prompt(query))
+        elapsed = time.perf_counter() - started
+        metrics = response.metrics or {}
+        input_tokens = sum(metrics.get("input_tokens", []))
+        output_tokens = sum(metrics.get("output_tokens", []))
+        recordings[query] = {
+            "output": response.content,
+            "latency_s": elapsed,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
+        return parse_intent(response.content), elapsed, input_tokens + output_tokens
+    return classify
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100.0 * len(values)))] if values else 0.0
+
+
+def evaluate(name, classify, dataset):
+    confusion = {actual: Counter() for actual in INTENTS}
+    latencies, tokens = [], []
+    strict = lenient = missing = 0
+    by_kind = {}
+
+    for row in dataset:
+        predicted, latency, used_tokens = classify(row["query"])
+        if predicted is None:
+            missing += 1
+            continue
+        confusion[row["label"]][predicted] += 1
+        latencies.append(latency)
+        tokens.append(used_tokens)
+        is_strict = predicted == row["label"]
+        is_lenient = predicted in row.get("acceptable", [row["label"]])
+        strict += is_strict
+        lenient += is_lenient
+        kind = by_kind.setdefault(row.get("kind", "clear"), [0, 0])
+        kind[0] += is_lenient
+        kind[1] += 1
+
+    scored = len(dataset) - missing
+    return {
+        "classifier": name,
+        "scored": scored,
+        "missing": missing,
+        "strict_accuracy": strict / scored if scored else None,
+        "lenient_accuracy": lenient / scored if scored else None,
+        "accuracy_by_kind": {k: v[0] / v[1] for k, v in by_kind.items()},
+        "p50_latency_ms": percentile(latencies, 50) * 1000,
+        "p95_latency_ms": percentile(latencies, 95) * 1000,
+        "avg_tokens_per_call": sum(tokens) / len(tokens) if tokens else 0,
+        "confusion": {actual: dict(row) for actual, row in confusion.items()},
+    }
+
+
+def print_report(result):
+    print(f"\n🧭 {result['classifier']}  (scored {result['scored']}, missing {result['missing']})")
+    if not result["scored"]:
+        return
+    print(f"   strict accuracy:  {result['strict_accuracy']:.1%}")
+    print(f"   lenient accuracy: {result['lenient_accuracy']:.1%}  "
+          + "  ".join(f"{k}={v:.0%}" for k, v in sorted(result["accuracy_by_kind"].items())))
+    print(f"   latency p50/p95:  {result['p50_latency_ms']:.2f} / {result['p95_latency_ms']:.2f} ms")
+    print(f"   tokens per call:  {result['avg_tokens_per_call']:.0f}")
+    short = {i: i.split("_")[0][:7] for i in INTENTS}
+    print("   confusion (rows = expected, cols = predicted):")
+    print("   " + " " * 9 + "".join(f"{short[i]:>9}" for i in INTENTS))
+    for actual in INTENTS:
+        row = result["confusion"][actual]
+        print(f"   {short[actual]:<9}" + "".join(f"{row.get(i, 0):>9}" for i in INTENTS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS, help="Recorded LLM replies to replay")
+    parser.add_argument("--live", action="store_true", help="Call the real LLM classifier")
+    parser.add_argument("--record", help="Save live LLM replies to this file")
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    print("=" * 80)
+    print(f"📊 ROUTING BENCHMARK — {len(dataset)} labeled queries")
+    print("=" * 80)
+
+    classifiers = [("keyword", keyword_classifier), ("majority", majority_classifier(dataset))]
+    recordings = {}
+    if args.live:
+        classifiers.append(("llm (live)", live_classifier(recordings)))
+    elif os.path.exists(args.recordings):
+        with open(args.recordings, encoding="utf-8") as f:
+            recordings = json.load(f)
+        classifiers.append(("llm (replay)", replay_classifier(recordings)))
+    else:
+        print(f"\nℹ️  No LLM recordings at {args.recordings}; using the stub model "
+              "(run once with --live --record to create recordings).")
+        classifiers.append(("llm (stub)", stub_classifier()))
+
+    results = [evaluate(name, classify, dataset) for name, classify in classifiers]
+    for result in results:
+        print_report(result)
+
+    if args.record and recordings:
+        with open(args.record, "w", encoding="utf-8") as f:
+            json.dump(recordings, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Saved {len(recordings)} LLM replies to {args.record}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Cost of validating and serializing search results, per request
+
+Builds N synthetic match_products rows (ProductSearchResult shape) and times
+the steps a response goes through, the old way and the bulk way:
+
+    validate   ProductSearchResult(**row) per row    vs  PRODUCT_SEARCH_RESULTS.validate_python(rows)
+    serialize  .model_dump() + jsonable_encoder + json  vs  adapter.dump_json
+               vs  dump_python + orjson (FastJSONResponse)
+
+Each step is the median of --repeat runs; per-row cost is reported in µs.
+orjson rows are skipped when orjson is not installed.
+
+Usage:
+    python scripts/benchmark_serialization.py --rows 1000,10000,100000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.encoders import jsonable_encoder
+
+from backend.database.models import PRODUCT_SEARCH_RESULTS, ProductSearchResult
+from backend.json_response import FastJSONResponse, orjson
+
+CATEGORIES = ["Vegetables", "Spices", "Fish", "Grains", "Meat", "Dairy"]
+
+
+def make_rows(n):
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Product {i}",
+            "description": f"Fresh product number {i} from the local market",
+            "price": 10.0 + i % 500,
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "image_url": f"https://example.com/img/{i}.jpg",
+            "stock_quantity": i % 100,
+            "created_at": now,
+            "updated_at": now,
+            "similarity": 1.0 - (i % 1000) / 1000,
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000,10000,100000", help="Comma-separated result sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>7}  {'step':<40} {'ms':>9} {'µs/row':>8}  bytes")
+    for n in (int(x) for x in args.rows.split(",")):
+        rows = make_rows(n)
+        models = [ProductSearchResult(**row) for row in rows]
+
+        steps = [
+            ("validate: Model(**row) per row", lambda: [ProductSearchResult(**row) for row in rows]),
+            ("validate: TypeAdapter.validate_python", lambda: PRODUCT_SEARCH_RESULTS.validate_python(rows)),
+            ("serialize: model_dump+jsonable_encoder",
+             lambda: json.dumps(jsonable_encoder([m.model_dump() for m in models]), ensure_ascii=False).encode()),
+            ("serialize: TypeAdapter.dump_json", lambda: PRODUCT_SEARCH_RESULTS.dump_json(models)),
+        ]
+        if orjson is not None:
+            steps.append(("serialize: dump_python + orjson",
+                          lambda: FastJSONResponse(PRODUCT_SEARCH_RESULTS.dump_python(models, mode="json")).body))
+        for name, fn in steps:
+            seconds, result = timed(fn, args.repeat)
+            size = len(result) if isinstance(result, bytes) else ""
+            print(f"{n:>7}  {name:<40} {seconds * 1000:>9.2f} {seconds / n * 1e6:>8.2f}  {size}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
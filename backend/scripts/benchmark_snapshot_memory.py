@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Per-worker memory of the mapped snapshot vs each worker loading its own copy
+
+Publishes a synthetic snapshot (database/snapshot.py) to a scratch directory,
+then starts 1..N worker processes that each run recipe searches over it:
+
+    mmap   Snapshot(...) -> np.load(mmap_mode="r"), what the API workers do
+    copy   np.load(...) into private memory, what a per-worker cache would do
+
+and reports RSS / PSS / private memory per worker from /proc/<pid>/smaps_rollup
+(Linux). PSS splits shared pages between the processes mapping them, so the
+total PSS is the real memory cost of N workers.
+
+Usage:
+    python scripts/benchmark_snapshot_memory.py --recipes 100000 --workers 1,2,4,8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.database.snapshot import Snapshot, read_current, write_snapshot
+
+DIM = 384
+
+
+def smaps_rollup():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def worker(path, mode, queries, start, done, results):
+    if mode == "mmap":
+        snapshot = Snapshot(path)
+        index = snapshot.recipe_index()
+        search = index.search
+    else:
+        from backend.database.local_index import LocalVectorIndex
+
+        vectors = np.load(os.path.join(path, "recipe_embeddings.npy"))
+        search = LocalVectorIndex(range(len(vectors)), vectors, normalized=True).search
+    for q in queries:
+        search(q, 5)
+    start.wait()  # every worker has its data resident before anyone measures
+    results.put(smaps_rollup())
+    done.wait()
+
+
+def run(path, mode, workers, queries):
+    ctx = mp.get_context("fork")
+    start, done = ctx.Barrier(workers + 1), ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(path, mode, queries, start, done, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    start.wait()
+    stats = [results.get() for _ in procs]
+    done.wait()
+    for p in procs:
+        p.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("❌ Needs Linux /proc/self/smaps_rollup")
+        sys.exit(1)
+
+    rng = np.random.default_rng(0)
+    products = [{"name": f"Product {i}", "price": 10 + i % 500, "stock_quantity": i % 50, "category": "Packaged"}
+                for i in range(args.products)]
+    recipes = [{"title": f"Recipe {i}", "ingredients": ["Onion", "Garlic"]} for i in range(args.recipes)]
+    recipe_vectors = rng.normal(size=(args.recipes, DIM)).astype(np.float32)
+    queries = rng.normal(size=(20, DIM)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as root:
+        write_snapshot(products, recipes, recipe_vectors=recipe_vectors, root=root, source="synthetic")
+        del recipe_vectors
+        path = os.path.join(root, read_current(root))
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+        print("=" * 80)
+        print(f"🗺️  SNAPSHOT MEMORY — {args.recipes:,} recipe vectors, snapshot {size / 1e6:.1f} MB on disk")
+        print("=" * 80)
+        print(f"{'mode':<6}{'workers':>8}{'RSS/worker':>13}{'PSS/worker':>13}{'private/worker':>16}{'total PSS':>12}")
+        for mode in ("copy", "mmap"):
+            for n in [int(w) for w in args.workers.split(",")]:
+                stats = run(path, mode, n, queries)
+                mb = lambda key: sum(s[key] for s in stats) / len(stats) / 1e6
+                total = sum(s["pss"] for s in stats) / 1e6
+                print(f"{mode:<6}{n:>8}{mb('rss'):>12.1f}M{mb('pss'):>12.1f}M{mb('private'):>15.1f}M{total:>11.1f}M")
+
+
+if __name__ == "__main__":
+    main()
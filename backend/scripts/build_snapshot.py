@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Build and publish the shared catalog/vector snapshot (database/snapshot.py)
+
+Run once per deployment (or with --watch as a sidecar); every API worker with
+SNAPSHOT_ENABLED=true maps the published files and picks up new versions on
+its own.
+
+Sources:
+    supabase   products + their stored embeddings, recipes from `documents`
+    local      data/products.json + data/recipes.json, embedded with FastEmbed
+
+Usage:
+    python scripts/build_snapshot.py --source supabase
+    python scripts/build_snapshot.py --source local --no-embeddings
+    python scripts/build_snapshot.py --source supabase --watch
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.database.snapshot import default_dir, write_snapshot
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The builder is the one reader that wants the vectors themselves
+PRODUCT_WITH_EMBEDDING = "id, name, price, stock_quantity, category, embedding"
+
+
+def recipe_text(recipe):
+    # Same text setup_complete_system.py embeds into `documents`
+    ingredients_text = ", ".join(recipe["ingredients"])
+    return (f"Recipe: {recipe['title']}. Description: {recipe.get('description', '')}. "
+            f"Ingredients: {ingredients_text}. Instructions: {recipe['instructions']}")
+
+
+def product_text(product):
+    # Same text add_product_embeddings.py embeds
+    return f"{product['name']} {product.get('category', '')} {product.get('description', '')}"
+
+
+def parse_vector(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def load_local(with_embeddings):
+    with open(os.path.join(BACKEND_DIR, "data", "products.json"), encoding="utf-8") as f:
+        products = json.load(f)
+    with open(os.path.join(BACKEND_DIR, "data", "recipes.json"), encoding="utf-8") as f:
+        recipes = json.load(f)
+    product_vectors = recipe_vectors = None
+    if with_embeddings:
+        from backend.database.embeddings import get_embeddings
+
+        model = get_embeddings()
+        product_vectors = np.array(model.embed_documents([product_text(p) for p in products]), dtype=np.float32)
+        recipe_vectors = np.array(model.embed_documents([recipe_text(r) for r in recipes]), dtype=np.float32)
+    return products, recipes, product_vectors, recipe_vectors
+
+
+def load_supabase(with_embeddings):
+    from backend.database.connection import get_supabase_client
+    from backend.database.projections import PRODUCT_CATALOG
+
+    supabase = get_supabase_client()
+    columns = PRODUCT_WITH_EMBEDDING if with_embeddings else PRODUCT_CATALOG
+    products = supabase.table("products").select(columns).order("name").execute().data or []
+    documents = supabase.table("documents").select(
+        "metadata, embedding" if with_embeddings else "metadata"
+    ).execute().data or []
+    recipes = [d["metadata"] for d in documents]
+
+    product_vectors = recipe_vectors = None
+    if with_embeddings:
+        if products and all(p.get("embedding") for p in products):
+            product_vectors = np.array([parse_vector(p.pop("embedding")) for p in products], dtype=np.float32)
+        else:
+            print("⚠️  Some products have no embedding (run add_product_embeddings.py); skipping product vectors")
+            for p in products:
+                p.pop("embedding", None)
+        if documents:
+            recipe_vectors = np.array([parse_vector(d["embedding"]) for d in documents], dtype=np.float32)
+    return products, recipes, product_vectors, recipe_vectors
+
+
+def build(args):
+    started = time.perf_counter()
+    loader = load_supabase if args.source == "supabase" else load_local
+    products, recipes, product_vectors, recipe_vectors = loader(not args.no_embeddings)
+    version = write_snapshot(products, recipes, product_vectors, recipe_vectors, root=args.out, source=args.source)
+    print(f"✅ Published {version}: {len(products)} products, {len(recipes)} recipes, "
+          f"vectors={'no' if recipe_vectors is None else 'yes'} ({time.perf_counter() - started:.1f}s)")
+
+
+def watch(args):
+    from backend.database.change_feed import start_change_feed
+
+    changed = threading.Event()
+    feed = start_change_feed()
+    feed.subscribe(lambda event: changed.set())
+    print(f"👀 Watching for catalog changes (debounce {args.debounce_s}s)")
+    while True:
+        changed.wait()
+        time.sleep(args.debounce_s)  # let a burst of writes settle into one rebuild
+        changed.clear()
+        try:
+            build(args)
+        except Exception as e:
+            print(f"❌ Snapshot build failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=("supabase", "local"), default="supabase")
+    parser.add_argument("--out", default=default_dir(), help="Snapshot directory (default: SNAPSHOT_DIR)")
+    parser.add_argument("--no-embeddings", action="store_true", help="Catalog and recipe metadata only")
+    parser.add_argument("--watch", action="store_true", help="Rebuild whenever the change feed reports a write")
+    parser.add_argument("--debounce-s", type=float, default=2.0)
+    args = parser.parse_args()
+
+    build(args)
+    if args.watch:
+        watch(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Measure bytes transferred per product read: select=* vs the projections in
+database/projections.py
+
+Live mode issues the same PostgREST requests the app makes (SUPABASE_URL /
+SUPABASE_KEY from .env) and counts response body bytes. --offline builds the
+rows from data/products.json with 384-d embeddings attached, serialized the
+way PostgREST returns pgvector columns, for when no database is at hand.
+
+Usage:
+    python scripts/measure_projection_bytes.py
+    python scripts/measure_projection_bytes.py --offline
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.database.projections import PRODUCT_CATALOG, PRODUCT_DETAIL, PRODUCT_LISTING
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (use case, projection, PostgREST query params besides select, offline row filter)
+CASES = [
+    ("search_products('fish')", PRODUCT_LISTING,
+     {"or": "(name.ilike.*fish*,category.ilike.*fish*)", "order": "stock_quantity.desc", "limit": "10"},
+     lambda rows: [r for r in rows if "fish" in r["name"].lower() or "fish" in r["category"].lower()][:10]),
+    ("get_available_products()", PRODUCT_LISTING,
+     {"stock_quantity": "gt.0", "order": "name"},
+     lambda rows: [r for r in rows if r["stock_quantity"] > 0]),
+    ("check_inventory catalog load", PRODUCT_CATALOG, {}, lambda rows: rows),
+    ("get_product(id)", PRODUCT_DETAIL, {"limit": "1"}, lambda rows: rows[:1]),
+    ("get_products_by_ids(10 ids)", PRODUCT_DETAIL, {"limit": "10"}, lambda rows: rows[:10]),
+]
+
+
+def offline_rows():
+    import numpy as np
+
+    with open(os.path.join(BACKEND_DIR, "data", "products.json")) as f:
+        products = json.load(f)
+    rng = np.random.default_rng(0)
+    rows = []
+    for p in products:
+        vector = rng.normal(size=384)
+        vector /= np.linalg.norm(vector)
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "name": p["name"],
+            "description": None,
+            "price": p["price"],
+            "stock_quantity": p["stock_quantity"],
+            "category": p["category"],
+            "unit": "unit",
+            "image_url": None,
+            # pgvector's text output, which PostgREST passes through as a JSON string
+            "embedding": "[" + ",".join(f"{x:.8g}" for x in vector) + "]",
+            "created_at": "2026-10-19T08:00:00.000000+00:00",
+            "updated_at": "2026-10-19T08:00:00.000000+00:00",
+        })
+    return rows
+
+
+def project(rows, columns):
+    names = [c.strip() for c in columns.split(",")]
+    return [{k: r[k] for k in names} for r in rows]
+
+
+def body_bytes(rows):
+    return len(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+def measure_offline():
+    rows = offline_rows()
+    for name, projection, _, select_rows in CASES:
+        selected = select_rows(rows)
+        yield name, len(selected), body_bytes(selected), body_bytes(project(selected, projection))
+
+
+def measure_live():
+    import httpx
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        print("❌ SUPABASE_URL and SUPABASE_KEY must be set (or use --offline)")
+        sys.exit(1)
+    headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+    with httpx.Client(base_url=f"{url}/rest/v1", headers=headers, timeout=30) as client:
+        for name, projection, params, _ in CASES:
+            full = client.get("/products", params={"select": "*", **params})
+            slim = client.get("/products", params={"select": projection.replace(" ", ""), **params})
+            full.raise_for_status()
+            slim.raise_for_status()
+            yield name, len(full.json()), len(full.content), len(slim.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offline", action="store_true", help="Estimate from data/products.json instead of querying Supabase")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"📦 BYTES PER PRODUCT READ ({'offline estimate' if args.offline else 'live Supabase'})")
+    print("=" * 80)
+    print(f"{'use case':<32}{'rows':>6}{'select=*':>14}{'projected':>12}{'ratio':>9}")
+    total_full = total_slim = 0
+    for name, count, full, slim in (measure_offline() if args.offline else measure_live()):
+        total_full += full
+        total_slim += slim
+        ratio = f"{full / slim:.1f}x" if slim else "-"
+        print(f"{name:<32}{count:>6}{full:>13,}B{slim:>11,}B{ratio:>9}")
+    if total_slim:
+        print(f"{'total':<38}{total_full:>13,}B{total_slim:>11,}B{total_full / total_slim:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Run a JSONL file of queries through the assistant
+
+Each input line is {"id": ..., "message": "..."} (or a bare JSON string).
+Results are written as JSONL in completion order; the last line is a summary
+with throughput and per-route latency percentiles.
+
+Usage:
+    python scripts/run_batch.py queries.jsonl -o results.jsonl --concurrency 16
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.batch import DEFAULT_CONCURRENCY, parse_jsonl, run_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of queries through handle_request")
+    parser.add_argument("input", help="Input JSONL file ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="Output JSONL file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+    summary = None
+    try:
+        for result in run_batch(parse_jsonl(source), concurrency=args.concurrency):
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sink.flush()
+            if result.get("type") == "summary":
+                summary = result
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    if summary:
+        print("\n" + "=" * 80, file=sys.stderr)
+        print("📊 BATCH SUMMARY", file=sys.stderr)
+        print("=" * 80, file=sys.stderr)
+        print(f"Queries: {summary['total']}  Errors: {summary['errors']}  "
+              f"Deduplicated: {summary['deduplicated']}", file=sys.stderr)
+        print(f"Elapsed: {summary['elapsed_s']}s  Throughput: {summary['throughput_qps']} q/s", file=sys.stderr)
+        for route, s in summary["routes"].items():
+            print(f"  {route:<15} n={s['count']:<5} p50={s['p50_ms']}ms p95={s['p95_ms']}ms "
+                  f"p99={s['p99_ms']}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
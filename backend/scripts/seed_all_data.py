@@ -11,12 +11,15 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 
 try:
     from database.connection import get_supabase_client
+    from database.embeddings import create_embeddings
+    from database.projections import ID_ONLY, KNOWLEDGE_SUMMARY
 except:
     from backend.database.connection import get_supabase_client
+    from backend.database.embeddings import create_embeddings
+    from backend.database.projections import ID_ONLY, KNOWLEDGE_SUMMARY
 
 def load_json(filename):
     file_path = os.path.join(os.path.dirname(__file__), '..', 'data', filename)
@@ -60,7 +63,7 @@ def seed_recipes_to_knowledge_base():
     
     supabase = get_supabase_client()
     recipes = load_json('recipes.json')
-    embeddings = FastEmbedEmbeddings()
+    embeddings = create_embeddings()
     
     # Clear existing recipes from knowledge_base
     try:
@@ -115,7 +118,7 @@ def seed_policies_to_knowledge_base():
     
     supabase = get_supabase_client()
     policies = load_json('policies.json')
-    embeddings = FastEmbedEmbeddings()
+    embeddings = create_embeddings()
     
     # Clear existing policies
     try:
@@ -170,7 +173,7 @@ def seed_legacy_documents():
     
     supabase = get_supabase_client()
     recipes = load_json('recipes.json')
-    embeddings = FastEmbedEmbeddings()
+    embeddings = create_embeddings()
     
     # Clear existing
     try:
@@ -215,23 +218,23 @@ def verify_data():
     supabase = get_supabase_client()
     
     # Check products
-    products = supabase.table("products").select("*", count='exact').limit(1).execute()
-    print(f"   ✅ Products: {len(products.data)} records")
+    products = supabase.table("products").select(ID_ONLY, count='exact').limit(1).execute()
+    print(f"   ✅ Products: {products.count} records")
     
     # Check knowledge base
-    kb_total = supabase.table("knowledge_base").select("*", count='exact').limit(1).execute()
-    print(f"   ✅ Knowledge Base Total: {len(kb_total.data)} records")
+    kb_total = supabase.table("knowledge_base").select(ID_ONLY, count='exact').limit(1).execute()
+    print(f"   ✅ Knowledge Base Total: {kb_total.count} records")
     
     # Check by type
-    recipes = supabase.table("knowledge_base").select("*").eq("content_type", "recipe").limit(5).execute()
+    recipes = supabase.table("knowledge_base").select(KNOWLEDGE_SUMMARY).eq("content_type", "recipe").limit(5).execute()
     print(f"   ✅ Recipes in KB: {len(recipes.data)} (showing 5)")
     
-    policies = supabase.table("knowledge_base").select("*").eq("content_type", "policy").limit(5).execute()
+    policies = supabase.table("knowledge_base").select(KNOWLEDGE_SUMMARY).eq("content_type", "policy").limit(5).execute()
     print(f"   ✅ Policies in KB: {len(policies.data)} (showing 5)")
     
     # Check legacy
-    docs = supabase.table("documents").select("*", count='exact').limit(1).execute()
-    print(f"   ✅ Legacy Documents: {len(docs.data)} records")
+    docs = supabase.table("documents").select(ID_ONLY, count='exact').limit(1).execute()
+    print(f"   ✅ Legacy Documents: {docs.count} records")
 
 def main():
     print("\n" + "="*80)
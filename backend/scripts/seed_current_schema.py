@@ -8,12 +8,15 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import json
-from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 
 try:
     from database.connection import get_supabase_client
+    from database.embeddings import create_embeddings
+    from database.projections import PRODUCT_LISTING
 except:
     from backend.database.connection import get_supabase_client
+    from backend.database.embeddings import create_embeddings
+    from backend.database.projections import PRODUCT_LISTING
 
 def load_json(filename):
     file_path = os.path.join(os.path.dirname(__file__), '..', 'data', filename)
@@ -28,7 +31,7 @@ def seed_recipes():
     
     supabase = get_supabase_client()
     recipes_data = load_json('recipes.json')
-    embeddings = FastEmbedEmbeddings()
+    embeddings = create_embeddings()
     
     # Clear existing
     try:
@@ -81,7 +84,7 @@ def seed_policies():
     
     supabase = get_supabase_client()
     policies_data = load_json('policies.json')
-    embeddings = FastEmbedEmbeddings()
+    embeddings = create_embeddings()
     
     # Clear existing
     try:
@@ -131,19 +134,19 @@ def verify_data():
     supabase = get_supabase_client()
     
     # Check products
-    products = supabase.table("products").select("*").limit(5).execute()
+    products = supabase.table("products").select(PRODUCT_LISTING).limit(5).execute()
     print(f"   ✅ Products: {len(products.data)} records (showing 5)")
     if products.data:
         print(f"      Example: {products.data[0]['name']} - ৳{products.data[0]['price']}")
     
     # Check recipes
-    recipes = supabase.table("recipes").select("*").limit(5).execute()
+    recipes = supabase.table("recipes").select("id, name").limit(5).execute()
     print(f"   ✅ Recipes: {len(recipes.data)} records (showing 5)")
     if recipes.data:
         print(f"      Example: {recipes.data[0]['name']}")
     
     # Check policies
-    policies = supabase.table("policies").select("*").limit(5).execute()
+    policies = supabase.table("policies").select("id, title").limit(5).execute()
     print(f"   ✅ Policies: {len(policies.data)} records (showing 5)")
     if policies.data:
         print(f"      Example: {policies.data[0]['title']}")
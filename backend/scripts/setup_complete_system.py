@@ -9,6 +9,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.connection import get_supabase_client
+from database.projections import ID_ONLY
 from database.vector_store import add_recipes
 import json
 
@@ -139,15 +140,15 @@ def verify_data():
     
     # Check products
     try:
-        products = supabase.table("products").select("*", count='exact').limit(1).execute()
-        print(f"✅ Products in database: {len(products.data)} (showing 1)")
+        products = supabase.table("products").select(ID_ONLY, count='exact').limit(1).execute()
+        print(f"✅ Products in database: {products.count}")
     except Exception as e:
         print(f"❌ Error checking products: {e}")
     
     # Check recipes
     try:
-        recipes = supabase.table("documents").select("*", count='exact').limit(1).execute()
-        print(f"✅ Recipes in database: {len(recipes.data)} (showing 1)")
+        recipes = supabase.table("documents").select(ID_ONLY, count='exact').limit(1).execute()
+        print(f"✅ Recipes in database: {recipes.count}")
     except Exception as e:
         print(f"❌ Error checking recipes: {e}")
 
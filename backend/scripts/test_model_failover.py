@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test hedged requests, circuit-breaker failover and rate-limit shedding against
+a local fake OpenAI-compatible server (no API key or network needed)
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Per-model behaviour of the fake server (retry_after: Retry-After header on errors)
+FAKE_MODELS = {
+    "fake/fast": {"delay": 0.05, "status": 200},
+    "fake/slow": {"delay": 3.0, "status": 200},
+    "fake/rate-limited": {"delay": 0.0, "status": 429, "retry_after": 0},
+}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    calls = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        model = body.get("model")
+        FakeOpenAIHandler.calls[model] = FakeOpenAIHandler.calls.get(model, 0) + 1
+        behaviour = FAKE_MODELS.get(model, {"delay": 0.0, "status": 404})
+        time.sleep(behaviour["delay"])
+
+        if behaviour["status"] != 200:
+            payload = {"error": {"message": f"fake error for {model}", "code": behaviour["status"]}}
+        else:
+            payload = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": f"answer from {model}"},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }
+        data = json.dumps(payload).encode()
+        self.send_response(behaviour["status"])
+        if "retry_after" in behaviour:
+            self.send_header("Retry-After", str(behaviour["retry_after"]))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_model(primary, fallbacks):
+    from model_pool import ModelEndpoint, PooledOpenAIChat
+    base_url = os.environ["OPENROUTER_BASE_URL"]
+    return PooledOpenAIChat(
+        id=primary,
+        api_key="fake-key",
+        base_url=base_url,
+        endpoints=[ModelEndpoint(model_id=m, base_url=base_url, api_key="fake-key") for m in [primary] + fallbacks],
+    )
+
+
+def run(model, prompt="Hello"):
+    from phi.agent import Agent
+    started = time.monotonic()
+    content = Agent(model=model).run(prompt).content
+    return content, time.monotonic() - started
+
+
+def main():
+    server = start_server()
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ["LLM_HEDGE_DEFAULT_DELAY_S"] = "0.5"
+    os.environ["LLM_BREAKER_FAILURES"] = "2"
+    os.environ["LLM_BREAKER_COOLDOWN_S"] = "60"
+
+    from model_pool import get_pool
+
+    print("=" * 80)
+    print("🔧 MODEL POOL FAILOVER TEST")
+    print("=" * 80)
+    failures = 0
+
+    print("\n1. Slow primary is hedged to a fast backup")
+    content, elapsed = run(make_model("fake/slow", ["fake/fast"]))
+    ok = content == "answer from fake/fast" and elapsed < 2.0
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} {content!r} in {elapsed:.2f}s")
+
+    # A 429 also penalizes the model in the scheduler, which tries penalized
+    # models last; Retry-After: 0 lifts the penalty at once, so the primary
+    # keeps its place in the order and fails again until the breaker opens
+    print("\n2. Rate-limited primary fails over and trips its breaker")
+    model = make_model("fake/rate-limited", ["fake/fast"])
+    for i in range(4):
+        content, elapsed = run(model)
+        print(f"   call {i + 1}: {content!r} in {elapsed:.2f}s")
+    breaker = get_pool().stats()["fake/rate-limited"]["breaker"]
+    calls_before = FakeOpenAIHandler.calls.get("fake/rate-limited", 0)
+    run(model)
+    skipped = FakeOpenAIHandler.calls.get("fake/rate-limited", 0) == calls_before
+    ok = content == "answer from fake/fast" and breaker == "open" and skipped
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} breaker={breaker}, open breaker skipped={skipped}")
+
+    print("\n3. Saturated model sheds low-priority calls that cannot meet their deadline")
+    from llm_scheduler import CRITICAL, LOW, LLMScheduler, RequestShed
+    scheduler = LLMScheduler({"fake/fast": {"rpm": 2}}, default_deadline_s=1.0)
+    scheduler.acquire("fake/fast", 100, CRITICAL)
+    scheduler.acquire("fake/fast", 100, CRITICAL)
+    started = time.monotonic()
+    try:
+        scheduler.acquire("fake/fast", 100, LOW)
+        shed = False
+    except RequestShed:
+        shed = True
+    ok = shed and time.monotonic() - started < 0.1
+    failures += not ok
+    print(f"   {'✅' if ok else '❌'} shed={shed} in {time.monotonic() - started:.3f}s, stats={scheduler.stats()}")
+
+    print("\n📊 Pool stats:")
+    print(json.dumps(get_pool().stats(), indent=2))
+
+    server.shutdown()
+    if failures:
+        print(f"\n❌ {failures} scenario(s) failed")
+        sys.exit(1)
+    print("\n✅ All scenarios passed")
+
+
+if __name__ == "__main__":
+    main()
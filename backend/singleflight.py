@@ -0,0 +1,192 @@
+"""
+Single-flight request coalescing.
+
+When many identical requests arrive at the same time (e.g. hundreds of users
+asking "is hilsa available?" during a promotion), only the first caller runs
+the underlying computation. Everyone else who asks for the same key while it
+is still in flight waits for, and shares, that one result. If the leader's
+call was answered from local data in degraded mode, every caller's request is
+marked stale too (database/offline.py), not just the leader's.
+"""
+import functools
+import inspect
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    from backend.database.offline import capture_stale, mark_stale
+except ModuleNotFoundError:
+    from database.offline import capture_stale, mark_stale
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    if text is None:
+        return ""
+    return _WHITESPACE.sub(" ", str(text)).strip().lower()
+
+
+class WaitTimeout(TimeoutError):
+    """A waiter gave up on the leader's result before it arrived."""
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    Results are not cached: once the leader finishes, the next caller with the
+    same key starts a fresh computation.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executions = 0
+        self._coalesced = 0
+        self._max_waiters = 0
+        self._errors = 0
+        self._wait_timeouts = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        fn() once per key in flight; callers that join a running call share its result.
+
+        Args:
+            key: Calls with equal keys are coalesced
+            fn: The computation, run by the first caller only
+            timeout: How long a joining caller waits for the leader before raising WaitTimeout
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                self._max_waiters = max(self._max_waiters, call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            if not call.event.wait(timeout):
+                with self._lock:
+                    self._wait_timeouts += 1
+                raise WaitTimeout(f"{self.name}: no result within {timeout:.1f}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "executions": self._executions,
+                "waiters_served": self._coalesced,
+                "max_waiters": self._max_waiters,
+                "errors": self._errors,
+                "wait_timeouts": self._wait_timeouts,
+                "in_flight": len(self._calls),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+
+def _normalize_arg(value):
+    if isinstance(value, str):
+        return normalize_text(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize_arg(v) for v in value)
+    return value
+
+
+def argument_key(fn: Callable) -> Callable[..., Hashable]:
+    """Key on the normalized, fully bound arguments so f("x") and f(query="x") coalesce."""
+    signature = inspect.signature(fn)
+
+    def key(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple((name, _normalize_arg(value)) for name, value in bound.arguments.items())
+
+    return key
+
+
+def coalesce(
+    name: str,
+    key: Optional[Callable[..., Hashable]] = None,
+    wait_timeout: Optional[Callable[[], Optional[float]]] = None,
+):
+    """
+    Decorator that routes calls through the single-flight group `name`.
+
+    Args:
+        name: Group name used for metrics
+        key: Optional function mapping the call arguments to a key.
+             Defaults to the normalized positional/keyword arguments.
+        wait_timeout: Optional function giving each joining caller its own wait
+             limit in seconds (None waits for the leader however long it takes).
+    """
+    group = get_group(name)
+
+    def decorator(fn):
+        key_fn = key or argument_key(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timeout = wait_timeout() if wait_timeout else None
+            result, stale = group.do(
+                key_fn(*args, **kwargs), lambda: capture_stale(lambda: fn(*args, **kwargs)), timeout=timeout
+            )
+            # The leader's stale marks go to every request sharing the result, leader included
+            mark_stale(stale)
+            return result
+
+        wrapper.singleflight = group
+        return wrapper
+
+    return decorator
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    """Coalescing metrics for every single-flight group."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
@@ -0,0 +1,192 @@
+"""
+Memoization of agent tool calls
+
+The LLM calls the same tools with the same arguments over and over:
+search_products("fish") for every fish question, and sometimes twice within
+one answer. @memoize sits on top of @coalesce on each tool registered on the
+agents and keys on the same normalized arguments:
+
+- per request: a repeated call within one route_request() always reuses the
+  first result (begin_request / end_request, called by the orchestrator)
+- across requests: results are kept for the tool's TTL and dropped as soon as
+  the change feed reports a write to a table the tool reads
+
+Results served from local data (database/offline.py) are never kept across
+requests. Per-tool TTLs can be overridden with
+TOOL_CACHE_TTLS="search_products=15,search_recipes=600"; TOOL_CACHE=false
+turns the cross-request cache off (per-request reuse stays).
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    from backend.database.change_feed import InvalidationEvent, get_change_feed
+    from backend.database.offline import capture_stale, is_degraded, mark_stale
+    from backend.singleflight import argument_key
+except ModuleNotFoundError:
+    from database.change_feed import InvalidationEvent, get_change_feed
+    from database.offline import capture_stale, is_degraded, mark_stale
+    from singleflight import argument_key
+
+# Results of the current request, keyed by (tool, arguments); None outside a request
+_request_results: contextvars.ContextVar[Optional[Dict[Hashable, Any]]] = contextvars.ContextVar(
+    "tool_results", default=None
+)
+
+
+def enabled() -> bool:
+    return os.getenv("TOOL_CACHE", "true").lower() in ("1", "true", "yes")
+
+
+def _ttl_overrides() -> Dict[str, float]:
+    overrides = {}
+    for item in os.getenv("TOOL_CACHE_TTLS", "").split(","):
+        if "=" in item:
+            name, ttl = item.split("=", 1)
+            overrides[name.strip()] = float(ttl)
+    return overrides
+
+
+class ToolCache:
+    def __init__(self, name: str, ttl_s: float, tables: Tuple[str, ...], max_entries: int):
+        self.name = name
+        self.ttl_s = ttl_s
+        self.tables = tables
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.calls = 0
+        self.request_hits = 0
+        self.cache_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        with self._lock:
+            # An invalidation while the tool ran means `value` may predate the write
+            if generation != self.invalidations:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, event: Optional[InvalidationEvent] = None):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = self.request_hits + self.cache_hits
+            return {
+                "ttl_s": self.ttl_s,
+                "tables": list(self.tables),
+                "entries": len(self._entries),
+                "calls": self.calls,
+                "request_hits": self.request_hits,
+                "cache_hits": self.cache_hits,
+                "misses": self.misses,
+                "reuse_ratio": round(reused / self.calls, 3) if self.calls else None,
+                "invalidations": self.invalidations,
+            }
+
+
+_caches: Dict[str, ToolCache] = {}
+_caches_lock = threading.Lock()
+
+
+def memoize(
+    name: str,
+    ttl_s: float,
+    tables: Tuple[str, ...] = (),
+    cache_if: Optional[Callable[[Any], bool]] = None,
+    max_entries: int = 1024,
+):
+    """
+    Decorator memoizing a tool per request and across requests.
+
+    Args:
+        name: Tool name used for metrics and TOOL_CACHE_TTLS
+        ttl_s: How long a result is reused across requests
+        tables: Change-feed tables whose writes invalidate this tool's results
+        cache_if: Only keep results for which this returns True (e.g. not error strings)
+        max_entries: LRU bound on remembered argument combinations
+    """
+    cache = ToolCache(name, _ttl_overrides().get(name, ttl_s), tables, max_entries)
+    with _caches_lock:
+        _caches[name] = cache
+    if tables:
+        get_change_feed().subscribe(cache.invalidate, tables=tables)
+
+    def decorator(fn):
+        key_fn = argument_key(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = key_fn(*args, **kwargs)
+            cache.count("calls")
+            request_results = _request_results.get()
+            if request_results is not None and (name, key) in request_results:
+                cache.count("request_hits")
+                return request_results[(name, key)]
+
+            use_cache = enabled() and cache.ttl_s > 0
+            if use_cache:
+                found, value = cache.get(key)
+                if found:
+                    cache.count("cache_hits")
+                    if request_results is not None:
+                        request_results[(name, key)] = value
+                    return value
+
+            cache.count("misses")
+            generation = cache.invalidations
+            value, stale = capture_stale(lambda: fn(*args, **kwargs))
+            mark_stale(stale)
+            if request_results is not None:
+                request_results[(name, key)] = value
+            if use_cache and not stale and not is_degraded() and (cache_if is None or cache_if(value)):
+                cache.put(key, value, generation)
+            return value
+
+        wrapper.tool_cache = cache
+        return wrapper
+
+    return decorator
+
+
+def begin_request() -> contextvars.Token:
+    """Start per-request reuse of tool results (until end_request)."""
+    return _request_results.set({})
+
+
+def end_request(token: contextvars.Token):
+    _request_results.reset(token)
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {c.name: c.stats() for c in caches}
@@ -0,0 +1,104 @@
+"""
+Shopping baskets for the chef's suggested recipes
+
+The chef answer carries one [BUY_RECIPE_X: ...] tag per recipe. Pricing each
+tag on its own scans the catalog once per recipe and shows the same Onion
+(Deshi) in every bundle. build_baskets() resolves the ingredients of all
+recipes against the catalog in one pass instead (each distinct ingredient name
+is matched once) and returns:
+
+- one bundle per recipe, with a product listed once even if several of the
+  recipe's ingredients map to it
+- a combined "cook all of these" basket: every product once, with the recipes
+  that need it, and what buying the bundles separately would have cost
+
+Bundles keep the {"items": [{"name", "price"}], "total"} shape the frontend
+reads from [BUY_INGREDIENTS: {...}].
+"""
+from typing import Any, Dict, List, Optional, Union
+
+from backend.database.catalog_cache import get_product_catalog
+from backend.tools.inventory import find_product
+
+Number = Union[int, float]
+
+# Estimated price for ingredients we could not match, and how many to show
+FALLBACK_PRICE = 100
+FALLBACK_ITEMS = 3
+
+
+def _price(value: Any) -> Number:
+    price = float(value)
+    return int(price) if price.is_integer() else round(price, 2)
+
+
+def _bundle(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"items": items, "total": _price(sum(item["price"] for item in items))}
+
+
+def fallback_bundle(ingredients: List[str]) -> Dict[str, Any]:
+    """Estimated prices for the first few ingredients, when nothing matched the catalog."""
+    return _bundle([{"name": ing, "price": FALLBACK_PRICE} for ing in ingredients[:FALLBACK_ITEMS]])
+
+
+def build_baskets(
+    recipes: Dict[str, List[str]],
+    products: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Price the ingredients of several recipes together.
+
+    Args:
+        recipes: Recipe key (e.g. the BUY_RECIPE number) -> ingredient names, in answer order
+        products: Catalog rows to match against (defaults to get_product_catalog())
+
+    Returns:
+        {"recipes": {key: bundle}, "combined": bundle or None, "shared": [product names]}.
+        A recipe with no catalog match gets fallback_bundle(); the combined basket
+        only counts real products and also carries "separate_total" and "savings".
+    """
+    if products is None:
+        products = get_product_catalog()
+    product_map = {p['name'].lower(): p for p in products}
+
+    # One catalog scan per distinct ingredient across all recipes
+    resolved: Dict[str, Optional[Dict[str, Any]]] = {}
+    for ingredients in recipes.values():
+        for ingredient in ingredients:
+            key = ingredient.strip().lower()
+            if key and key not in resolved:
+                match = find_product(key, product_map)
+                resolved[key] = match[0] if match else None
+
+    bundles: Dict[str, Dict[str, Any]] = {}
+    # Product name -> (combined item, recipe keys needing it), in first-seen order
+    combined: Dict[str, Dict[str, Any]] = {}
+    separate_total = 0.0
+    for recipe_key, ingredients in recipes.items():
+        items: Dict[str, Dict[str, Any]] = {}
+        for ingredient in ingredients:
+            product = resolved.get(ingredient.strip().lower())
+            if product is None or product['name'] in items:
+                continue
+            items[product['name']] = {"name": product['name'], "price": _price(product['price'])}
+            entry = combined.setdefault(
+                product['name'],
+                {"name": product['name'], "price": _price(product['price']), "recipes": []},
+            )
+            entry["recipes"].append(recipe_key)
+        if items:
+            bundles[recipe_key] = _bundle(list(items.values()))
+            separate_total += bundles[recipe_key]["total"]
+        else:
+            bundles[recipe_key] = fallback_bundle(ingredients)
+
+    combined_bundle = None
+    if combined:
+        combined_bundle = _bundle(list(combined.values()))
+        combined_bundle["separate_total"] = _price(separate_total)
+        combined_bundle["savings"] = _price(separate_total - combined_bundle["total"])
+    return {
+        "recipes": bundles,
+        "combined": combined_bundle,
+        "shared": [name for name, item in combined.items() if len(item["recipes"]) > 1],
+    }
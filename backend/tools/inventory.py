@@ -1,5 +1,29 @@
-from backend.database.connection import get_supabase_client
+from backend.database.catalog_cache import get_product_catalog
+from backend.singleflight import coalesce
+from backend.tool_cache import memoize
+from typing import Dict, Optional, Tuple
 
+
+def find_product(ingredient: str, product_map: Dict[str, dict]) -> Optional[Tuple[dict, bool]]:
+    """
+    The product an ingredient name refers to, and whether it is in stock.
+
+    Substring match either way on lowercase names; an in-stock match wins over
+    an earlier out-of-stock one. product_map maps lowercase name -> product row.
+    """
+    ing_lower = ingredient.lower()
+    fallback = None
+    for p_name, p_data in product_map.items():
+        if ing_lower in p_name or p_name in ing_lower:
+            if p_data['stock_quantity'] > 0:
+                return p_data, True
+            if fallback is None:
+                fallback = p_data
+    return (fallback, False) if fallback is not None else None
+
+
+@memoize("check_inventory", ttl_s=30, tables=("products",))
+@coalesce("check_inventory")
 def check_inventory(ingredients: list[str]) -> str:
     """
     Checks the inventory for a list of ingredients.
@@ -11,8 +35,6 @@ def check_inventory(ingredients: list[str]) -> str:
     Returns:
         Formatted string with inventory status
     """
-    supabase = get_supabase_client()
-    
     available_items = []
     missing_items = []
     total_price_missing = 0.0
@@ -20,37 +42,23 @@ def check_inventory(ingredients: list[str]) -> str:
     # Normalize ingredients for simple matching (lowercase)
     # In a real app, this would be more complex (fuzzy matching)
     
-    # Fetch all products (simplification for prototype)
-    response = supabase.table("products").select("*").execute()
-    products = response.data
+    # Whole catalog from the per-worker cache (refreshed by the change feed)
+    products = get_product_catalog()
     
     product_map = {p['name'].lower(): p for p in products}
     
     for ingredient in ingredients:
-        ing_lower = ingredient.lower()
-        found = False
-        for p_name, p_data in product_map.items():
-            if ing_lower in p_name or p_name in ing_lower:
-                if p_data['stock_quantity'] > 0:
-                    available_items.append(p_data)
-                    found = True
-                    break
-        
-        if not found:
-            # Check if we sell it but it's out of stock, or if we just sell it
+        match = find_product(ingredient, product_map)
+        if match is None:
+            # Item not in store at all
+            continue
+        p_data, in_stock = match
+        if in_stock:
+            available_items.append(p_data)
+        else:
             # For the "Buy Missing" feature, we assume we can buy it if it exists in DB
-            # If it doesn't exist in DB, we can't buy it.
-            # Let's assume if it matches a product name, we can buy it.
-             for p_name, p_data in product_map.items():
-                if ing_lower in p_name or p_name in ing_lower:
-                     missing_items.append(p_data)
-                     total_price_missing += float(p_data['price'])
-                     found = True
-                     break
-            
-             if not found:
-                 # Item not in store at all
-                 pass
+            missing_items.append(p_data)
+            total_price_missing += float(p_data['price'])
 
     # Format as string for the AI agent
     result = f"Inventory Check Results:\n\n"
@@ -0,0 +1,274 @@
+"""
+Meal planning on a budget
+
+plan_meals() picks N recipes that together need the cheapest set of products
+the customer doesn't have yet. Ingredients shared between meals are bought
+once, so the cost of a plan is the price of the union of its missing products,
+not the sum per recipe.
+
+Recipes and products are turned into a recipe x product incidence matrix
+(ingredient names matched with the same rule as check_inventory), so the cost
+each candidate would add to a partial plan is one matrix-vector product:
+
+- small catalogs (at most EXACT_MAX_COMBINATIONS eligible plans): every plan
+  is scored in one batch and the cheapest one that meets the constraints wins
+- otherwise greedy: repeatedly add the recipe with the lowest added cost, then
+  swap one chosen recipe for an unchosen one while that lowers the total, until
+  no single swap helps (a local optimum of the set-union cost)
+
+Constraints: no recipe twice, at most `max_per_category` meals per main
+category (the category of the recipe's priciest product, e.g. Fish or Meat;
+pantry staples such as spices only count when there is nothing else), and
+with in_stock_only only recipes whose missing products are all in stock and
+sold by us at all.
+"""
+import itertools
+import math
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.database.catalog_cache import get_product_catalog, get_recipe_catalog
+from backend.singleflight import coalesce
+from backend.tool_cache import memoize
+from backend.tools.inventory import find_product
+
+# Swap rounds before giving up on improving the greedy plan
+MAX_SWAP_ROUNDS = 20
+# Above this many candidate plans, search heuristically instead of exhaustively
+EXACT_MAX_COMBINATIONS = 20000
+# Plans scored per batch are capped so that plans x meals x products stays under this many cells
+EXACT_BATCH_CELLS = 1 << 22
+MAX_MEALS = 14
+# Cupboard staples: only a recipe's main category when it has nothing else
+PANTRY_CATEGORIES = {"Spices", "Essentials", "Condiments"}
+
+
+class MealPlanner:
+    """Incidence matrix of recipes over products, built once per catalog (get_planner)."""
+
+    def __init__(self, recipes: Sequence[Dict[str, Any]], products: Sequence[Dict[str, Any]]):
+        self.recipes = list(recipes)
+        self.products = list(products)
+        self.prices = np.array([float(p["price"]) for p in self.products], dtype=np.float64)
+        self.in_stock = np.array([(p.get("stock_quantity") or 0) > 0 for p in self.products], dtype=bool)
+        self._product_map = {p["name"].lower(): p for p in self.products}
+        self._index = {id(p): i for i, p in enumerate(self.products)}
+
+        self.incidence = np.zeros((len(self.recipes), len(self.products)), dtype=bool)
+        # Ingredients we don't sell at all, per recipe
+        self.unmatched = np.zeros(len(self.recipes), dtype=np.int32)
+        resolved: Dict[str, Optional[int]] = {}
+        for r, recipe in enumerate(self.recipes):
+            for ingredient in recipe.get("ingredients", []):
+                key = ingredient.strip().lower()
+                if key not in resolved:
+                    resolved[key] = self.product_index(key)
+                if resolved[key] is None:
+                    self.unmatched[r] += 1
+                else:
+                    self.incidence[r, resolved[key]] = True
+
+        # Main category: the category of the recipe's priciest non-pantry product
+        pantry = np.array([p.get("category") in PANTRY_CATEGORIES for p in self.products], dtype=bool)
+        weighted = np.where(self.incidence, np.where(pantry, self.prices * 1e-6, self.prices), -1.0)
+        main = weighted.argmax(axis=1) if self.products else np.zeros(len(self.recipes), dtype=int)
+        self.categories = [
+            (self.products[m].get("category") or "Other") if self.incidence[r].any() else "Other"
+            for r, m in enumerate(main)
+        ]
+
+    def product_index(self, name: str) -> Optional[int]:
+        match = find_product(name, self._product_map)
+        return self._index[id(match[0])] if match else None
+
+    def owned_mask(self, have: Sequence[str]) -> np.ndarray:
+        """Products the customer already has; "onion" covers every onion we sell."""
+        names = [p["name"].lower() for p in self.products]
+        owned = np.zeros(len(self.products), dtype=bool)
+        for item in have:
+            item = item.strip().lower()
+            if item:
+                owned |= np.array([item in name or name in item for name in names], dtype=bool)
+        return owned
+
+    def plan(
+        self,
+        meals: int,
+        have: Sequence[str] = (),
+        max_per_category: int = 2,
+        in_stock_only: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Choose up to `meals` recipes minimizing the price of the products still to buy.
+
+        Returns:
+            {"meals": [recipe indexes], "need": bool matrix of products to buy per recipe,
+             "total": float, "feasible": number of recipes that satisfied the constraints}
+        """
+        owned = self.owned_mask(have)
+        need = self.incidence & ~owned
+        feasible = np.ones(len(self.recipes), dtype=bool)
+        if in_stock_only:
+            feasible &= ~(need & ~self.in_stock).any(axis=1) & (self.unmatched == 0)
+        need_f = need.astype(np.float64)
+        categories = np.array(self.categories, dtype=object)
+        cap = max(1, max_per_category)
+
+        def added_costs(covered: np.ndarray) -> np.ndarray:
+            # Price of the products each recipe would add on top of `covered`
+            return need_f @ np.where(covered, 0.0, self.prices)
+
+        def allowed(chosen: List[int]) -> np.ndarray:
+            ok = feasible.copy()
+            ok[chosen] = False
+            for category in set(categories[chosen]):
+                if sum(categories[c] == category for c in chosen) >= cap:
+                    ok &= categories != category
+            return ok
+
+        def covered_by(chosen: List[int]) -> np.ndarray:
+            return need[chosen].any(axis=0) if chosen else np.zeros(len(self.products), dtype=bool)
+
+        eligible = np.flatnonzero(feasible)
+        size = min(meals, len(eligible))
+        if size and math.comb(len(eligible), size) <= EXACT_MAX_COMBINATIONS:
+            chosen = self._exact(eligible, size, need, categories, cap)
+            if chosen is not None:
+                return {"meals": chosen, "need": need, "total": float(self.prices @ covered_by(chosen)),
+                        "feasible": len(eligible)}
+
+        chosen: List[int] = []
+        while len(chosen) < meals:
+            ok = allowed(chosen)
+            if not ok.any():
+                break
+            costs = np.where(ok, added_costs(covered_by(chosen)), np.inf)
+            chosen.append(int(costs.argmin()))
+
+        total = float(self.prices @ covered_by(chosen))
+        for _ in range(MAX_SWAP_ROUNDS):
+            improved = False
+            for slot in range(len(chosen)):
+                rest = chosen[:slot] + chosen[slot + 1:]
+                ok = allowed(rest)
+                ok[chosen[slot]] = False
+                if not ok.any():
+                    continue
+                base = covered_by(rest)
+                costs = np.where(ok, added_costs(base), np.inf)
+                candidate = int(costs.argmin())
+                new_total = float(self.prices @ base) + float(costs[candidate])
+                if new_total < total - 1e-9:
+                    chosen[slot], total, improved = candidate, new_total, True
+            if not improved:
+                break
+
+        return {"meals": chosen, "need": need, "total": total, "feasible": len(eligible)}
+
+    def _exact(self, eligible: np.ndarray, size: int, need: np.ndarray, categories: np.ndarray,
+               cap: int) -> Optional[List[int]]:
+        """Cheapest plan of `size` eligible recipes within the category cap, or None if none fits."""
+        combos = np.array(list(itertools.combinations(eligible, size)), dtype=np.int64)
+        codes = np.unique(categories, return_inverse=True)[1].reshape(-1)[combos]
+        per_category = np.stack([(codes == c).sum(axis=1) for c in np.unique(codes)], axis=1)
+        ok = (per_category <= cap).all(axis=1)
+        if not ok.any():
+            return None
+        # need[combos] is plans x meals x products: score it a batch at a time
+        rows = max(1, EXACT_BATCH_CELLS // max(1, size * len(self.products)))
+        best, best_cost = 0, np.inf
+        for start in range(0, len(combos), rows):
+            batch = combos[start:start + rows]
+            costs = np.where(ok[start:start + rows], need[batch].any(axis=1) @ self.prices, np.inf)
+            i = int(costs.argmin())
+            if costs[i] < best_cost:
+                best, best_cost = start + i, costs[i]
+        return [int(r) for r in combos[best]]
+
+
+_planner_lock = threading.Lock()
+_planner: Optional[Tuple[int, MealPlanner]] = None
+
+
+def _fingerprint(recipes: Sequence[Dict[str, Any]], products: Sequence[Dict[str, Any]]) -> int:
+    # Everything the matrix and the plan text are built from; the snapshot path
+    # hands out fresh row objects on every call, so identity alone won't do
+    return hash((
+        tuple((r.get("title"), tuple(r.get("ingredients", []))) for r in recipes),
+        tuple((p["name"], float(p["price"]), p.get("stock_quantity"), p.get("category")) for p in products),
+    ))
+
+
+def get_planner(recipes: Sequence[Dict[str, Any]], products: Sequence[Dict[str, Any]]) -> MealPlanner:
+    """The MealPlanner for this catalog, rebuilt only when the recipes or products changed."""
+    global _planner
+    key = _fingerprint(recipes, products)
+    with _planner_lock:
+        if _planner is not None and _planner[0] == key:
+            return _planner[1]
+    planner = MealPlanner(recipes, products)
+    with _planner_lock:
+        _planner = (key, planner)
+    return planner
+
+
+def _price(value: float) -> str:
+    return f"{value:.0f}" if float(value).is_integer() else f"{value:.2f}"
+
+
+@memoize("plan_meals", ttl_s=30, tables=("products",))
+@coalesce("plan_meals")
+def plan_meals(
+    meals: int = 7,
+    budget: float = 0,
+    have: Optional[list[str]] = None,
+    max_per_category: int = 2,
+    in_stock_only: bool = True,
+) -> str:
+    """
+    Plans several meals that share ingredients so the shopping list is as cheap as possible.
+    Use it when the customer wants a week of meals, a meal plan, or recipes on a budget.
+
+    Args:
+        meals: Number of different recipes to plan (e.g. 7 for a week)
+        budget: Maximum spend in taka for the shopping list, 0 for no limit
+        have: Ingredients the customer already has at home
+        max_per_category: At most this many meals with the same main ingredient type (Fish, Meat, ...)
+        in_stock_only: Only plan recipes whose ingredients are all in stock
+
+    Returns:
+        The plan, day by day, with what to buy for each meal and one combined shopping list
+    """
+    meals = min(max(int(meals), 1), MAX_MEALS)
+    planner = get_planner(get_recipe_catalog(), get_product_catalog())
+    result = planner.plan(meals, have or [], max_per_category, in_stock_only)
+    chosen, need = result["meals"], result["need"]
+    if not chosen:
+        return "No recipes fit these constraints. Try allowing out-of-stock items or more meals per category."
+
+    lines = [f"Meal plan ({len(chosen)} meals, shared ingredients bought once):", ""]
+    bought = np.zeros(len(planner.products), dtype=bool)
+    for day, r in enumerate(chosen, 1):
+        recipe = planner.recipes[r]
+        new = need[r] & ~bought
+        bought |= need[r]
+        items = [f"{planner.products[i]['name']} ৳{_price(planner.prices[i])}" for i in np.flatnonzero(new)]
+        lines.append(f"Day {day}: {recipe.get('title', 'Recipe')} ({planner.categories[r]})")
+        lines.append(f"  Ingredients: {', '.join(recipe.get('ingredients', []))}")
+        lines.append(f"  New to buy: {', '.join(items) if items else 'nothing, already on the list'}")
+
+    lines.append("")
+    lines.append("Shopping list:")
+    for i in np.flatnonzero(bought):
+        lines.append(f"  - {planner.products[i]['name']} - ৳{_price(planner.prices[i])}")
+    lines.append(f"\n💰 Total: ৳{_price(result['total'])}")
+    if budget and result["total"] > budget:
+        lines.append(f"⚠️ Over the ৳{_price(budget)} budget by ৳{_price(result['total'] - budget)}; "
+                     "suggest fewer meals or list what they already have.")
+    elif budget:
+        lines.append(f"✅ Within the ৳{_price(budget)} budget.")
+    if len(chosen) < meals:
+        lines.append(f"Only {len(chosen)} of {meals} meals fit the constraints ({result['feasible']} recipes eligible).")
+    return "\n".join(lines)
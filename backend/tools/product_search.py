@@ -1,16 +1,31 @@
 """
 Product search functionality
 """
+import logging
 import sys
 import os
+from typing import List
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     from backend.database.connection import get_supabase_client
+    from backend.database.offline import with_fallback
+    from backend.database.projections import PRODUCT_LISTING, ProductListing
+    from backend.singleflight import coalesce
+    from backend.tool_cache import memoize
 except ModuleNotFoundError:
     from database.connection import get_supabase_client
+    from database.offline import with_fallback
+    from database.projections import PRODUCT_LISTING, ProductListing
+    from singleflight import coalesce
+    from tool_cache import memoize
 
-def search_products(query: str, category: str = None, limit: int = 10):
+logger = logging.getLogger(__name__)
+
+# Errors come back as [], so empty results are never kept across requests
+@memoize("search_products", ttl_s=30, tables=("products",), cache_if=bool)
+@coalesce("search_products")
+def search_products(query: str, category: str = None, limit: int = 10) -> List[ProductListing]:
     """
     Search for products by name or category
     
@@ -22,11 +37,11 @@ def search_products(query: str, category: str = None, limit: int = 10):
     Returns:
         List of matching products with name, price, stock_quantity, category
     """
-    supabase = get_supabase_client()
-    
-    try:
+    def remote() -> List[ProductListing]:
+        supabase = get_supabase_client()
+        
         # Build query
-        query_builder = supabase.table("products").select("*")
+        query_builder = supabase.table("products").select(PRODUCT_LISTING)
         
         # Search in name or category
         if query:
@@ -44,9 +59,12 @@ def search_products(query: str, category: str = None, limit: int = 10):
         response = query_builder.execute()
         
         return response.data if response.data else []
-        
+    
+    try:
+        # Local catalog copy when Supabase is down or over its latency budget
+        return with_fallback("search_products", remote, lambda data: data.search_products(query, category, limit))
     except Exception as e:
-        print(f"Error searching products: {e}")
+        logger.warning(f"Error searching products: {e}")
         return []
 
 def get_products_by_category(category: str):
@@ -61,7 +79,10 @@ def get_products_by_category(category: str):
     """
     return search_products(query="", category=category, limit=50)
 
-def get_available_products(query: str = None):
+# Errors come back as [], so empty results are never kept across requests
+@memoize("get_available_products", ttl_s=30, tables=("products",), cache_if=bool)
+@coalesce("get_available_products")
+def get_available_products(query: str = None) -> List[ProductListing]:
     """
     Get only in-stock products
     
@@ -71,10 +92,9 @@ def get_available_products(query: str = None):
     Returns:
         List of available (in-stock) products
     """
-    supabase = get_supabase_client()
-    
-    try:
-        query_builder = supabase.table("products").select("*").gt("stock_quantity", 0)
+    def remote() -> List[ProductListing]:
+        supabase = get_supabase_client()
+        query_builder = supabase.table("products").select(PRODUCT_LISTING).gt("stock_quantity", 0)
         
         if query:
             query_lower = query.lower()
@@ -84,7 +104,12 @@ def get_available_products(query: str = None):
         
         response = query_builder.execute()
         return response.data if response.data else []
-        
+    
+    try:
+        return with_fallback(
+            "get_available_products", remote,
+            lambda data: data.search_products(query, limit=len(data.products), in_stock_only=True),
+        )
     except Exception as e:
-        print(f"Error getting available products: {e}")
+        logger.warning(f"Error getting available products: {e}")
         return []
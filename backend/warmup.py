@@ -0,0 +1,221 @@
+"""
+Startup warm-up and readiness
+
+Without warm-up the first requests of a new worker pay for loading the
+FastEmbed ONNX model, the first catalog fetch, the first Supabase connection
+and DNS + TLS to the LLM provider. On startup main.py runs these steps in a
+background thread (so /health answers right away) and /ready reports 503 until
+every required component is warm, so a load balancer only routes to warm pods.
+
+Components:
+    embedding_model   construct the shared FastEmbed instance (loads the model)
+    embedding         one dummy query embedding (first ONNX run allocates buffers)
+    catalog           prefetch the product catalog into the catalog cache/snapshot
+    database          trivial Supabase query (opens the PostgREST connection)
+    llm_pool          GET /models on each LLM client in the model pool
+
+Configured from the environment:
+    WARMUP_ENABLED      run the warm-up on startup (default true; when false /ready is always ready)
+    WARMUP_REQUIRED     comma-separated components /ready waits for
+                        (default embedding_model,embedding,catalog,database)
+    WARMUP_RETRY_S      retry failed components after this many seconds (default 30)
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING, WARMING, READY, FAILED = "pending", "warming", "ready", "failed"
+DEFAULT_REQUIRED = "embedding_model,embedding,catalog,database"
+
+
+def _warm_embedding_model():
+    from backend.database.embeddings import get_embeddings
+
+    get_embeddings()
+
+
+def _warm_embedding():
+    from backend.database.embeddings import embed_query
+
+    return {"dim": len(embed_query("warm up"))}
+
+
+def _warm_catalog():
+    from backend.database.catalog_cache import get_product_catalog
+
+    return {"products": len(get_product_catalog())}
+
+
+def _warm_database():
+    from backend.database.connection import get_supabase_client
+    from backend.database.projections import ID_ONLY
+
+    get_supabase_client().table("products").select(ID_ONLY).limit(1).execute()
+
+
+def _warm_llm_pool():
+    from backend.model import ROLE_TIERS, get_model
+    from backend.model_pool import PooledOpenAIChat, get_pool
+
+    endpoints = []
+    for role in ROLE_TIERS:
+        model = get_model(role)
+        if not isinstance(model, PooledOpenAIChat):
+            # Plain OpenAI fallback: one client, warmed directly
+            model.get_client().models.list()
+            return {"clients": 1}
+        endpoints.extend(model.endpoints)
+    return {"clients": get_pool().warm(endpoints)}
+
+
+# Steps in a chain run in order (the dummy embedding needs the model); chains run concurrently
+CHAINS: List[List[Tuple[str, Callable[[], Optional[Dict[str, Any]]]]]] = [
+    [("embedding_model", _warm_embedding_model), ("embedding", _warm_embedding)],
+    [("catalog", _warm_catalog)],
+    [("database", _warm_database)],
+    [("llm_pool", _warm_llm_pool)],
+]
+
+
+class _Component:
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.status = PENDING
+        self.duration_s: Optional[float] = None
+        self.error: Optional[str] = None
+        self.detail: Optional[Dict[str, Any]] = None
+        self.attempts = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        entry = {"status": self.status, "required": self.required, "attempts": self.attempts}
+        if self.duration_s is not None:
+            entry["duration_s"] = round(self.duration_s, 3)
+        if self.error:
+            entry["error"] = self.error
+        if self.detail:
+            entry.update(self.detail)
+        return entry
+
+
+def enabled() -> bool:
+    return os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class Warmup:
+    def __init__(self, chains=CHAINS, required: Optional[List[str]] = None, retry_s: float = 30.0):
+        required = set(required if required is not None else DEFAULT_REQUIRED.split(","))
+        self.chains = chains
+        self.retry_s = retry_s
+        self._lock = threading.Lock()
+        self._components = {
+            name: _Component(name, name in required) for chain in chains for name, _ in chain
+        }
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _run_chain(self, chain):
+        for name, step in chain:
+            component = self._components[name]
+            if component.status == READY:
+                continue
+            with self._lock:
+                component.status = WARMING
+                component.attempts += 1
+            started = time.perf_counter()
+            try:
+                detail = step()
+                with self._lock:
+                    component.status, component.error, component.detail = READY, None, detail
+            except Exception as e:
+                with self._lock:
+                    component.status, component.error = FAILED, f"{type(e).__name__}: {e}"
+                logger.warning(f"Warm-up of {name} failed: {e}")
+                return  # later steps in the chain depend on this one
+            finally:
+                component.duration_s = time.perf_counter() - started
+            logger.info(f"Warmed {name} in {component.duration_s:.2f}s")
+
+    def run_once(self):
+        """Run every chain concurrently and wait for all of them."""
+        with ThreadPoolExecutor(max_workers=len(self.chains), thread_name_prefix="warmup") as pool:
+            list(pool.map(self._run_chain, self.chains))
+
+    def _loop(self):
+        self._started_at = time.monotonic()
+        self.run_once()
+        self._finished_at = time.monotonic()
+        logger.info(f"Warm-up finished in {self._finished_at - self._started_at:.2f}s (ready={self.ready})")
+        # Keep retrying what failed (e.g. Supabase was briefly unreachable) until it's warm
+        while not self._stop.wait(self.retry_s):
+            if all(c.status == READY for c in self._components.values()):
+                return
+            self.run_once()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def ready(self) -> bool:
+        return all(c.status == READY for c in self._components.values() if c.required)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: c.as_dict() for name, c in self._components.items()}
+        if self._started_at is None:
+            status = PENDING
+        elif self.ready:
+            status = READY
+        elif self._finished_at is None:
+            status = WARMING
+        else:
+            status = FAILED
+        elapsed = None
+        if self._started_at is not None:
+            elapsed = (self._finished_at or time.monotonic()) - self._started_at
+        return {
+            "ready": self.ready,
+            "status": status,
+            "warmup_s": round(elapsed, 3) if elapsed is not None else None,
+            "components": components,
+        }
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    global _warmup
+    with _warmup_lock:
+        if _warmup is None:
+            required = [n.strip() for n in os.getenv("WARMUP_REQUIRED", DEFAULT_REQUIRED).split(",") if n.strip()]
+            _warmup = Warmup(required=required, retry_s=float(os.getenv("WARMUP_RETRY_S", "30")))
+        return _warmup
+
+
+def start_warmup() -> Optional[Warmup]:
+    """Start the background warm-up (no-op when WARMUP_ENABLED is off)."""
+    if not enabled():
+        return None
+    warmup = get_warmup()
+    warmup.start()
+    return warmup
+
+
+def readiness() -> Dict[str, Any]:
+    if not enabled():
+        return {"ready": True, "status": "disabled", "warmup_s": None, "components": {}}
+    return get_warmup().report()